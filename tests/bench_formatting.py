@@ -0,0 +1,144 @@
+"""Micro-benchmark for task result and task list formatting.
+
+Compares the current formatters against the pre-cache reference
+implementation on synthetic 1,000-task pages. Runs offline.
+
+Usage: python tests/bench_formatting.py [--tasks 1000] [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool import Tools, _parse_timestamp
+
+STATUSES = ["COMPLETED", "FAILED", "CANCELLED", "IN_PROGRESS", "PENDING", "NEEDS_HELP"]
+PRIORITIES = ["LOW", "MEDIUM", "HIGH", "URGENT"]
+
+
+def make_tasks(count: int, messages_per_task: int = 0) -> list:
+    """Build synthetic tasks shaped like ByteBot API responses."""
+    base = datetime(2025, 12, 1, tzinfo=timezone.utc)
+    tasks = []
+    for i in range(count):
+        created = base + timedelta(minutes=i)
+        updated = created + timedelta(seconds=30 + i % 600)
+        messages = [
+            {
+                "role": "ASSISTANT" if j % 2 else "USER",
+                "content": [
+                    {"type": "text", "text": f"Step {j}: " + "x" * (40 + j % 300)}
+                ],
+            }
+            for j in range(messages_per_task)
+        ]
+        tasks.append(
+            {
+                "id": f"task-{i:06d}",
+                "status": STATUSES[i % len(STATUSES)],
+                "priority": PRIORITIES[i % len(PRIORITIES)],
+                "description": f"Benchmark task number {i} " + "d" * (i % 80),
+                "createdAt": created.isoformat().replace("+00:00", ".000Z"),
+                "updatedAt": updated.isoformat().replace("+00:00", ".000Z"),
+                "messages": messages,
+            }
+        )
+    return tasks
+
+
+def legacy_format_task_list(tools: Tools, tasks: list) -> str:
+    """Reference implementation of the task list formatter before the fast path."""
+    output = []
+    summary = tools._format_task_summary(tasks)
+    if summary:
+        output.append(summary)
+        output.append("")
+    output.append(f"**Recent Tasks ({len(tasks)}):**")
+    output.append("")
+    for task in tasks:
+        status = task.get("status", "UNKNOWN")
+        desc = task.get("description", "No description")
+        if len(desc) > 60:
+            desc = desc[:60] + "..."
+        created = task.get("createdAt", "")
+        try:
+            created_dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
+            created_str = created_dt.strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            created_str = created[:19].replace("T", " ") if created else "Unknown"
+        priority = task.get("priority", "MEDIUM")
+        output.append(f"**{status}** (Priority: {priority})")
+        output.append(f"  - ID: `{task.get('id', 'N/A')}`")
+        output.append(f"  - {desc}")
+        output.append(f"  - Created: {created_str}")
+        output.append("")
+    return "\n".join(output)
+
+
+def bench(label: str, func, repeat: int) -> float:
+    """Run func repeat times and print the mean time per call."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    mean_ms = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:<45} {mean_ms:9.3f} ms/call")
+    return mean_ms
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tools = Tools()
+    page = make_tasks(args.tasks)
+    detailed = make_tasks(args.tasks, messages_per_task=40)
+
+    print("=" * 60)
+    print(f"Formatting benchmark ({args.tasks} tasks, {args.repeat} runs)")
+    print("=" * 60)
+
+    legacy_output = legacy_format_task_list(tools, page)
+    current_output = tools._format_task_list(page)
+    identical = legacy_output == current_output
+
+    legacy_ms = bench(
+        "task list (legacy)", lambda: legacy_format_task_list(tools, page), args.repeat
+    )
+    current_ms = bench(
+        "task list (current)", lambda: tools._format_task_list(page), args.repeat
+    )
+
+    def render_uncached():
+        for task in detailed:
+            tools._render_task_result(task)
+
+    def render_cached():
+        for task in detailed:
+            tools._format_task_result(task)
+
+    _parse_timestamp.cache_clear()
+    uncached_ms = bench(
+        f"task results, uncached (x{args.tasks})", render_uncached, args.repeat
+    )
+    render_cached()  # warm the render cache
+    cached_ms = bench(
+        f"task results, cached (x{args.tasks})", render_cached, args.repeat
+    )
+
+    print()
+    print(f"Task list speedup:   {legacy_ms / current_ms:6.1f}x")
+    print(f"Task result speedup: {uncached_ms / cached_ms:6.1f}x")
+    print(f"Output identical to legacy formatter: {identical}")
+
+    return identical
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,95 @@
+"""Benchmark the JSON codecs the tool can use for ByteBot API bodies.
+
+Decodes realistic task-list pages and task details (with messages) and
+encodes task creation payloads with every installed codec (stdlib json,
+plus orjson / ujson when available). Runs offline.
+
+Usage: python tests/bench_json_codec.py [--tasks 1000] [--messages 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_formatting import make_tasks
+from tool import _load_json_codec
+
+CODECS = ["json", "ujson", "orjson"]
+
+
+def timed_us(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    stdlib = _load_json_codec("json")
+    page = make_tasks(args.tasks)
+    for task in page:
+        del task["messages"]  # List responses carry no messages
+    payloads = {
+        f"decode list page ({args.tasks} tasks)": stdlib.dumps(
+            {"tasks": page, "total": args.tasks, "totalPages": 1}
+        ),
+        f"decode task ({args.messages} messages)": stdlib.dumps(
+            make_tasks(1, args.messages)[0]
+        ),
+    }
+    create = {
+        "description": "Download the latest invoices from the vendor portal",
+        "priority": "MEDIUM",
+        "type": "IMMEDIATE",
+        "control": "ASSISTANT",
+        "model": {
+            "name": "openai/Qwen3-VL-32B-Instruct",
+            "title": "Qwen3-VL-32B-Instruct",
+            "provider": "proxy",
+            "contextWindow": 128000,
+        },
+    }
+
+    codecs = []
+    for name in CODECS:
+        codec = _load_json_codec(name)
+        if codec.name == name:
+            codecs.append(codec)
+        else:
+            print(f"{name}: not installed, skipped")
+
+    print("=" * 72)
+    print(f"JSON codec benchmark ({args.repeat} runs)")
+    print("=" * 72)
+    print(f"{'case':<34}" + "".join(f"{c.name:>12}" for c in codecs))
+
+    ok = True
+    for label, body in payloads.items():
+        expected = stdlib.loads(body)
+        ok &= all(codec.loads(body) == expected for codec in codecs)
+        times = [timed_us(lambda: codec.loads(body), args.repeat) for codec in codecs]
+        print(f"{label:<34}" + "".join(f"{t / 1000:>10.2f}ms" for t in times))
+
+    for codec in codecs:
+        ok &= stdlib.loads(codec.dumps(create)) == create
+    repeat = args.repeat * 1000
+    times = [timed_us(lambda: codec.dumps(create), repeat) for codec in codecs]
+    print(f"{'encode create payload':<34}" + "".join(f"{t:>10.2f}us" for t in times))
+
+    print(f"Round trips match stdlib: {ok}")
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,80 @@
+"""Memory and speed benchmark for compact task records on large listings.
+
+Builds a 10,000-task listing as it arrives from the API (JSON decoded into
+dicts), then measures how much memory the listing retains as raw dicts
+versus TaskRecord objects, and how long formatting takes on each. Runs
+offline.
+
+Usage: python tests/bench_task_records.py [--tasks 10000] [--messages 5]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_formatting import make_tasks
+from tool import TaskRecord, Tools
+
+
+def retained_mb(build) -> tuple:
+    """Return (object, MB still allocated after build() returns)."""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current / (1024 * 1024)
+
+
+def timed_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tools = Tools()
+    payload = json.dumps({"tasks": make_tasks(args.tasks, args.messages)})
+
+    dicts, dicts_mb = retained_mb(lambda: json.loads(payload)["tasks"])
+    records, records_mb = retained_mb(
+        lambda: [TaskRecord.from_api(t) for t in json.loads(payload)["tasks"]]
+    )
+
+    print("=" * 60)
+    print(f"Task record benchmark ({args.tasks} tasks, {args.messages} messages each)")
+    print("=" * 60)
+    print(f"{'retained, raw dicts':<35} {dicts_mb:9.2f} MB")
+    print(f"{'retained, TaskRecord':<35} {records_mb:9.2f} MB")
+    print(f"{'reduction':<35} {dicts_mb / records_mb:9.1f}x")
+
+    parse_ms = timed_ms(lambda: [TaskRecord.from_api(t) for t in dicts], args.repeat)
+    dict_format_ms = timed_ms(lambda: tools._format_task_list(dicts), args.repeat)
+    record_format_ms = timed_ms(lambda: tools._format_task_list(records), args.repeat)
+    print(f"{'parse into records':<35} {parse_ms:9.2f} ms")
+    print(f"{'format from dicts (parse + render)':<35} {dict_format_ms:9.2f} ms")
+    print(f"{'format from records':<35} {record_format_ms:9.2f} ms")
+
+    identical = tools._format_task_list(dicts) == tools._format_task_list(records)
+    print(f"Output identical for dicts and records: {identical}")
+    return identical and records_mb < dicts_mb
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
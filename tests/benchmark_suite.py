@@ -0,0 +1,302 @@
+"""Offline benchmark suite for the ByteBot tool against the fake ByteBot server.
+
+Scenarios:
+    submit      - execute_task(wait_for_completion=False) throughput
+    polling     - HTTP requests and client CPU per waited task
+    detection   - delay between task completion and the tool returning
+    listing     - list_tasks() wall time and formatting cost on large pages
+    upload      - peak Python memory while uploading files
+
+Results are written as JSON so runs can be compared:
+
+    python tests/benchmark_suite.py --output bench_results.json
+    python tests/benchmark_suite.py --compare bench_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def make_tools(server: FakeByteBot) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = server.url
+    tools.user_valves.notification_verbosity = "minimal"
+    return tools
+
+
+async def close_tools(tools: Tools):
+    await tools._aclose()
+
+
+async def bench_submit(args) -> dict:
+    """Throughput of fire-and-return task submissions."""
+    config = FakeByteBotConfig(latency=args.latency, task_duration=60, seed=1)
+    async with FakeByteBot(config) as server:
+        tools = make_tools(server)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def submit(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                result = await tools.execute_task(
+                    f"Benchmark submission {i}", wait_for_completion=False
+                )
+                latencies.append(time.perf_counter() - start)
+                assert "Task ID" in result, result
+
+        start = time.perf_counter()
+        await asyncio.gather(*(submit(i) for i in range(args.submit_tasks)))
+        elapsed = time.perf_counter() - start
+        await close_tools(tools)
+
+    return {
+        "tasks": args.submit_tasks,
+        "concurrency": args.concurrency,
+        "throughput_per_s": args.submit_tasks / elapsed,
+        "latency_p50_ms": percentile(latencies, 0.5) * 1000,
+        "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+async def bench_polling(args) -> dict:
+    """Requests and CPU spent per task while waiting for completion."""
+    config = FakeByteBotConfig(
+        latency=args.latency,
+        task_duration=args.task_duration,
+        messages_per_task=args.messages,
+        seed=2,
+    )
+    async with FakeByteBot(config) as server:
+        tools = make_tools(server)
+        cpu_start = time.process_time()
+        results = await asyncio.gather(
+            *(
+                tools.execute_task(f"Polling benchmark {i}", wait_for_completion=True)
+                for i in range(args.poll_tasks)
+            )
+        )
+        cpu = time.process_time() - cpu_start
+        polls = server.request_counts["GET /tasks/{id}"]
+        await close_tools(tools)
+
+    completed = sum("Task Completed" in r for r in results)
+    return {
+        "tasks": args.poll_tasks,
+        "task_duration_s": args.task_duration,
+        "completed": completed,
+        "polls_per_task": polls / args.poll_tasks,
+        "client_cpu_ms_per_task": cpu / args.poll_tasks * 1000,
+    }
+
+
+async def bench_detection(args) -> dict:
+    """Time between a task reaching its terminal state and the tool noticing."""
+    config = FakeByteBotConfig(latency=args.latency, task_duration=0, seed=3)
+    async with FakeByteBot(config) as server:
+        tools = make_tools(server)
+        lags = []
+
+        async def run(duration: float):
+            task = server.add_task("Detection benchmark", duration=duration)
+            await tools._poll_task_completion(task["id"])
+            lags.append(time.time() - server.completed_at(task["id"]))
+
+        durations = [
+            args.task_duration * (1 + i / args.detect_tasks)
+            for i in range(args.detect_tasks)
+        ]
+        await asyncio.gather(*(run(d) for d in durations))
+        await close_tools(tools)
+
+    return {
+        "tasks": args.detect_tasks,
+        "lag_mean_s": statistics.mean(lags),
+        "lag_p50_s": percentile(lags, 0.5),
+        "lag_max_s": max(lags),
+    }
+
+
+async def bench_listing(args) -> dict:
+    """End-to-end list_tasks() time and pure formatting time on large pages."""
+    config = FakeByteBotConfig(latency=args.latency, seed=4)
+    async with FakeByteBot(config) as server:
+        server.preload(args.list_tasks)
+        tools = make_tools(server)
+
+        wall = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = await tools.list_tasks(limit=args.list_tasks)
+            wall.append(time.perf_counter() - start)
+        assert "Recent Tasks" in result, result[:200]
+
+        page = await tools._retry_request(
+            "GET", f"{server.url}/tasks", params={"limit": str(args.list_tasks)}
+        )
+        tasks = page["tasks"]
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            tools._format_task_list(tasks)
+        format_ms = (time.perf_counter() - start) / args.repeat * 1000
+        await close_tools(tools)
+
+    return {
+        "tasks_per_page": args.list_tasks,
+        "list_tasks_p50_ms": percentile(wall, 0.5) * 1000,
+        "format_ms": format_ms,
+    }
+
+
+async def bench_upload(args) -> dict:
+    """Peak traced memory while uploading a batch of files."""
+    config = FakeByteBotConfig(latency=args.latency, task_duration=60, seed=5)
+    file_bytes = int(args.upload_mb * 1024 * 1024)
+    files = [
+        SimpleNamespace(
+            filename=f"file_{i}.bin",
+            data={"content": os.urandom(file_bytes)},
+            meta={"content_type": "application/octet-stream"},
+        )
+        for i in range(args.upload_files)
+    ]
+    payload_bytes = file_bytes * args.upload_files
+
+    async with FakeByteBot(config) as server:
+        tools = make_tools(server)
+        await tools._get_session()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = await tools.execute_task_with_files(
+            "Upload benchmark", wait_for_completion=False, __files__=files
+        )
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await close_tools(tools)
+
+    assert "Task ID" in result, result
+    return {
+        "files": args.upload_files,
+        "payload_mb": payload_bytes / (1024 * 1024),
+        "peak_memory_mb": peak / (1024 * 1024),
+        "peak_to_payload_ratio": peak / payload_bytes if payload_bytes else 0,
+        "upload_s": elapsed,
+    }
+
+
+SCENARIOS = {
+    "submit": bench_submit,
+    "polling": bench_polling,
+    "detection": bench_detection,
+    "listing": bench_listing,
+    "upload": bench_upload,
+}
+
+# Metrics where a larger value is better; everything else is lower-is-better
+HIGHER_IS_BETTER = {"throughput_per_s", "completed"}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print per-metric deltas; return False if any metric regressed past threshold."""
+    ok = True
+    print("=" * 60)
+    print(f"Comparison against baseline (threshold {threshold:.0%})")
+    print("=" * 60)
+    for scenario, metrics in current["results"].items():
+        base = baseline.get("results", {}).get(scenario)
+        if not base:
+            continue
+        for name, value in metrics.items():
+            old = base.get(name)
+            if (
+                not isinstance(value, (int, float))
+                or not isinstance(old, (int, float))
+                or not old
+            ):
+                continue
+            change = (value - old) / old
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = "REGRESSION" if worse > threshold else ""
+            if flag:
+                ok = False
+            print(
+                f"{scenario}.{name:<28} {old:12.3f} -> {value:12.3f} ({change:+.1%}) {flag}"
+            )
+    return ok
+
+
+async def main() -> bool:
+    parser = argparse.ArgumentParser(description="ByteBot tool offline benchmarks")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--submit-tasks", type=int, default=500)
+    parser.add_argument("--poll-tasks", type=int, default=20)
+    parser.add_argument("--detect-tasks", type=int, default=10)
+    parser.add_argument("--task-duration", type=float, default=3.0)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--list-tasks", type=int, default=1000)
+    parser.add_argument("--upload-files", type=int, default=5)
+    parser.add_argument("--upload-mb", type=float, default=4.0)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenarios.split(","):
+        name = name.strip()
+        print(f"Running {name}...")
+        results[name] = await SCENARIOS[name](args)
+        for key, value in results[name].items():
+            print(
+                f"  {key:<28} {value:.3f}"
+                if isinstance(value, float)
+                else f"  {key:<28} {value}"
+            )
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": results,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        return compare(report, baseline, args.threshold)
+    return True
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
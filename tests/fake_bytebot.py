@@ -0,0 +1,353 @@
+"""In-process fake ByteBot agent API for offline tests and benchmarks.
+
+Implements the subset of the ByteBot agent API used by the tool:
+
+    POST   /tasks          create a task (JSON or multipart with files)
+    GET    /tasks          paginated task list (page, limit, status)
+    GET    /tasks/{id}     task details with messages
+    DELETE /tasks/{id}     cancel a task (204, or 200 with a text body)
+
+Latency, task duration, failure injection and payload size are configurable.
+
+Usage as a library:
+
+    async with FakeByteBot(FakeByteBotConfig(task_duration=1.0)) as server:
+        tools.valves.bytebot_url = server.url
+
+Usage standalone: python tests/fake_bytebot.py --port 9991 --task-duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+PRIORITIES = ["LOW", "MEDIUM", "HIGH", "URGENT"]
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "CANCELLED"}
+
+
+@dataclass
+class FakeByteBotConfig:
+    """Behaviour knobs for the fake server."""
+
+    latency: float = 0.0  # Base latency added to every response (seconds)
+    latency_jitter: float = 0.0  # Uniform random extra latency (seconds)
+    task_duration: float = 2.0  # Time from creation to terminal state (seconds)
+    error_rate: float = 0.0  # Probability of answering any request with HTTP 500
+    task_failure_rate: float = 0.0  # Probability a task ends FAILED
+    needs_help_rate: float = 0.0  # Probability a task ends NEEDS_HELP
+    messages_per_task: int = 5  # Messages in a finished task
+    message_size: int = 120  # Characters per message text block
+    supports_status_filter: bool = True  # Honour ?status= on GET /tasks
+    delete_status: int = 204  # 200 answers DELETE with a plain-text body
+    seed: Optional[int] = None
+
+
+def _iso(ts: float) -> str:
+    return (
+        datetime.fromtimestamp(ts, tz=timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+class FakeByteBot:
+    """Fake ByteBot agent server running inside the current event loop."""
+
+    def __init__(self, config: Optional[FakeByteBotConfig] = None, port: int = 0):
+        self.config = config or FakeByteBotConfig()
+        self.port = port
+        self.tasks: Dict[str, dict] = {}
+        self.order: List[str] = []  # Newest first, like ByteBot
+        self.request_counts: Counter = Counter()
+        self.bytes_received = 0
+        self._random = random.Random(self.config.seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    # -- lifecycle -----------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def build_app(self) -> web.Application:
+        app = web.Application(client_max_size=1024**3)
+        app.add_routes(
+            [
+                web.post("/tasks", self.handle_create),
+                web.get("/tasks", self.handle_list),
+                web.get("/tasks/{task_id}", self.handle_get),
+                web.delete("/tasks/{task_id}", self.handle_delete),
+            ]
+        )
+        return app
+
+    async def start(self) -> "FakeByteBot":
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeByteBot":
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # -- task model ----------------------------------------------------------
+
+    def add_task(
+        self,
+        description: str,
+        priority: str = "MEDIUM",
+        model: Optional[dict] = None,
+        created: Optional[float] = None,
+        duration: Optional[float] = None,
+        outcome: Optional[str] = None,
+        files: int = 0,
+    ) -> dict:
+        """Register a task; its status is derived from the clock on access."""
+        created = time.time() if created is None else created
+        duration = self.config.task_duration if duration is None else duration
+        if outcome is None:
+            roll = self._random.random()
+            if roll < self.config.task_failure_rate:
+                outcome = "FAILED"
+            elif roll < self.config.task_failure_rate + self.config.needs_help_rate:
+                outcome = "NEEDS_HELP"
+            else:
+                outcome = "COMPLETED"
+
+        task = {
+            "id": str(uuid.uuid4()),
+            "description": description,
+            "priority": priority,
+            "type": "IMMEDIATE",
+            "control": "ASSISTANT",
+            "model": model,
+            "files": files,
+            "_created": created,
+            "_completes": created + duration,
+            "_outcome": outcome,
+            "_cancelled_at": None,
+        }
+        self.tasks[task["id"]] = task
+        self.order.insert(0, task["id"])
+        return task
+
+    def preload(self, count: int, age_seconds: float = 86400.0):
+        """Add finished historical tasks for listing benchmarks."""
+        now = time.time()
+        models = [
+            {"name": "openai/Qwen3-VL-32B-Instruct", "title": "Qwen3-VL-32B-Instruct"},
+            {"name": "openai/Browser-Use", "title": "Browser-Use"},
+        ]
+        for i in range(count):
+            created = now - age_seconds + i * (age_seconds / max(count, 1))
+            self.add_task(
+                f"Historical task {i}",
+                priority=PRIORITIES[i % len(PRIORITIES)],
+                model=dict(
+                    models[i % len(models)], provider="proxy", contextWindow=128000
+                ),
+                created=created,
+                duration=self._random.uniform(5, 600),
+            )
+        self.order.sort(key=lambda tid: self.tasks[tid]["_created"], reverse=True)
+
+    def status_of(self, task: dict, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        if task["_cancelled_at"] is not None:
+            return "CANCELLED"
+        if now >= task["_completes"]:
+            return task["_outcome"]
+        if now - task["_created"] < 0.1 * (task["_completes"] - task["_created"]):
+            return "PENDING"
+        return "IN_PROGRESS"
+
+    def completed_at(self, task_id: str) -> Optional[float]:
+        """Wall-clock time the task reached its terminal state."""
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None
+        if task["_cancelled_at"] is not None:
+            return task["_cancelled_at"]
+        return task["_completes"]
+
+    def render(self, task: dict, include_messages: bool) -> dict:
+        now = time.time()
+        status = self.status_of(task, now)
+        if status in TERMINAL_STATUSES or status == "NEEDS_HELP":
+            updated = self.completed_at(task["id"])
+        else:
+            updated = now
+        data = {k: v for k, v in task.items() if not k.startswith("_")}
+        data["status"] = status
+        data["createdAt"] = _iso(task["_created"])
+        data["updatedAt"] = _iso(updated)
+        if include_messages:
+            data["messages"] = self._messages(task, status, now)
+        return data
+
+    def _messages(self, task: dict, status: str, now: float) -> List[dict]:
+        total = self.config.messages_per_task
+        span = max(task["_completes"] - task["_created"], 1e-6)
+        progress = min(1.0, max(0.0, (now - task["_created"]) / span))
+        count = total if status != "IN_PROGRESS" else max(1, int(total * progress))
+        filler = "x" * max(0, self.config.message_size - 20)
+        messages = [
+            {
+                "id": f"{task['id']}-m{i}",
+                "role": "USER" if i == 0 else "ASSISTANT",
+                "content": [{"type": "text", "text": f"Step {i}: {filler}"}],
+            }
+            for i in range(count)
+        ]
+        if status == "FAILED" and messages:
+            messages[-1]["content"] = [
+                {"type": "text", "text": "Error: simulated failure"}
+            ]
+        return messages
+
+    # -- handlers ------------------------------------------------------------
+
+    async def _simulate(self, request: web.Request, route: str):
+        self.request_counts[route] += 1
+        self.bytes_received += request.content_length or 0
+        delay = self.config.latency
+        if self.config.latency_jitter:
+            delay += self._random.uniform(0, self.config.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.config.error_rate and self._random.random() < self.config.error_rate:
+            raise web.HTTPInternalServerError(text="Injected failure")
+
+    async def handle_create(self, request: web.Request) -> web.Response:
+        await self._simulate(request, "POST /tasks")
+        files = 0
+        if request.content_type == "application/json":
+            payload = await request.json()
+        else:
+            payload = {}
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "files":
+                    while await part.read_chunk():
+                        pass
+                    files += 1
+                else:
+                    payload[part.name] = await part.text()
+
+        if isinstance(payload.get("model"), str):
+            payload["model"] = json.loads(payload["model"])
+
+        if not payload.get("description"):
+            raise web.HTTPBadRequest(text="description is required")
+
+        task = self.add_task(
+            payload["description"],
+            priority=payload.get("priority", "MEDIUM"),
+            model=payload.get("model"),
+            files=files,
+        )
+        return web.json_response(self.render(task, include_messages=False), status=201)
+
+    async def handle_list(self, request: web.Request) -> web.Response:
+        await self._simulate(request, "GET /tasks")
+        page = max(1, int(request.query.get("page", "1")))
+        limit = max(1, int(request.query.get("limit", "20")))
+        status = (
+            request.query.get("status") if self.config.supports_status_filter else None
+        )
+
+        now = time.time()
+        if status:
+            # Like ByteBot, one status value; "A,B" matches nothing
+            ids = [
+                tid
+                for tid in self.order
+                if self.status_of(self.tasks[tid], now) == status
+            ]
+        else:
+            ids = self.order
+
+        total = len(ids)
+        start = (page - 1) * limit
+        tasks = [
+            self.render(self.tasks[tid], include_messages=False)
+            for tid in ids[start : start + limit]
+        ]
+        return web.json_response(
+            {
+                "tasks": tasks,
+                "total": total,
+                "totalPages": max(1, -(-total // limit)),
+            }
+        )
+
+    async def handle_get(self, request: web.Request) -> web.Response:
+        await self._simulate(request, "GET /tasks/{id}")
+        task = self.tasks.get(request.match_info["task_id"])
+        if task is None:
+            raise web.HTTPNotFound(text="Task not found")
+        return web.json_response(self.render(task, include_messages=True))
+
+    async def handle_delete(self, request: web.Request) -> web.Response:
+        await self._simulate(request, "DELETE /tasks/{id}")
+        task = self.tasks.get(request.match_info["task_id"])
+        if task is None:
+            raise web.HTTPNotFound(text="Task not found")
+        if self.status_of(task) not in TERMINAL_STATUSES:
+            task["_cancelled_at"] = time.time()
+        if self.config.delete_status == 200:
+            return web.Response(text="Task cancelled")
+        return web.Response(status=self.config.delete_status)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake ByteBot agent API")
+    parser.add_argument("--port", type=int, default=9991)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--task-duration", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--task-failure-rate", type=float, default=0.0)
+    parser.add_argument("--messages-per-task", type=int, default=5)
+    parser.add_argument("--message-size", type=int, default=120)
+    parser.add_argument("--preload", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeByteBot(
+        FakeByteBotConfig(
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            task_duration=args.task_duration,
+            error_rate=args.error_rate,
+            task_failure_rate=args.task_failure_rate,
+            messages_per_task=args.messages_per_task,
+            message_size=args.message_size,
+        ),
+        port=args.port,
+    )
+    server.preload(args.preload)
+    print(f"Fake ByteBot listening on http://127.0.0.1:{args.port}")
+    web.run_app(server.build_app(), host="127.0.0.1", port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""Concurrent-user load generator and soak-test harness for the ByteBot tool.
+
+Drives one shared Tools instance (as OpenWebUI does) with many simultaneous
+callers against a fake ByteBot, then reports throughput, latency
+percentiles per method, open sockets and memory growth over time.
+
+Examples:
+
+    # 200 closed-loop users for 60s with the default traffic mix
+    python tests/load_test.py --users 200 --duration 60
+
+    # Open-loop Poisson arrivals at 150 calls/s, 30 minute soak
+    python tests/load_test.py --rate 150 --duration 1800 --sample-interval 30
+
+    # Against a standalone fake: python tests/fake_bytebot.py --port 9991
+    python tests/load_test.py --url http://127.0.0.1:9991
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse 'execute=1,status=6,list=3' into normalised weights."""
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    total = sum(weights.values())
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def open_sockets() -> Optional[int]:
+    """Count socket file descriptors of this process (Linux only)."""
+    fd_dir = "/proc/self/fd"
+    if not os.path.isdir(fd_dir):
+        return None
+    count = 0
+    for fd in os.listdir(fd_dir):
+        try:
+            if os.readlink(os.path.join(fd_dir, fd)).startswith("socket:"):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def rss_mb() -> Optional[float]:
+    """Resident set size in MB (Linux only)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LoadRun:
+    """Shared state for one load-test run."""
+
+    def __init__(self, tools: Tools, args):
+        self.tools = tools
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.task_ids: List[str] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.samples: List[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.random = random.Random(args.seed)
+
+    def pick_operation(self) -> str:
+        roll = self.random.random()
+        cumulative = 0.0
+        for name, weight in self.mix.items():
+            cumulative += weight
+            if roll <= cumulative:
+                return name
+        return name
+
+    async def call(self, operation: str):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        start = time.perf_counter()
+        try:
+            result = await OPERATIONS[operation](self)
+            failed = (
+                result.startswith(("Error", "Unexpected error"))
+                or "failed" in result[:80]
+            )
+        except Exception:
+            failed = True
+        finally:
+            self.in_flight -= 1
+        self.latencies[operation].append(time.perf_counter() - start)
+        if failed:
+            self.errors[operation] += 1
+
+    def sample(self, started: float):
+        current, _ = tracemalloc.get_traced_memory()
+        self.samples.append(
+            {
+                "t": time.perf_counter() - started,
+                "calls": sum(len(v) for v in self.latencies.values()),
+                "in_flight": self.in_flight,
+                "sockets": open_sockets(),
+                "traced_mb": current / (1024 * 1024),
+                "rss_mb": rss_mb(),
+            }
+        )
+
+
+async def op_execute(run: LoadRun) -> str:
+    result = await run.tools.execute_task(
+        f"Load test task {run.random.randint(0, 10**9)}",
+        priority=run.random.choice(["LOW", "MEDIUM", "HIGH"]),
+        wait_for_completion=run.args.execute_wait,
+    )
+    marker = "**Task ID:** `"
+    if marker in result:
+        task_id = result.split(marker, 1)[1].split("`", 1)[0]
+        run.task_ids.append(task_id)
+        if len(run.task_ids) > 10000:
+            del run.task_ids[:5000]
+    return result
+
+
+async def op_status(run: LoadRun) -> str:
+    if not run.task_ids:
+        return await op_list(run)
+    return await run.tools.get_task_status(run.random.choice(run.task_ids))
+
+
+async def op_list(run: LoadRun) -> str:
+    return await run.tools.list_tasks(limit=run.args.list_limit)
+
+
+async def op_active(run: LoadRun) -> str:
+    return await run.tools.list_active_tasks()
+
+
+OPERATIONS = {
+    "execute": op_execute,
+    "status": op_status,
+    "list": op_list,
+    "active": op_active,
+}
+
+
+async def closed_loop(run: LoadRun, deadline: float):
+    """Each simulated user issues a call, thinks, and repeats."""
+
+    async def user():
+        while time.perf_counter() < deadline:
+            await run.call(run.pick_operation())
+            if run.args.think_time:
+                await asyncio.sleep(run.random.expovariate(1 / run.args.think_time))
+
+    await asyncio.gather(*(user() for _ in range(run.args.users)))
+
+
+async def open_loop(run: LoadRun, deadline: float):
+    """Poisson arrivals at --rate, capped at --users concurrent calls."""
+    pending = set()
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(run.random.expovariate(run.args.rate))
+        if run.in_flight >= run.args.users:
+            run.errors["dropped"] += 1
+            continue
+        task = asyncio.ensure_future(run.call(run.pick_operation()))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def sampler(run: LoadRun, started: float, stop: asyncio.Event):
+    while not stop.is_set():
+        run.sample(started)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=run.args.sample_interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+def report(
+    run: LoadRun,
+    elapsed: float,
+    baseline_sockets: Optional[int],
+    session: aiohttp.ClientSession,
+):
+    total_calls = sum(len(v) for v in run.latencies.values())
+    print("=" * 72)
+    print("LOAD TEST RESULTS")
+    print("=" * 72)
+    mode = (
+        f"open loop {run.args.rate}/s"
+        if run.args.rate
+        else f"closed loop, {run.args.users} users"
+    )
+    print(f"Mode: {mode}   Duration: {elapsed:.1f}s   Mix: {run.args.mix}")
+    print(f"Calls: {total_calls}   Throughput: {total_calls / elapsed:.1f} calls/s")
+    print(f"Max concurrent calls: {run.max_in_flight}")
+    if run.errors.get("dropped"):
+        print(f"Arrivals dropped at concurrency cap: {run.errors['dropped']}")
+    print()
+    print(
+        f"{'operation':<10} {'calls':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    )
+    for name, values in sorted(run.latencies.items()):
+        print(
+            f"{name:<10} {len(values):>7} {run.errors.get(name, 0):>7} "
+            f"{percentile(values, 0.5) * 1000:>9.1f} {percentile(values, 0.95) * 1000:>9.1f} "
+            f"{percentile(values, 0.99) * 1000:>9.1f} {max(values) * 1000:>9.1f}"
+        )
+
+    print()
+    print(
+        f"{'t (s)':>8} {'calls':>8} {'in-flight':>10} {'sockets':>8} {'traced MB':>10} {'RSS MB':>8}"
+    )
+    for s in run.samples:
+        print(
+            f"{s['t']:>8.1f} {s['calls']:>8} {s['in_flight']:>10} {str(s['sockets']):>8} "
+            f"{s['traced_mb']:>10.2f} {(s['rss_mb'] or 0):>8.1f}"
+        )
+
+    if len(run.samples) >= 2:
+        first, last = run.samples[0], run.samples[-1]
+        print()
+        print(f"Traced memory growth: {last['traced_mb'] - first['traced_mb']:+.2f} MB")
+        if first["rss_mb"] and last["rss_mb"]:
+            print(f"RSS growth: {last['rss_mb'] - first['rss_mb']:+.1f} MB")
+
+    lingering = open_sockets()
+    print()
+    print("Resource check after all calls finished:")
+    print(f"  Tools session open: {not session.closed}")
+    if lingering is not None and baseline_sockets is not None:
+        print(f"  Sockets above baseline: {lingering - baseline_sockets}")
+
+
+async def main() -> bool:
+    parser = argparse.ArgumentParser(description="ByteBot tool load and soak tests")
+    parser.add_argument(
+        "--url", help="Existing (fake) ByteBot URL; default starts one in-process"
+    )
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=200,
+        help="Concurrent users (cap in open-loop mode)",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="Open-loop arrival rate (calls/s)"
+    )
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=0.5,
+        help="Mean think time between calls (s)",
+    )
+    parser.add_argument("--mix", default="execute=1,status=6,list=2,active=1")
+    parser.add_argument(
+        "--execute-wait",
+        action="store_true",
+        help="Wait for completion in execute_task",
+    )
+    parser.add_argument("--list-limit", type=int, default=20)
+    parser.add_argument("--sample-interval", type=float, default=5.0)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.005,
+        help="In-process fake server latency (s)",
+    )
+    parser.add_argument("--task-duration", type=float, default=10.0)
+    parser.add_argument("--preload", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = FakeByteBot(
+            FakeByteBotConfig(
+                latency=args.latency, task_duration=args.task_duration, seed=args.seed
+            )
+        )
+        server.preload(args.preload)
+        await server.start()
+        url = server.url
+
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.user_valves.notification_verbosity = "minimal"
+
+    gc.collect()
+    tracemalloc.start()
+    baseline_sockets = open_sockets()
+    run = LoadRun(tools, args)
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    sampling = asyncio.ensure_future(sampler(run, started, stop))
+
+    deadline = started + args.duration
+    try:
+        if args.rate:
+            await open_loop(run, deadline)
+        else:
+            await closed_loop(run, deadline)
+    finally:
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        run.sample(started)
+        stop.set()
+        await sampling
+
+    session = await tools._get_session()  # The session every call shared
+    report(run, elapsed, baseline_sockets, session)
+    tracemalloc.stop()
+
+    await tools._aclose()
+    if server:
+        await server.stop()
+
+    total_calls = sum(len(v) for v in run.latencies.values())
+    total_errors = sum(v for k, v in run.errors.items() if k != "dropped")
+    return total_calls > 0 and total_errors == 0
+
+
+if __name__ == "__main__":
+    success = asyncio.run(main())
+    sys.exit(0 if success else 1)
@@ -0,0 +1,100 @@
+"""
+Offline tests for the tool's background loops (keep-alive pings, health
+probes) and their shutdown, against the in-process fake ByteBot.
+
+Run directly (python tests/test_background_lifecycle.py) or with pytest.
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import weakref
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+
+def make_tools(url: str) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.valves.prewarm_connections = True
+    tools.valves.keepalive_ping_interval_seconds = 1
+    tools.valves.health_monitor_enabled = True
+    tools.valves.health_monitor_interval_seconds = 1
+    return tools
+
+
+def test_construction_starts_no_background_work():
+    async def run() -> tuple:
+        before = asyncio.all_tasks()
+        tools = Tools()
+        tools.valves.prewarm_connections = True
+        await asyncio.sleep(0.1)
+        return tools._background_tasks, asyncio.all_tasks() - before
+
+    background, spawned = asyncio.run(run())
+    assert not background
+    assert not spawned
+
+
+def test_first_call_starts_background_work():
+    async def run() -> tuple:
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(5)
+            tools = make_tools(server.url)  # Valves set after construction
+            await tools.list_tasks()
+            names = sorted(t.get_name() for t in tools._background_tasks)
+            await asyncio.sleep(0.1)
+            pings = server.request_counts["GET /tasks"]
+            await tools._aclose()
+            return names, pings
+
+    names, pings = asyncio.run(run())
+    assert names == ["bytebot-health", "bytebot-keepalive"]
+    assert pings > 1
+
+
+def test_close_stops_loops_and_closes_session():
+    async def run() -> tuple:
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(5)
+            tools = make_tools(server.url)
+            await tools.list_tasks()
+            tasks = list(tools._background_tasks)
+            session = tools._session
+            await tools._aclose()
+            return tasks, session, tools._session
+
+    tasks, session, after = asyncio.run(run())
+    assert tasks and all(task.done() for task in tasks)
+    assert session.closed
+    assert after is None
+
+
+def test_loops_end_when_tools_is_dropped():
+    async def run() -> tuple:
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(5)
+            tools = make_tools(server.url)
+            await tools.list_tasks()
+            tasks = list(tools._background_tasks)
+            ref = weakref.ref(tools)
+            del tools
+            await asyncio.sleep(1.5)  # Past one interval of each loop
+            gc.collect()
+            return tasks, ref
+
+    tasks, ref = asyncio.run(run())
+    assert ref() is None, "Background loops kept the Tools object alive"
+    assert tasks and all(task.done() for task in tasks)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,97 @@
+"""
+Offline tests for cancel_tasks against the in-process fake ByteBot.
+
+Run directly (python tests/test_cancel_tasks.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+
+def run_cancel(config: FakeByteBotConfig, running: int, **kwargs) -> tuple:
+    async def run():
+        async with FakeByteBot(config) as server:
+            ids = [
+                server.add_task(f"running task {i}", duration=600)["id"]
+                for i in range(running)
+            ]
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            if kwargs.pop("by_id", False):
+                kwargs["task_ids"] = ids + ["missing-task"]
+            result = await tools.cancel_tasks(__user__={"id": "u1"}, **kwargs)
+            cancelled = [i for i in ids if server.tasks[i]["_cancelled_at"]]
+            return result, ids, cancelled
+
+    return asyncio.run(run())
+
+
+def test_cancel_by_ids_reports_outcomes():
+    result, ids, cancelled = run_cancel(FakeByteBotConfig(), 3, by_id=True)
+    assert cancelled == ids
+    assert "3 cancelled" in result
+    assert "1 not found" in result
+
+
+def test_ids_over_max_tasks_are_reported():
+    result, ids, cancelled = run_cancel(FakeByteBotConfig(), 4, by_id=True, max_tasks=2)
+    assert cancelled == ids[:2]
+    assert "**Skipped (over max_tasks=2):**" in result
+    for task_id in ids[2:] + ["missing-task"]:
+        assert f"`{task_id}`" in result.split("**Skipped")[1]
+
+
+def test_text_delete_acknowledgement_counts_as_cancelled():
+    result, ids, cancelled = run_cancel(
+        FakeByteBotConfig(delete_status=200), 2, status="PENDING,IN_PROGRESS"
+    )
+    assert cancelled == ids
+    assert "2 cancelled" in result
+    assert "failed" not in result
+
+
+def test_dry_run_cancels_nothing():
+    result, ids, cancelled = run_cancel(
+        FakeByteBotConfig(), 2, description_contains="running", dry_run=True
+    )
+    assert cancelled == []
+    assert "2 would cancel" in result
+
+
+def test_filter_queries_one_status_at_a_time_newest_first():
+    async def run(config: FakeByteBotConfig, probe_filter: bool) -> tuple:
+        async with FakeByteBot(config) as server:
+            now = time.time()
+            server.add_task("oldest", created=now - 100, duration=600)
+            helper = server.add_task(
+                "helper", created=now - 50, duration=1, outcome="NEEDS_HELP"
+            )
+            newest = server.add_task("newest", created=now - 10, duration=600)
+            server.add_task("done", created=now - 5, duration=1)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            if probe_filter:
+                await tools._get_status_counts()
+            found = await tools._find_tasks(None, None, None, None, 2)
+            return [t["id"] for t in found], [newest["id"], helper["id"]]
+
+    for supported in (True, False):
+        config = FakeByteBotConfig(supports_status_filter=supported)
+        for probe_filter in (False, True):
+            found, expected = asyncio.run(run(config, probe_filter))
+            assert found == expected, (supported, probe_filter)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,58 @@
+"""
+Offline tests for check_connection diagnostics against the fake ByteBot.
+
+Run directly (python tests/test_check_connection.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+
+def run_check(patch=None) -> tuple:
+    async def run():
+        async with FakeByteBot(FakeByteBotConfig(latency=0.01)) as server:
+            server.preload(20)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            tools.valves.diagnostics_samples = 4
+            if patch:
+                patch(tools)
+            return await tools.check_connection(), server.request_counts
+
+    return asyncio.run(run())
+
+
+def test_reports_counts_and_latency():
+    result, requests = run_check()
+    assert "Connection successful" in result
+    assert "Total tasks (all time): 20" in result
+    assert "| ByteBot /tasks | 4 |" in result
+    assert "| ByteBot task list | 2 |" in result
+    assert requests["GET /tasks"] >= 7
+
+
+def test_probe_failure_is_a_diagnostics_line():
+    def patch(tools):
+        async def broken():
+            raise RuntimeError("probe exploded")
+
+        tools._run_latency_probes = broken
+
+    result, _ = run_check(patch)
+    assert "Connection successful" in result
+    assert "Latency probes failed: probe exploded" in result
+    assert "**Configuration:**" in result
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
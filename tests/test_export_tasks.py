@@ -0,0 +1,170 @@
+"""
+Offline tests for export_tasks() paging and file output.
+
+Run directly (python tests/test_export_tasks.py) or with pytest.
+"""
+
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+
+def make_tools(url: str, directory: str) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.valves.export_dir = directory
+    tools.valves.export_prefetch_pages = 3
+    return tools
+
+
+def exported_path(result: str) -> str:
+    return result.split("**File:** `", 1)[1].split("`", 1)[0]
+
+
+def test_ndjson_export_writes_every_task():
+    async def run(directory: str):
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(350)
+            tools = make_tools(server.url, directory)
+            try:
+                return await tools.export_tasks(), len(server.tasks)
+            finally:
+                await tools._aclose()
+
+    with tempfile.TemporaryDirectory() as directory:
+        result, total = asyncio.run(run(directory))
+        with open(exported_path(result), encoding="utf-8") as f:
+            ids = [json.loads(line)["id"] for line in f]
+        assert len(ids) == total == 350
+        assert len(set(ids)) == total
+        assert not [n for n in os.listdir(directory) if n.endswith(".partial")]
+
+
+def test_csv_export_projects_columns():
+    async def run(directory: str):
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(120)
+            tools = make_tools(server.url, directory)
+            try:
+                return await tools.export_tasks("csv", fields="id,status")
+            finally:
+                await tools._aclose()
+
+    with tempfile.TemporaryDirectory() as directory:
+        result = asyncio.run(run(directory))
+        with open(exported_path(result), encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["id", "status"]
+        assert len(rows) == 121
+
+
+def test_stopping_early_reaps_prefetched_pages():
+    async def run():
+        tools = Tools()
+        in_flight = []
+
+        async def fake_request(method, url, emitter=None, params=None, **kwargs):
+            page = int(params["page"])
+            if page > 2:
+                in_flight.append(asyncio.current_task())
+                await asyncio.sleep(3600)  # Never answers
+            return {"tasks": [{"id": f"task-{page}"}], "totalPages": 10}
+
+        tools._retry_request = fake_request
+        pages = tools._iter_task_pages(page_size=1, prefetch=3)
+        await pages.__anext__()
+        await pages.__anext__()  # Leaves pages 3 and 4 in flight
+        await pages.aclose()
+        return [t.done() for t in in_flight]
+
+    assert asyncio.run(run()) == [True, True]
+
+
+def exported_ids(result: str) -> set:
+    with open(exported_path(result), encoding="utf-8") as f:
+        return {json.loads(line)["id"] for line in f}
+
+
+def epoch(*args) -> float:
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def test_since_without_offset_is_read_as_utc():
+    async def run(directory: str):
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.add_task("old", created=epoch(2024, 12, 31, 23), duration=1)
+            new = server.add_task("new", created=epoch(2025, 1, 1, 1), duration=1)
+            tools = make_tools(server.url, directory)
+            try:
+                results = [
+                    await tools.export_tasks(since=since)
+                    for since in ("2025-01-01", "2025-01-01T00:00:00")
+                ]
+            finally:
+                await tools._aclose()
+            return results, new["id"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        results, new_id = asyncio.run(run(directory))
+        for result in results:
+            assert "**Tasks:** 1" in result, result
+            assert exported_ids(result) == {new_id}
+
+
+def test_cursor_keeps_tasks_sharing_its_timestamp():
+    async def run(directory: str):
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            created = epoch(2025, 1, 1, 12)
+            first = server.add_task("first", created=created, duration=1)
+            tools = make_tools(server.url, directory)
+            try:
+                result = await tools.export_tasks()
+                cursor = result.split("**Next cursor:** `", 1)[1].split("`", 1)[0]
+                # Arrives after the export with the same createdAt
+                second = server.add_task("second", created=created, duration=1)
+                result = await tools.export_tasks(since=cursor)
+            finally:
+                await tools._aclose()
+            return result, {first["id"], second["id"]}
+
+    with tempfile.TemporaryDirectory() as directory:
+        result, ids = asyncio.run(run(directory))
+        assert exported_ids(result) == ids
+
+
+def test_status_filter_merges_single_status_queries():
+    async def run(directory: str):
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(150, age_seconds=150 * 1000)  # All finished
+            running = server.add_task(
+                "running", created=time.time() - 100, duration=600
+            )
+            failed = server.add_task("failed", duration=0, outcome="FAILED")
+            tools = make_tools(server.url, directory)
+            try:
+                result = await tools.export_tasks(status="in_progress, failed")
+            finally:
+                await tools._aclose()
+            return result, {running["id"], failed["id"]}
+
+    with tempfile.TemporaryDirectory() as directory:
+        result, ids = asyncio.run(run(directory))
+        assert exported_ids(result) == ids
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
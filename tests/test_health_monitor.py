@@ -0,0 +1,120 @@
+"""
+Offline tests for the health monitor and the adaptive timeouts and retry
+delays it drives.
+
+Run directly (python tests/test_health_monitor.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import HealthMonitor, Tools
+
+HOST = "http://bytebot:9991"
+URL = f"{HOST}/tasks/abc"
+
+
+def tools_with_samples(*rtts) -> Tools:
+    tools = Tools()
+    tools.valves.health_monitor_enabled = True
+    for rtt in rtts:
+        tools._health.record(HOST, rtt)
+    return tools
+
+
+def test_stats_track_latency_and_failures():
+    health = HealthMonitor()
+    for rtt in (0.1, 0.2, 0.3, None, None, None):
+        health.record(HOST, rtt)
+    stats = health.stats(HOST)
+    assert stats["samples"] == 6
+    assert stats["error_rate"] == 0.5
+    assert stats["consecutive_failures"] == 3
+    assert 0.1 <= stats["p50"] <= 0.3
+    assert not health.healthy(HOST)
+    health.record(HOST, 0.1)
+    assert health.healthy(HOST)
+    assert health.stats("http://other:1") is None
+
+
+def test_window_keeps_recent_samples_only():
+    health = HealthMonitor()
+    for _ in range(HealthMonitor.WINDOW):
+        health.record(HOST, 5.0)
+    for _ in range(HealthMonitor.WINDOW):
+        health.record(HOST, 0.01)
+    assert health.stats(HOST)["samples"] == HealthMonitor.WINDOW
+    assert health.stats(HOST)["p99"] == 0.01
+
+
+def test_adaptive_timeout_needs_samples_and_is_clamped():
+    assert tools_with_samples(0.5, 0.5, 0.5, 0.5)._adaptive_timeout(URL) is None
+    disabled = tools_with_samples(*[0.5] * 5)
+    disabled.valves.health_monitor_enabled = False
+    assert disabled._adaptive_timeout(URL) is None
+
+    # multiplier (4) x p99, clamped to [5s, 60s]
+    assert tools_with_samples(*[2.0] * 5)._adaptive_timeout(URL) == 8.0
+    assert tools_with_samples(*[0.01] * 5)._adaptive_timeout(URL) == 5.0
+    assert tools_with_samples(*[30.0] * 5)._adaptive_timeout(URL) == 60.0
+
+
+def test_retry_delay_grows_with_latency_and_errors():
+    cold = tools_with_samples()
+    assert [cold._retry_delay(URL, a) for a in range(3)] == [1.0, 2.0, 4.0]
+
+    slow = tools_with_samples(*[3.0] * 5)
+    assert [slow._retry_delay(URL, a) for a in range(3)] == [3.0, 6.0, 12.0]
+
+    flaky = tools_with_samples(*[3.0] * 5, None, None, None, None, None)
+    assert flaky._retry_delay(URL, 0) == 3.0 * 2  # error rate 50% doubles it
+    assert flaky._retry_delay(URL, 10) == 60.0  # capped
+
+
+def test_adaptive_timeout_only_applies_to_light_reads():
+    assert Tools._is_light_read("GET", f"{HOST}/tasks/abc")
+    assert Tools._is_light_read("GET", f"{HOST}/tasks?limit=1")
+    assert not Tools._is_light_read("GET", f"{HOST}/tasks", {"limit": "100"})
+    assert not Tools._is_light_read("POST", f"{HOST}/tasks")
+    assert not Tools._is_light_read("DELETE", f"{HOST}/tasks/abc")
+
+    async def run() -> tuple:
+        async with FakeByteBot(FakeByteBotConfig(latency=0.5)) as server:
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            tools.valves.max_retries = 1
+            tools.valves.health_monitor_enabled = True
+            tools.valves.adaptive_timeout_min_seconds = 0.2
+            tools.valves.adaptive_timeout_max_seconds = 0.2
+            for _ in range(5):
+                tools._health.record(server.url, 0.01)
+            try:
+                created = await tools._retry_request(
+                    "POST", f"{server.url}/tasks", json={"description": "slow"}
+                )
+                try:
+                    await tools._retry_request(
+                        "GET", f"{server.url}/tasks/{created['id']}"
+                    )
+                    read_timed_out = False
+                except asyncio.TimeoutError:
+                    read_timed_out = True
+            finally:
+                await tools._aclose()
+            return created, read_timed_out
+
+    created, read_timed_out = asyncio.run(run())
+    assert created.get("id")
+    assert read_timed_out
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,87 @@
+"""
+Offline tests for the execution log token budget.
+
+Run directly (python tests/test_log_budget.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools, _budget_log_lines, _estimate_tokens
+
+
+def log_tokens(text: str) -> int:
+    return sum(
+        _estimate_tokens(line) + 1
+        for line in text.splitlines()
+        if line.startswith("- ")
+    )
+
+
+def spelled(i: int) -> str:
+    """Step label without digits, so repeat collapsing keeps steps apart."""
+    return "".join("abcdefghij"[int(d)] for d in str(i))
+
+
+def test_long_log_is_streamed_within_budget():
+    consumed = []
+
+    def messages():
+        for i in range(100_000):
+            consumed.append(i)
+            text = f"Clicked {spelled(i)}" if i != 50_000 else "Error: page crashed"
+            yield {"role": "ASSISTANT", "content": [{"type": "text", "text": text}]}
+
+    lines = list(_budget_log_lines(messages(), 300))
+    assert len(consumed) == 100_000
+    assert lines[0] == "- Clicked a"
+    assert lines[-1] == "- Clicked jjjjj"
+    assert "- Error: page crashed" in lines
+    assert log_tokens("\n".join(lines)) <= 300
+
+
+def test_wait_for_tasks_shares_one_budget():
+    async def run():
+        config = FakeByteBotConfig(messages_per_task=200, message_size=120)
+        async with FakeByteBot(config) as server:
+            past = time.time() - 60
+            ids = [
+                server.add_task(f"task {i}", created=past, duration=1)["id"]
+                for i in range(4)
+            ]
+            render = server._messages
+
+            def distinct_messages(task, status, now):
+                messages = render(task, status, now)
+                for i, message in enumerate(messages):
+                    message["content"][0]["text"] += f" {spelled(i)}"
+                return messages
+
+            server._messages = distinct_messages
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            tools.valves.execution_log_token_budget = 400
+            try:
+                single = await tools.get_task_status(ids[0])
+                combined = await tools.wait_for_tasks(ids, timeout=10)
+            finally:
+                await tools._aclose()
+            return single, combined
+
+    single, combined = asyncio.run(run())
+    assert 300 < log_tokens(single) <= 400
+    assert combined.count("**Task Completed**") == 4
+    assert log_tokens(combined) <= 400 * 1.25
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,71 @@
+"""
+Offline tests for streaming task steps with MessageStream cursors.
+
+Run directly (python tests/test_message_stream.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool import EventEmitter, MessageStream, Tools
+
+
+def message(i: int, text: str = "", role: str = "ASSISTANT") -> dict:
+    return {
+        "id": f"m{i}",
+        "role": role,
+        "content": [{"type": "text", "text": text or f"Step {i}"}],
+    }
+
+
+def test_each_poll_returns_only_new_messages():
+    stream = MessageStream()
+    history = [message(0), message(1)]
+    assert stream.new_messages(history) == history
+    assert stream.new_messages(history) == []
+    history.append(message(2))
+    assert stream.new_messages(history) == [message(2)]
+
+
+def test_rewritten_history_resumes_after_last_seen_message():
+    stream = MessageStream()
+    stream.new_messages([message(0), message(1), message(2)])
+    # An earlier message was dropped: resume after m2, do not repeat it
+    assert stream.new_messages([message(0), message(2), message(3)]) == [message(3)]
+    # The last seen message is gone entirely: skip to the end
+    assert stream.new_messages([message(7), message(8)]) == []
+    assert stream.new_messages([message(7), message(8), message(9)]) == [message(9)]
+
+
+def test_streamed_steps_are_emitted_once_per_poll():
+    async def run() -> list:
+        events = []
+
+        async def capture(event):
+            events.append(event)
+
+        tools = Tools()
+        emitter = EventEmitter(capture)
+        stream = MessageStream()
+        history = [message(0, "Go", role="USER"), message(1, "Clicked login")]
+        await tools._stream_new_messages({"messages": history}, stream, emitter)
+        await tools._stream_new_messages({"messages": history}, stream, emitter)
+        history += [message(2, "Retry 1"), message(3, "Retry 2")]
+        await tools._stream_new_messages({"messages": history}, stream, emitter)
+        return [e["data"]["content"] for e in events if e["type"] == "message"]
+
+    contents = asyncio.run(run())
+    assert contents == [
+        "\n\n**Task progress:**\n- Clicked login\n",
+        "- Retry 1 (x2)\n",
+    ]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,131 @@
+"""
+Offline tests for the metrics registry, get_metrics() and the Prometheus
+text exposition.
+
+Run directly (python tests/test_metrics.py) or with pytest.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import MetricsRegistry, Tools
+
+SAMPLE_RE = re.compile(r"^([a-z_]+)(\{[^}]*\})? (\S+)$")
+
+
+def parse_exposition(text: str) -> tuple:
+    """Return ({family: type}, [(name, labels, value)]), checking the layout."""
+    types, helped, samples = {}, set(), []
+    for line in text.strip().splitlines():
+        if line.startswith("# HELP "):
+            helped.add(line.split()[2])
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name in helped, f"TYPE before HELP for {name}"
+            types[name] = kind
+        else:
+            match = SAMPLE_RE.match(line)
+            assert match, f"Malformed sample line: {line}"
+            name, labels, value = match.groups()
+            family = re.sub(r"_(bucket|sum|count)$", "", name)
+            assert family in types or name in types, f"No TYPE for {name}"
+            samples.append((name, labels or "", float(value)))
+    return types, samples
+
+
+def call_fake_server(**valves) -> tuple:
+    async def run():
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(5)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            for name, value in valves.items():
+                setattr(tools.valves, name, value)
+            try:
+                await tools.list_tasks()
+                exposition = await tools.get_metrics("prometheus")
+                summary = await tools.get_metrics()
+            finally:
+                await tools._aclose()
+            return tools, exposition, summary
+
+    return asyncio.run(run())
+
+
+def test_calls_update_counters_and_histograms():
+    tools, _, summary = call_fake_server()
+    labels = {"endpoint": "/tasks", "method": "GET", "status": "200"}
+    assert tools._metrics.counter_value("http_responses_total", **labels) == 1
+    (hist_labels, hist), *_ = tools._metrics.histograms("http_request_duration_seconds")
+    assert hist_labels == {"endpoint": "/tasks", "method": "GET"}
+    assert hist["count"] == 1 and hist["sum"] > 0
+    assert "/tasks" in summary
+
+
+def test_prometheus_exposition_is_well_formed():
+    _, exposition, _ = call_fake_server()
+    text = exposition.strip("`\n")
+    types, samples = parse_exposition(text)
+    prefix = MetricsRegistry.PREFIX
+    assert types[f"{prefix}http_responses_total"] == "counter"
+    assert types[f"{prefix}http_requests_in_flight"] == "gauge"
+    assert types[f"{prefix}http_request_duration_seconds"] == "histogram"
+
+    family = f"{prefix}http_request_duration_seconds"
+    buckets = [s for s in samples if s[0] == f"{family}_bucket"]
+    counts = [s[2] for s in buckets]
+    assert counts == sorted(counts), "Buckets must be cumulative"
+    assert 'le="+Inf"' in buckets[-1][1]
+    (total,) = [s[2] for s in samples if s[0] == f"{family}_count"]
+    assert buckets[-1][2] == total == 1
+    assert [s for s in samples if s[0] == f"{family}_sum"]
+
+
+def test_histogram_buckets_and_label_escaping():
+    metrics = MetricsRegistry()
+    for value in (0.003, 0.2, 0.2, 400):
+        metrics.observe("task_polls_per_task", value, endpoint='a"b\\c')
+    types, samples = parse_exposition(metrics.to_prometheus())
+    name = f"{MetricsRegistry.PREFIX}task_polls_per_task"
+    buckets = {s[1]: s[2] for s in samples if s[0] == f"{name}_bucket"}
+    assert buckets['{endpoint="a\\"b\\\\c",le="0.005"}'] == 1
+    assert buckets['{endpoint="a\\"b\\\\c",le="0.25"}'] == 3
+    assert buckets['{endpoint="a\\"b\\\\c",le="300"}'] == 3
+    assert buckets['{endpoint="a\\"b\\\\c",le="+Inf"}'] == 4
+
+
+def test_textfile_is_written_off_the_event_loop():
+    writers = []
+    write = MetricsRegistry.write_textfile
+
+    def recording_write(self, path):
+        writers.append(threading.get_ident())
+        write(self, path)
+
+    MetricsRegistry.write_textfile = recording_write
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bytebot.prom")
+            call_fake_server(metrics_textfile_path=path)
+            with open(path, encoding="utf-8") as f:
+                parse_exposition(f.read())
+            assert os.listdir(directory) == ["bytebot.prom"]
+    finally:
+        MetricsRegistry.write_textfile = write
+    assert writers
+    assert threading.get_ident() not in writers
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,138 @@
+"""
+Offline concurrency test: one Tools instance driven from several threads,
+each with its own event loop, against the in-process fake ByteBot.
+
+Checks that every loop gets its own pooled session, that sessions are closed
+when their loops shut down, and that calls and metrics stay consistent.
+
+Run directly (python tests/test_multiloop_sessions.py) or with pytest.
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import threading
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+THREADS = 8
+ROUNDS = 3
+CALLS_PER_LOOP = 10
+
+
+class ServerThread(threading.Thread):
+    """Fake ByteBot running on its own loop in a background thread."""
+
+    def __init__(self, config: FakeByteBotConfig):
+        super().__init__(daemon=True)
+        self.server = FakeByteBot(config)
+        self.server.preload(50)
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.start())
+        self.ready.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(self.server.stop())
+        self.loop.close()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+
+
+async def drive(tools: Tools, worker: int, seen: list, errors: list):
+    """Mixed tool calls on the current loop; record the session each loop used."""
+
+    async def call(i: int):
+        if i % 3 == 0:
+            result = await tools.execute_task(
+                f"Worker {worker} task {i}", wait_for_completion=False
+            )
+            ok = "Task ID" in result
+        elif i % 3 == 1:
+            result = await tools.list_tasks(limit=5)
+            ok = "Recent Tasks" in result
+        else:
+            result = await tools.list_active_tasks()
+            ok = not result.startswith("Error")
+        if not ok:
+            errors.append(result[:200])
+
+    await asyncio.gather(*(call(i) for i in range(CALLS_PER_LOOP)))
+    session = tools._session
+    if session is None or session._loop is not asyncio.get_running_loop():
+        errors.append(f"worker {worker}: session not bound to its loop")
+    seen.append(session)
+
+
+def run_threads(tools: Tools) -> tuple:
+    seen, errors = [], []
+    threads = [
+        threading.Thread(target=lambda w=w: asyncio.run(drive(tools, w, seen, errors)))
+        for w in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return seen, errors
+
+
+def test_multiloop_sessions():
+    """Shared Tools object, THREADS loops at a time, ROUNDS times over."""
+    print("\n=== Testing Tools from multiple threads and event loops ===")
+    server_thread = ServerThread(FakeByteBotConfig(latency=0.005, task_duration=30))
+    server_thread.start()
+    server_thread.ready.wait()
+
+    tools = Tools()
+    tools.valves.bytebot_url = server_thread.server.url
+    tools.valves.persist_inflight_tasks = False
+    tools.user_valves.notification_verbosity = "minimal"
+
+    all_errors = []
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        for round_number in range(1, ROUNDS + 1):
+            seen, errors = run_threads(tools)
+            all_errors.extend(errors)
+            distinct = len({id(s) for s in seen})
+            closed = sum(1 for s in seen if s is not None and s.closed)
+            print(
+                f"Round {round_number}: {len(seen)} loops, {distinct} distinct sessions, "
+                f"{closed} closed after their loop ended, {len(errors)} errors"
+            )
+            assert distinct == THREADS, "Loops shared a session"
+            assert closed == THREADS, "Sessions outlived their loops"
+        del seen
+        gc.collect()
+
+    unclosed = [w for w in caught if "Unclosed" in str(w.message)]
+    responses = sum(v for _, v in tools._metrics.counters("http_responses_total"))
+    served = sum(server_thread.server.request_counts.values())
+    server_thread.stop()
+
+    print(f"Live sessions left: {len(tools._sessions)}")
+    print(f"Unclosed session/connector warnings: {len(unclosed)}")
+    print(f"Responses counted by the tool: {responses:g}, served: {served}")
+    for error in all_errors[:5]:
+        print("  error:", error)
+
+    assert not all_errors, "Tool calls failed"
+    assert len(tools._sessions) == 0, "Sessions leaked"
+    assert not unclosed, "Unclosed sessions reported"
+    assert responses == served, "Metrics lost updates across threads"
+    print("✓ Every loop used its own session and all were cleaned up")
+
+
+if __name__ == "__main__":
+    test_multiloop_sessions()
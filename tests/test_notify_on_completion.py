@@ -0,0 +1,109 @@
+"""
+Offline tests for fire-and-forget completion notifications.
+
+Run directly (python tests/test_notify_on_completion.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools
+
+
+def make_tools(url: str) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.valves.max_retries = 1
+    tools.valves.background_poll_max_interval_seconds = 1
+    tools.valves.health_monitor_enabled = False
+    return tools
+
+
+async def submit_and_watch(server: FakeByteBot, tools: Tools, outage=None) -> tuple:
+    """Submit with notify_on_completion and run until the watcher is done.
+
+    outage(server) runs while the watcher polls; returns (reply, chat messages).
+    """
+    events = []
+
+    async def event_emitter(event: dict):
+        events.append(event)
+
+    reply = await tools.execute_task(
+        "Check the dashboard",
+        wait_for_completion=False,
+        notify_on_completion=True,
+        __event_emitter__=event_emitter,
+    )
+    watchers = [
+        t
+        for t in tools._background_tasks
+        if t.get_coro().__qualname__.endswith("_notify_on_completion")
+    ]
+    if outage:
+        await outage(server)
+    await asyncio.wait_for(asyncio.gather(*watchers), timeout=30)
+    await tools._aclose()
+    return reply, [e["data"]["content"] for e in events if e["type"] == "message"]
+
+
+def test_result_is_posted_after_an_outage():
+    async def outage(server: FakeByteBot):
+        await asyncio.sleep(0.5)
+        await server.stop()
+        await asyncio.sleep(4)  # Longer than the request retries
+        await server.start()
+
+    async def run():
+        server = await FakeByteBot(FakeByteBotConfig(task_duration=2)).start()
+        try:
+            return await submit_and_watch(server, make_tools(server.url), outage)
+        finally:
+            await server.stop()
+
+    reply, messages = asyncio.run(run())
+    assert "posted to this chat" in reply
+    assert len(messages) == 1
+    assert "**Task Completed**" in messages[0]
+
+
+def test_timeout_is_posted_when_the_outage_outlasts_the_deadline():
+    async def outage(server: FakeByteBot):
+        await asyncio.sleep(0.5)
+        await server.stop()
+
+    async def run():
+        server = await FakeByteBot(FakeByteBotConfig(task_duration=60)).start()
+        tools = make_tools(server.url)
+        tools.valves.task_timeout_seconds = 3
+        return await submit_and_watch(server, tools, outage)
+
+    reply, messages = asyncio.run(run())
+    assert len(messages) == 1
+    assert "timed out" in messages[0]
+
+
+def test_permanent_errors_are_posted():
+    async def outage(server: FakeByteBot):
+        server.tasks.clear()  # Every later poll answers 404
+
+    async def run():
+        async with FakeByteBot(FakeByteBotConfig(task_duration=60)) as server:
+            return await submit_and_watch(server, make_tools(server.url), outage)
+
+    reply, messages = asyncio.run(run())
+    assert len(messages) == 1
+    assert "**Stopped watching task**" in messages[0]
+    assert "not found (404)" in messages[0]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
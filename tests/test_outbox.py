@@ -0,0 +1,226 @@
+"""
+Offline tests for the submission outbox: the TaskStore state machine
+(queued, submitting, submitted, failed) and replays against the in-process
+fake ByteBot, including duplicate detection and giving up.
+
+Run directly (python tests/test_outbox.py) or with pytest.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import TaskStore, Tools
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_tools(url: str, db_path: str) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.valves.persist_inflight_tasks = True
+    tools.valves.state_db_path = db_path
+    tools.valves.outbox_enabled = True
+    tools.valves.outbox_drain_interval_seconds = 0.1
+    tools.valves.max_retries = 1
+    tools.user_valves.notification_verbosity = "minimal"
+    return tools
+
+
+def payload(tools: Tools, description: str, priority: str = "MEDIUM") -> dict:
+    return {
+        "description": description,
+        "priority": priority,
+        "type": "IMMEDIATE",
+        "control": "ASSISTANT",
+        "model": tools._get_model_config(),
+    }
+
+
+def test_store_state_machine():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStore(os.path.join(tmp, "state.db"))
+        store.enqueue("outbox-low", "{}", "LOW", user_id="u1")
+        store.enqueue("outbox-urgent", "{}", "URGENT", user_id="u1")
+        store.enqueue("outbox-medium", "{}", "MEDIUM", user_id="u2")
+        assert store.outbox_counts() == {"queued": 3}
+        assert store.next_queued()["entry_id"] == "outbox-urgent"
+        assert store.queued_ahead("outbox-low") == 2
+
+        # Only one worker can claim an entry
+        assert store.claim("outbox-urgent")
+        assert not store.claim("outbox-urgent")
+        assert store.next_queued()["entry_id"] == "outbox-medium"
+
+        # A failed replay goes back to the queue with the first attempt time kept
+        store.requeue("outbox-urgent", "connection refused", 100.0)
+        store.claim("outbox-urgent")
+        store.requeue("outbox-urgent", "timeout", 200.0)
+        entry = store.outbox_entry("outbox-urgent")
+        assert (entry["state"], entry["attempts"], entry["attempted"]) == (
+            "queued",
+            2,
+            100.0,
+        )
+
+        # Entries left 'submitting' by a dead process are recovered
+        assert store.claim("outbox-medium")
+        store.recover_stale(-1)
+        entry = store.outbox_entry("outbox-medium")
+        assert entry["state"] == "queued"
+        assert entry["attempted"] is not None
+
+        store.claim("outbox-urgent")
+        store.submitted("outbox-urgent", "task-1")
+        store.reject("outbox-low", "400 Bad Request")
+        assert store.outbox_counts() == {"submitted": 1, "queued": 1, "failed": 1}
+        assert store.outbox_entry("outbox-low")["error"] == "400 Bad Request"
+        assert store.tracked_task_ids(["task-1", "task-2"]) == {"task-1"}
+
+
+def test_outage_queues_and_drains_in_priority_order():
+    async def run(db_path: str) -> tuple:
+        port = free_port()
+        tools = make_tools(f"http://127.0.0.1:{port}", db_path)
+        user = {"id": "u1"}
+        replies = []
+        for priority in ("LOW", "URGENT", "MEDIUM"):
+            replies.append(
+                await tools.execute_task(
+                    f"queued {priority}", priority=priority, __user__=user
+                )
+            )
+        server = FakeByteBot(FakeByteBotConfig(task_duration=0.2), port=port)
+        await server.start()
+        try:
+            tools._start_outbox_drainer()
+            await asyncio.wait_for(tools._outbox_task, 30)
+            counts = await tools._store_call("outbox_counts")
+            order = [server.tasks[i]["description"] for i in reversed(server.order)]
+        finally:
+            await server.stop()
+        return replies, counts, order
+
+    with tempfile.TemporaryDirectory() as tmp:
+        replies, counts, order = asyncio.run(run(os.path.join(tmp, "state.db")))
+    assert all("**Provisional ID:** `outbox-" in reply for reply in replies)
+    assert counts == {"submitted": 3}
+    assert order == ["queued URGENT", "queued MEDIUM", "queued LOW"]
+
+
+def test_replay_matches_existing_task_and_skips_tracked_ones():
+    async def run(db_path: str) -> tuple:
+        async with FakeByteBot(FakeByteBotConfig(task_duration=0.2)) as server:
+            tools = make_tools(server.url, db_path)
+            model = tools._get_model_config()
+            owned = server.add_task("already there", priority="HIGH", model=model)
+            other = server.add_task("already there", priority="LOW", model=model)
+            mine = server.add_task("already there", priority="HIGH", model=model)
+            # The newest match belongs to another wait; the older one is ours
+            await tools._store_call("track", mine["id"], 9e9)
+            data = json.dumps(payload(tools, "already there", "HIGH"))
+            await tools._store_call(
+                "enqueue", "outbox-dup", data, "HIGH", attempted=time.time()
+            )
+            await tools._store_call("claim", "outbox-dup")
+            entry = await tools._store_call("outbox_entry", "outbox-dup")
+            outcome = await tools._replay_outbox_entry(entry)
+            entry = await tools._store_call("outbox_entry", "outbox-dup")
+            posts = server.request_counts["POST /tasks"]
+            await asyncio.gather(*list(tools._background_tasks))
+            return outcome, entry["task_id"], owned["id"], other["id"], posts
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outcome, task_id, owned, other, posts = asyncio.run(
+            run(os.path.join(tmp, "state.db"))
+        )
+    assert outcome == "duplicate"
+    assert task_id == owned != other
+    assert posts == 0
+
+
+def test_lookup_errors_retry_and_post_errors_reject():
+    async def run(db_path: str) -> tuple:
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            tools = make_tools(server.url, db_path)
+
+            async def lookup_fails(*args):
+                url = URL(f"{server.url}/tasks")
+                info = aiohttp.RequestInfo(
+                    url, "GET", CIMultiDictProxy(CIMultiDict()), url
+                )
+                raise aiohttp.ClientResponseError(info, (), status=404)
+
+            tools._find_submitted_task = lookup_fails
+            data = json.dumps(payload(tools, "lookup fails"))
+            await tools._store_call(
+                "enqueue", "outbox-a", data, "MEDIUM", attempted=time.time()
+            )
+            await tools._store_call("claim", "outbox-a")
+            entry = await tools._store_call("outbox_entry", "outbox-a")
+            lookup = await tools._replay_outbox_entry(entry)
+            lookup_state = (await tools._store_call("outbox_entry", "outbox-a"))[
+                "state"
+            ]
+
+            # The fake rejects tasks without a description
+            await tools._store_call(
+                "enqueue", "outbox-b", json.dumps(payload(tools, "")), "MEDIUM"
+            )
+            await tools._store_call("claim", "outbox-b")
+            entry = await tools._store_call("outbox_entry", "outbox-b")
+            post = await tools._replay_outbox_entry(entry)
+            post_state = (await tools._store_call("outbox_entry", "outbox-b"))["state"]
+            return lookup, lookup_state, post, post_state
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lookup, lookup_state, post, post_state = asyncio.run(
+            run(os.path.join(tmp, "state.db"))
+        )
+    assert (lookup, lookup_state) == ("retry", "queued")
+    assert (post, post_state) == ("rejected", "failed")
+
+
+def test_entries_give_up_after_max_attempts():
+    async def run(db_path: str) -> tuple:
+        tools = make_tools("http://127.0.0.1:9", db_path)
+        tools.valves.outbox_max_attempts = 2
+        data = json.dumps(payload(tools, "never reachable"))
+        await tools._store_call("enqueue", "outbox-c", data, "MEDIUM", user_id="u1")
+        outcomes = []
+        for _ in range(3):
+            await tools._store_call("claim", "outbox-c")
+            entry = await tools._store_call("outbox_entry", "outbox-c")
+            outcomes.append(await tools._replay_outbox_entry(entry))
+        entry = await tools._store_call("outbox_entry", "outbox-c")
+        notices = await tools._store_call("undelivered", "u1")
+        return outcomes, entry["state"], notices
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outcomes, state, notices = asyncio.run(run(os.path.join(tmp, "state.db")))
+    assert outcomes == ["retry", "retry", "expired"]
+    assert state == "failed"
+    assert "Gave up after 2 attempts" in notices[0]["result"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,132 @@
+"""
+Offline tests for per-call profiling in sampling and deterministic
+(cProfile) modes.
+
+Run directly (python tests/test_profiler.py) or with pytest.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import CallProfiler, Tools
+
+
+def profiled_calls(directory: str, latency: float, calls: int = 1, **valves) -> list:
+    """Run list_tasks() with profiling on; return the reports written."""
+
+    async def run():
+        async with FakeByteBot(FakeByteBotConfig(latency=latency)) as server:
+            server.preload(3, age_seconds=3000)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            tools.valves.profiling_enabled = True
+            tools.valves.profiling_sample_every = 1
+            tools.valves.profiling_output_dir = directory
+            for name, value in valves.items():
+                setattr(tools.valves, name, value)
+            try:
+                for _ in range(calls):
+                    await tools.list_tasks()
+            finally:
+                await tools._aclose()
+
+    asyncio.run(run())
+    reports = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            reports.append(f.read())
+    return reports
+
+
+def test_sampling_report_attributes_waits_to_await_sites():
+    with tempfile.TemporaryDirectory() as directory:
+        (report,) = profiled_calls(
+            directory, latency=0.1, profiling_mode="sampling", profiling_interval_ms=2
+        )
+    assert "Tool method: list_tasks\nMode: sampling\n" in report
+    match = re.search(r"Samples: (\d+) .*awaiting: (\d+)\)", report)
+    assert match and int(match.group(1)) > 0 and int(match.group(2)) > 0
+    assert "Top 25 by inclusive wall time:" in report
+    assert "list_tasks (tool.py:" in report
+    assert "<await " in report
+
+
+def test_sampling_skips_calls_shorter_than_one_interval():
+    with tempfile.TemporaryDirectory() as directory:
+        reports = profiled_calls(
+            directory,
+            latency=0.0,
+            profiling_mode="sampling",
+            profiling_interval_ms=5000,
+        )
+    assert reports == []
+
+
+def test_deterministic_report_lists_cprofile_stats():
+    with tempfile.TemporaryDirectory() as directory:
+        (report,) = profiled_calls(
+            directory, latency=0.0, profiling_mode="deterministic", profiling_top_n=5
+        )
+    assert "Tool method: list_tasks\nMode: deterministic\n" in report
+    assert "measures CPU time of everything running" in report
+    assert "function calls" in report and "cumulative" in report
+
+
+def test_sample_every_and_method_filter():
+    with tempfile.TemporaryDirectory() as directory:
+        reports = profiled_calls(
+            directory,
+            latency=0.0,
+            calls=5,
+            profiling_mode="deterministic",
+            profiling_sample_every=2,
+        )
+        assert len(reports) == 3
+    with tempfile.TemporaryDirectory() as directory:
+        reports = profiled_calls(
+            directory,
+            latency=0.0,
+            profiling_mode="deterministic",
+            profiling_methods="get_task_status, execute_task",
+        )
+        assert reports == []
+
+
+def test_reports_are_written_off_the_event_loop():
+    writers = []
+    write = CallProfiler._write_report
+
+    def recording_write(*args):
+        writers.append(threading.get_ident())
+        write(*args)
+
+    CallProfiler._write_report = staticmethod(recording_write)
+    try:
+        for mode in ("sampling", "deterministic"):
+            with tempfile.TemporaryDirectory() as directory:
+                reports = profiled_calls(
+                    directory,
+                    latency=0.05,
+                    profiling_mode=mode,
+                    profiling_interval_ms=2,
+                )
+                assert len(reports) == 1
+    finally:
+        CallProfiler._write_report = staticmethod(write)
+    assert len(writers) == 2
+    assert threading.get_ident() not in writers
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,86 @@
+"""
+Offline tests for the task result render cache.
+
+Run directly (python tests/test_render_cache.py) or with pytest.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool import RENDER_CACHE_SIZE, Tools
+
+
+def make_task(task_id: str = "task-1", updated: str = "2025-01-01T00:01:00Z"):
+    return {
+        "id": task_id,
+        "status": "COMPLETED",
+        "description": "Open the dashboard",
+        "createdAt": "2025-01-01T00:00:00Z",
+        "updatedAt": updated,
+        "messages": [
+            {"role": "ASSISTANT", "content": [{"type": "text", "text": "Opened it"}]}
+        ],
+    }
+
+
+def counting_tools() -> tuple:
+    tools = Tools()
+    renders = []
+    render = tools._render_task_result
+
+    def counted(task, *args):
+        renders.append(task.get("id"))
+        return render(task, *args)
+
+    tools._render_task_result = counted
+    return tools, renders
+
+
+def test_repeat_formatting_is_served_from_cache():
+    tools, renders = counting_tools()
+    first = tools._format_task_result(make_task())
+    second = tools._format_task_result(make_task())
+    assert first == second
+    assert "- Opened it" in first
+    assert renders == ["task-1"]
+
+
+def test_new_revision_or_options_render_again():
+    tools, renders = counting_tools()
+    tools._format_task_result(make_task())
+    tools._format_task_result(make_task(updated="2025-01-01T00:02:00Z"))
+    tools.user_valves.show_execution_logs = False
+    hidden = tools._format_task_result(make_task())
+    tools._format_task_result(make_task(), log_budget=10)
+    assert "- Opened it" not in hidden
+    assert len(renders) == 4
+
+
+def test_tasks_without_revision_are_not_cached():
+    tools, renders = counting_tools()
+    task = make_task(updated="")
+    tools._format_task_result(task)
+    tools._format_task_result(task)
+    assert len(renders) == 2
+    assert not tools._render_cache
+
+
+def test_cache_is_bounded_and_evicts_least_recent():
+    tools, renders = counting_tools()
+    tools._format_task_result(make_task("task-0"))
+    for i in range(1, RENDER_CACHE_SIZE + 1):
+        tools._format_task_result(make_task(f"task-{i}"))
+    assert len(tools._render_cache) == RENDER_CACHE_SIZE
+    tools._format_task_result(make_task(f"task-{RENDER_CACHE_SIZE}"))
+    tools._format_task_result(make_task("task-0"))
+    assert renders.count("task-0") == 2
+    assert renders.count(f"task-{RENDER_CACHE_SIZE}") == 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,112 @@
+"""
+Offline tests for the retry policy shared by every ByteBot API call.
+
+Run directly (python tests/test_retry_policy.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import ErrorFormatter, Tools
+
+
+def make_tools(url: str) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.valves.max_retries = 2
+    return tools
+
+
+def test_client_errors_are_not_retried():
+    async def run():
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            tools = make_tools(server.url)
+            try:
+                await tools._retry_request("GET", f"{server.url}/tasks/missing")
+            except aiohttp.ClientResponseError as e:
+                return e.status, server.request_counts["GET /tasks/{id}"]
+        return None, None
+
+    status, requests = asyncio.run(run())
+    assert status == 404
+    assert requests == 1
+
+
+def test_server_errors_are_retried():
+    async def run():
+        async with FakeByteBot(FakeByteBotConfig(error_rate=1.0)) as server:
+            tools = make_tools(server.url)
+            try:
+                await tools._retry_request("GET", f"{server.url}/tasks")
+            except aiohttp.ClientResponseError as e:
+                return e.status, server.request_counts["GET /tasks"]
+        return None, None
+
+    status, requests = asyncio.run(run())
+    assert status == 500
+    assert requests == 2
+
+
+def test_empty_delete_bodies_succeed():
+    async def run(delete_status: int) -> dict:
+        async with FakeByteBot(
+            FakeByteBotConfig(delete_status=delete_status)
+        ) as server:
+            task = server.add_task("to be cancelled", duration=60)
+            tools = make_tools(server.url)
+            return await tools._retry_request(
+                "DELETE", f"{server.url}/tasks/{task['id']}"
+            )
+
+    assert asyncio.run(run(204)) == {}
+    assert asyncio.run(run(200)) == {}
+
+
+def test_html_pages_are_retried_and_formatted():
+    async def run():
+        hits = []
+
+        async def login_page(request):
+            hits.append(request.path)
+            return web.Response(text="<html>Sign in</html>", content_type="text/html")
+
+        app = web.Application()
+        app.router.add_get("/tasks", login_page)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        url = f"http://127.0.0.1:{port}"
+        try:
+            tools = make_tools(url)
+            try:
+                await tools._retry_request("GET", f"{url}/tasks")
+            except aiohttp.ClientResponseError as e:
+                return ErrorFormatter.format_api_error(e, "List tasks"), len(hits)
+            finally:
+                await tools._aclose()
+        finally:
+            await runner.cleanup()
+        return None, len(hits)
+
+    message, requests = asyncio.run(run())
+    assert requests == 2
+    assert message == (
+        "List tasks failed with status 200: Expected JSON but received text/html"
+    )
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,143 @@
+"""
+Offline tests for submission admission: per-model limits, fair scheduling
+between users and per-user quotas, against the in-process fake ByteBot.
+
+Run directly (python tests/test_scheduling.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import FairScheduler, ModelLimiter, Tools
+
+
+def make_tools(url: str) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.valves.max_retries = 1
+    tools.user_valves.notification_verbosity = "minimal"
+    return tools
+
+
+def with_fast_revalidation(func):
+    """Revalidate leased tasks every 0.2s instead of every 5s."""
+
+    def wrapper():
+        saved = FairScheduler.REVALIDATE_INTERVAL, ModelLimiter.REVALIDATE_INTERVAL
+        FairScheduler.REVALIDATE_INTERVAL = ModelLimiter.REVALIDATE_INTERVAL = 0.2
+        try:
+            func()
+        finally:
+            FairScheduler.REVALIDATE_INTERVAL, ModelLimiter.REVALIDATE_INTERVAL = saved
+
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+@with_fast_revalidation
+def test_model_concurrency_limit():
+    async def run() -> tuple:
+        async with FakeByteBot(FakeByteBotConfig(task_duration=0.5)) as server:
+            tools = make_tools(server.url)
+            tools.valves.model_concurrency_limits = "*=2"
+            start = time.perf_counter()
+
+            async def submit(i: int) -> float:
+                await tools.execute_task(f"limited task {i}", wait_for_completion=False)
+                return time.perf_counter() - start
+
+            times = await asyncio.gather(*(submit(i) for i in range(4)))
+            return sorted(times), tools._limiter.snapshot()
+
+    times, snapshot = asyncio.run(run())
+    # Two go straight through; the others wait for a task to finish
+    assert times[1] < 0.4
+    assert times[2] >= 0.4
+    assert snapshot[0]["limit"] == 2
+
+
+@with_fast_revalidation
+def test_fair_scheduling_between_users():
+    async def run() -> list:
+        async with FakeByteBot(FakeByteBotConfig(task_duration=0.3)) as server:
+            tools = make_tools(server.url)
+            tools.valves.agent_max_concurrent_tasks = 1
+            order = []
+
+            async def submit(user: str, i: int):
+                await tools.execute_task(
+                    f"task {user}{i}", wait_for_completion=False, __user__={"id": user}
+                )
+                order.append(user)
+
+            async def late_user():
+                await asyncio.sleep(0.05)
+                await submit("B", 0)
+
+            await asyncio.gather(*(submit("A", i) for i in range(4)), late_user())
+            return order
+
+    order = asyncio.run(run())
+    # B queued behind A's batch but is served before A's batch finishes
+    assert order.index("B") < len(order) - 1, order
+
+
+def test_quota_holds_under_concurrent_submissions():
+    async def run() -> tuple:
+        async with FakeByteBot(FakeByteBotConfig(task_duration=5)) as server:
+            tools = make_tools(server.url)
+            tools.valves.user_task_quota = 3
+            tools.valves.model_rate_limits = "*=1/0.1"  # Submissions wait in admission
+            results = await asyncio.gather(
+                *(
+                    tools.execute_task(
+                        f"quota task {i}",
+                        wait_for_completion=False,
+                        __user__={"id": "u1"},
+                    )
+                    for i in range(6)
+                )
+            )
+            return results, server.request_counts["POST /tasks"]
+
+    results, posts = asyncio.run(run())
+    assert posts == 3
+    assert sum("Task quota reached" in r for r in results) == 3
+
+
+def test_failed_submission_releases_quota():
+    async def run() -> tuple:
+        async with FakeByteBot(FakeByteBotConfig(error_rate=1.0)) as server:
+            tools = make_tools(server.url)
+            tools.valves.user_task_quota = 1
+            failed = await tools.execute_task(
+                "fails on the server", wait_for_completion=False, __user__={"id": "u1"}
+            )
+            server.config.error_rate = 0.0
+            created = await tools.execute_task(
+                "works the second time",
+                wait_for_completion=False,
+                __user__={"id": "u1"},
+            )
+            refused = await tools.execute_task(
+                "over the quota", wait_for_completion=False, __user__={"id": "u1"}
+            )
+            return failed, created, refused
+
+    failed, created, refused = asyncio.run(run())
+    assert "Task ID" not in failed
+    assert "Task ID" in created
+    assert "Task quota reached" in refused
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,104 @@
+"""
+Offline tests for sharded file uploads in execute_task_with_files, against
+two in-process fake ByteBot agents.
+
+Run directly (python tests/test_sharding.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import Tools, _shard_files
+
+
+def make_files(count: int, size: int = 1024) -> list:
+    return [
+        SimpleNamespace(
+            filename=f"file{i}.txt",
+            data={"content": "x" * size},
+            meta={"content_type": "text/plain"},
+        )
+        for i in range(count)
+    ]
+
+
+def make_tools(primary: FakeByteBot, remote: FakeByteBot) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = primary.url
+    tools.valves.shard_agent_urls = remote.url
+    tools.valves.shard_max_files = 1
+    tools.valves.persist_inflight_tasks = False
+    tools.valves.agent_max_concurrent_tasks = 10
+    tools.user_valves.notification_verbosity = "minimal"
+    return tools
+
+
+def test_shard_files_limits():
+    groups = _shard_files(list(range(5)), [10, 10, 10, 10, 10], 2, 1000)
+    assert [len(g) for g in groups] == [2, 2, 1]
+    assert sorted(i for g in groups for i in g) == [0, 1, 2, 3, 4]
+    groups = _shard_files(list(range(3)), [600, 600, 600], 10, 1000)
+    assert len(groups) == 3
+
+
+def test_remote_shards_do_not_hold_primary_slots():
+    async def run():
+        config = FakeByteBotConfig(task_duration=0.2)
+        async with FakeByteBot(config) as primary, FakeByteBot(config) as remote:
+            tools = make_tools(primary, remote)
+            result = await tools.execute_task_with_files(
+                "Summarise these files",
+                wait_for_completion=True,
+                shard_files=True,
+                __files__=make_files(4),
+                __user__={"id": "alice"},
+            )
+            leased = set(tools._scheduler._task_leases)
+            return result, primary, remote, leased
+
+    result, primary, remote, leased = asyncio.run(run())
+    assert "**Shards:** 4 completed" in result, result
+    assert primary.request_counts["POST /tasks"] == 2
+    assert remote.request_counts["POST /tasks"] == 2
+    assert not leased & set(remote.tasks), "Remote tasks bound primary slots"
+
+
+def test_notify_on_completion_posts_merged_report():
+    events = []
+
+    async def event_emitter(event: dict):
+        events.append(event)
+
+    async def run():
+        config = FakeByteBotConfig(task_duration=0.2)
+        async with FakeByteBot(config) as primary, FakeByteBot(config) as remote:
+            tools = make_tools(primary, remote)
+            result = await tools.execute_task_with_files(
+                "Summarise these files",
+                wait_for_completion=False,
+                notify_on_completion=True,
+                shard_files=True,
+                __files__=make_files(2),
+                __event_emitter__=event_emitter,
+            )
+            await asyncio.gather(*list(tools._background_tasks))
+            return result
+
+    result = asyncio.run(run())
+    assert "posted to this chat" in result
+    messages = [e["data"]["content"] for e in events if e["type"] == "message"]
+    assert len(messages) == 1
+    assert "**Shards:** 2 completed" in messages[0], messages[0]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,138 @@
+"""
+Offline tests for the cached global status snapshot: incremental updates in
+StatusAggregator, list_active_tasks served from the snapshot, and how long
+check_connection() reuses it, with and without server-side status
+filtering in the fake ByteBot.
+
+Run directly (python tests/test_status_counts.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import StatusAggregator, TaskRecord, Tools
+
+
+def test_observe_tracks_tasks_outside_snapshot():
+    aggregator = StatusAggregator()
+    running = TaskRecord.from_api({"id": "t-1", "status": "IN_PROGRESS"})
+    aggregator.replace(
+        Counter({"IN_PROGRESS": 1, "COMPLETED": 5}), 6, "filter", [running]
+    )
+
+    aggregator.observe("t-1", "COMPLETED")
+    assert aggregator.counts["IN_PROGRESS"] == 0
+    assert aggregator.counts["COMPLETED"] == 6
+    assert aggregator.active_tasks() == []
+
+    # Not in the snapshot and active: created since, by someone else
+    aggregator.observe("t-2", "IN_PROGRESS")
+    assert aggregator.counts["IN_PROGRESS"] == 1
+    assert aggregator.total == 7
+    assert not aggregator.active_complete
+
+    # Not in the snapshot and finished: already counted
+    aggregator.observe("t-old", "COMPLETED")
+    assert aggregator.counts["COMPLETED"] == 6
+    assert aggregator.total == 7
+
+    aggregator.observe("t-2", "COMPLETED")
+    assert aggregator.counts == Counter({"IN_PROGRESS": 0, "COMPLETED": 7})
+
+
+def check_active_listing(supports_status_filter: bool):
+    async def run() -> tuple:
+        config = FakeByteBotConfig(
+            task_duration=0.5, supports_status_filter=supports_status_filter
+        )
+        async with FakeByteBot(config) as server:
+            for i in range(12):
+                server.add_task(
+                    f"long running {i}", created=time.time() - 7200, duration=10**6
+                )
+            server.preload(300, age_seconds=3600)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            tools.user_valves.notification_verbosity = "minimal"
+
+            first = await tools.list_active_tasks()
+            requests = sum(server.request_counts.values())
+            cached = await tools.list_active_tasks()
+            cached_requests = sum(server.request_counts.values()) - requests
+
+            await tools.execute_task("brand new task", wait_for_completion=False)
+            after_create = await tools.list_active_tasks()
+            return first, cached, cached_requests, after_create, tools._status_counts
+
+    first, cached, cached_requests, after_create, aggregator = asyncio.run(run())
+    assert first.count("long running") == 12, first
+    assert cached == first
+    assert cached_requests == 0
+    assert "brand new task" in after_create
+    assert after_create.count("long running") == 12
+    assert aggregator.source == ("filter" if supports_status_filter else "scan")
+
+
+def test_active_listing_with_status_filter():
+    check_active_listing(True)
+
+
+def test_active_listing_without_status_filter():
+    check_active_listing(False)
+
+
+def check_connection_refreshes(supports_status_filter: bool) -> tuple:
+    """Call check_connection() with the snapshot aged 60s, then 600s."""
+
+    async def run():
+        config = FakeByteBotConfig(supports_status_filter=supports_status_filter)
+        async with FakeByteBot(config) as server:
+            server.preload(250, age_seconds=250 * 1000)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            tools.valves.diagnostics_samples = 1
+            refresh = tools._refresh_status_counts
+            refreshes = []
+
+            async def counted(*args):
+                refreshes.append(time.time())
+                await refresh(*args)
+
+            tools._refresh_status_counts = counted
+            results = [await tools.check_connection()]
+            for age in (60, 600):
+                tools._status_counts.refreshed = time.time() - age
+                results.append(await tools.check_connection())
+            await tools._aclose()
+            return results, len(refreshes)
+
+    return asyncio.run(run())
+
+
+def test_scan_counts_are_cached_longer_and_labelled():
+    (first, aged, expired), refreshes = check_connection_refreshes(False)
+    assert refreshes == 2  # the first call and once past status_counts_scan_ttl
+    assert "Total tasks (all time): 250" in aged
+    assert "Running tasks: 0\n" in first
+    assert "Running tasks: 0 (task scan 60s ago, plus changes seen since)" in aged
+    assert "task scan" not in expired
+
+
+def test_filtered_counts_keep_the_short_ttl():
+    (_, aged, _), refreshes = check_connection_refreshes(True)
+    assert refreshes == 3
+    assert "task scan" not in aged
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,150 @@
+"""
+Offline tests for TaskColumns and get_task_analytics(): the numpy path and
+the pure-Python fallback must produce the same aggregates.
+
+Run directly (python tests/test_task_analytics.py) or with pytest.
+"""
+
+import asyncio
+import contextlib
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+import tool
+from tool import TaskColumns, Tools
+
+
+@contextlib.contextmanager
+def numpy_disabled():
+    """Run the block as if the optional numpy import had failed."""
+    saved, tool.np = tool.np, None
+    try:
+        yield
+    finally:
+        tool.np = saved
+
+
+def pure_python(func, *args):
+    with numpy_disabled():
+        return func(*args)
+
+
+def assert_same_value(left, right, where):
+    if isinstance(left, float) and math.isnan(left):
+        assert isinstance(right, float) and math.isnan(right), where
+    elif isinstance(left, float):
+        assert math.isclose(left, right, rel_tol=1e-9, abs_tol=1e-9), where
+    else:
+        assert left == right and type(left) is type(right), where
+
+
+def assert_same_stats(columns: TaskColumns):
+    assert tool.np is not None, "numpy is needed to compare both paths"
+    for field in (None,) + TaskColumns.FIELDS:
+        with_np = columns.group_stats(field)
+        pure = pure_python(columns.group_stats, field)
+        assert len(with_np) == len(pure), field
+        for row, other in zip(with_np, pure):
+            assert row.keys() == other.keys(), field
+            for key in row:
+                assert_same_value(row[key], other[key], (field, row["name"], key))
+    assert_same_value(
+        columns.window_hours(), pure_python(columns.window_hours), "window"
+    )
+
+
+def stamp(ts: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(ts))
+
+
+def task(status, created, seconds=None, model="A", priority="MEDIUM"):
+    return {
+        "status": status,
+        "createdAt": stamp(created) if created is not None else "",
+        "updatedAt": stamp(created + (seconds or 0)) if created is not None else "",
+        "model": {"title": model},
+        "priority": priority,
+    }
+
+
+def test_known_aggregates_match_on_both_paths():
+    base = 1_700_000_000
+    columns = TaskColumns()
+    for t in (
+        task("COMPLETED", base, 10),
+        task("COMPLETED", base + 60, 20),
+        task("FAILED", base + 120, 30, priority="HIGH"),
+        task("NEEDS_HELP", base + 180, 40, model="B"),
+        task("RUNNING", base + 240, model="B"),
+        task("PENDING", None, model="C", priority="LOW"),
+    ):
+        columns.append(t)
+
+    for stats in (columns.group_stats, lambda f: pure_python(columns.group_stats, f)):
+        (overall,) = stats(None)
+        assert overall["tasks"] == 6 and overall["finished"] == 4
+        assert overall["p50"] == 25.0
+        assert math.isclose(overall["p95"], 38.5)
+        assert overall["completed"] == 2
+        assert overall["failed"] == 1 and overall["needs_help"] == 1
+        by_model = {row["name"]: row for row in stats("model")}
+        assert by_model["A"]["tasks"] == 3 and by_model["A"]["p50"] == 20.0
+        assert by_model["B"]["finished"] == 1 and by_model["B"]["p95"] == 40.0
+        assert by_model["C"]["finished"] == 0 and math.isnan(by_model["C"]["p50"])
+
+    # From the first creation to the running task's creation (no finish yet)
+    assert math.isclose(columns.window_hours(), 240 / 3600)
+    assert math.isclose(pure_python(columns.window_hours), 240 / 3600)
+    assert_same_stats(columns)
+
+
+def test_fake_history_matches_on_both_paths():
+    async def run():
+        config = FakeByteBotConfig(task_failure_rate=0.2, needs_help_rate=0.1, seed=7)
+        async with FakeByteBot(config) as server:
+            server.preload(500)
+            for i in range(5):
+                server.add_task(f"Running {i}", duration=600)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            try:
+                report = await tools.get_task_analytics()
+                columns = await tools._scan_task_columns(
+                    None, 5000, tools._create_emitter(None)
+                )
+                with numpy_disabled():
+                    fallback = await tools.get_task_analytics()
+            finally:
+                await tools._aclose()
+            return report, columns, fallback
+
+    report, columns, fallback = asyncio.run(run())
+    assert len(columns) == 505
+    assert set(columns.names["status"]) >= {"COMPLETED", "FAILED", "NEEDS_HELP"}
+    assert_same_stats(columns)
+    assert report.startswith("**Task Analytics** (505 tasks")
+    assert "**By Model:**" in report and "Qwen3-VL-32B-Instruct" in report
+    assert fallback == report
+
+
+def test_empty_columns():
+    columns = TaskColumns()
+    assert columns.window_hours() == 0.0
+    assert pure_python(columns.window_hours) == 0.0
+    for stats in (columns.group_stats, lambda f: pure_python(columns.group_stats, f)):
+        (overall,) = stats(None)
+        assert overall["tasks"] == 0 and math.isnan(overall["p50"])
+        assert stats("model") == []
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
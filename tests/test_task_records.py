@@ -0,0 +1,79 @@
+"""
+Offline unit tests for TaskRecord parsing of API task dicts.
+
+Run directly (python tests/test_task_records.py) or with pytest.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool import TaskRecord
+
+
+def test_from_api_full_task():
+    record = TaskRecord.from_api(
+        {
+            "id": "t-1",
+            "status": "RUNNING",
+            "priority": "HIGH",
+            "description": "Open the browser",
+            "createdAt": "2025-01-02T03:04:05.000Z",
+            "updatedAt": "2025-01-02T03:05:05.000Z",
+            "model": {"title": "Claude"},
+            "messages": [
+                {"role": "ASSISTANT", "content": [{"type": "text", "text": "Done"}]}
+            ],
+        }
+    )
+    assert record.id == "t-1"
+    assert record.status == "RUNNING"
+    assert record.priority == "HIGH"
+    assert record.created == "2025-01-02 03:04:05"
+    assert record.updated is not None
+    assert record.model == "Claude"
+    assert record.latest_message.text == "Done"
+
+
+def test_from_api_null_fields():
+    record = TaskRecord.from_api(
+        {
+            "id": None,
+            "status": None,
+            "priority": None,
+            "description": None,
+            "createdAt": None,
+            "updatedAt": None,
+            "model": None,
+            "messages": [{"role": "ASSISTANT", "content": None}],
+        }
+    )
+    assert record.id == "N/A"
+    assert record.status == "UNKNOWN"
+    assert record.priority == "MEDIUM"
+    assert record.description == "No description"
+    assert record.created == "Unknown"
+    assert record.updated is None
+    assert record.model is None
+    assert record.latest_message is None
+
+
+def test_from_api_missing_fields():
+    record = TaskRecord.from_api({})
+    assert record.status == "UNKNOWN"
+    assert record.priority == "MEDIUM"
+
+
+def test_coerce_keeps_records():
+    record = TaskRecord.from_api({"id": "t-2", "status": "COMPLETED"})
+    records = TaskRecord.coerce([record, {"id": "t-3", "status": None}])
+    assert records[0] is record
+    assert records[1].status == "UNKNOWN"
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,111 @@
+"""
+Offline tests for persisted in-flight waits: a wait interrupted by a restart
+is resumed by a new Tools instance and its result is delivered once to the
+owning user.
+
+Run directly (python tests/test_task_store.py) or with pytest.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+from tool import TaskStore, Tools
+
+
+def make_tools(url: str, db_path: str) -> Tools:
+    tools = Tools()
+    tools.valves.bytebot_url = url
+    tools.valves.persist_inflight_tasks = True
+    tools.valves.state_db_path = db_path
+    tools.user_valves.notification_verbosity = "minimal"
+    return tools
+
+
+def test_store_records_lifecycle():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TaskStore(os.path.join(tmp, "state.db"))
+        store.track("t-1", 9e9, user_id="u1", description="first")
+        store.track("t-2", 9e9, user_id="u2", description="second")
+        assert {r["task_id"] for r in store.waiting()} == {"t-1", "t-2"}
+
+        store.finish("t-1", "COMPLETED", "result one", False)
+        assert [r["task_id"] for r in store.waiting()] == ["t-2"]
+        assert [r["result"] for r in store.undelivered("u1")] == ["result one"]
+        assert store.undelivered("u2") == []
+
+        store.mark_delivered(["t-1"])
+        assert store.undelivered("u1") == []
+        store.forget("t-2")
+        assert store.waiting() == []
+
+
+def test_persistence_is_opt_in():
+    tools = Tools()
+    assert tools._get_store() is None
+    assert asyncio.run(tools._store_call("waiting")) is None
+
+
+def test_resume_after_restart_delivers_once():
+    async def run(db_path: str) -> tuple:
+        async with FakeByteBot(FakeByteBotConfig(task_duration=1.0)) as server:
+            first = make_tools(server.url, db_path)
+            job = asyncio.ensure_future(
+                first.execute_task(
+                    "long running thing", __user__={"id": "u1"}, __chat_id__="c1"
+                )
+            )
+            await asyncio.sleep(0.5)
+            job.cancel()
+            await asyncio.gather(job, return_exceptions=True)
+            waiting = await first._store_call("waiting")
+
+            # The first call on a new instance resumes the wait
+            second = make_tools(server.url, db_path)
+            other = await second.list_tasks(__user__={"id": "u2"})
+            for _ in range(100):
+                await asyncio.sleep(0.1)
+                if not await second._store_call("waiting"):
+                    break
+            owner = await second.list_tasks(__user__={"id": "u1"})
+            again = await second.list_tasks(__user__={"id": "u1"})
+            return waiting, other, owner, again
+
+    with tempfile.TemporaryDirectory() as tmp:
+        waiting, other, owner, again = asyncio.run(run(os.path.join(tmp, "state.db")))
+    assert [r["user_id"] for r in waiting] == ["u1"]
+    assert "while you were away" not in other
+    assert "while you were away" in owner
+    assert "long running thing" in owner
+    assert "while you were away" not in again
+
+
+def test_unexpected_watch_error_is_recorded():
+    async def run(db_path: str) -> list:
+        tools = make_tools("http://127.0.0.1:9", db_path)
+
+        async def broken(*args, **kwargs):
+            raise ValueError("boom")
+
+        tools._poll_task_completion = broken
+        await tools._store_call("track", "t-9", 9e9, user_id="u1")
+        await tools._watch_persisted_task("t-9", 9e9)
+        return await tools._store_call("undelivered", "u1")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records = asyncio.run(run(os.path.join(tmp, "state.db")))
+    assert len(records) == 1
+    assert records[0]["status"] == "ERROR"
+    assert "boom" in records[0]["result"]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -0,0 +1,207 @@
+"""
+Offline tests for the tracer: span nesting through the active-span context
+variable, sampling, and the OTLP JSON lines written to trace_export_path.
+
+Run directly (python tests/test_tracing.py) or with pytest.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bytebot import FakeByteBot, FakeByteBotConfig
+import tool
+from tool import Tools, Tracer
+
+
+def read_spans(path: str) -> list:
+    """Return every span in the export file, checking each line's OTLP shape."""
+    if not os.path.exists(path):
+        return []
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            (resource,) = record["resourceSpans"]
+            assert resource["resource"]["attributes"] == [
+                {"key": "service.name", "value": {"stringValue": Tracer.SERVICE_NAME}}
+            ]
+            (scope,) = resource["scopeSpans"]
+            assert scope["scope"] == {
+                "name": Tracer.SERVICE_NAME,
+                "version": Tracer.SCOPE_VERSION,
+            }
+            spans.extend(scope["spans"])
+    return spans
+
+
+def traced_calls(path: str, calls: int = 1, sample_rate: float = 1.0) -> None:
+    async def run():
+        async with FakeByteBot(FakeByteBotConfig()) as server:
+            server.preload(3, age_seconds=3000)
+            tools = Tools()
+            tools.valves.bytebot_url = server.url
+            tools.valves.trace_export_path = path
+            tools.valves.trace_sample_rate = sample_rate
+            try:
+                for _ in range(calls):
+                    await tools.list_tasks()
+            finally:
+                await tools._aclose()
+
+    asyncio.run(run())
+
+
+def test_child_spans_nest_under_the_active_span():
+    async def run(tracer):
+        with tracer.start_trace("root", call=1) as root:
+            with tracer.span("outer") as outer:
+                inner = tracer.create_span("inner", kind=Tracer.KIND_CLIENT)
+                await asyncio.sleep(0)
+                inner.end()
+            assert Tracer.current_span() is root
+        assert Tracer.current_span().recording is False
+        await tracer.flush()
+        return root, outer, inner
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traces", "spans.jsonl")
+        tracer = Tracer()
+        tracer.configure(path, 1.0)
+        root, outer, inner = asyncio.run(run(tracer))
+        spans = {span["name"]: span for span in read_spans(path)}
+
+    assert set(spans) == {"root", "outer", "inner"}
+    assert {span["traceId"] for span in spans.values()} == {root.trace_id}
+    assert spans["root"]["parentSpanId"] == ""
+    assert spans["outer"]["parentSpanId"] == root.span_id
+    assert spans["inner"]["parentSpanId"] == outer.span_id
+    assert spans["root"]["kind"] == Tracer.KIND_SERVER
+    assert spans["inner"]["kind"] == Tracer.KIND_CLIENT
+    assert spans["root"]["attributes"] == [{"key": "call", "value": {"intValue": "1"}}]
+
+
+def test_concurrent_tasks_keep_their_own_parent():
+    async def child(tracer, name):
+        with tracer.span(name) as span:
+            await asyncio.sleep(0.01)
+            return span, Tracer.current_span()
+
+    async def run(tracer):
+        with tracer.start_trace("root") as root:
+            results = await asyncio.gather(child(tracer, "a"), child(tracer, "b"))
+        await tracer.flush()
+        return root, results
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "spans.jsonl")
+        tracer = Tracer()
+        tracer.configure(path, 1.0)
+        root, results = asyncio.run(run(tracer))
+        spans = read_spans(path)
+
+    for span, active in results:
+        assert active is span
+        assert span.parent_span_id == root.span_id
+    assert len(spans) == 3
+
+
+def test_tool_call_exports_root_and_http_spans():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "spans.jsonl")
+        traced_calls(path)
+        spans = read_spans(path)
+
+    (root,) = [span for span in spans if span["parentSpanId"] == ""]
+    assert root["name"] == "tool.list_tasks"
+    assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+    assert root["status"] == {"code": 0, "message": ""}
+    attributes = {a["key"]: a["value"] for a in root["attributes"]}
+    assert int(attributes["tool.result_chars"]["intValue"]) > 0
+
+    http = [span for span in spans if span["name"].startswith("HTTP GET")]
+    assert http, [span["name"] for span in spans]
+    ids = {span["spanId"] for span in spans}
+    for span in spans:
+        assert span["traceId"] == root["traceId"]
+        assert span["parentSpanId"] in ids | {""}
+        assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+    assert http[0]["kind"] == Tracer.KIND_CLIENT
+    attributes = {a["key"]: a["value"] for a in http[0]["attributes"]}
+    assert attributes["http.response.status_code"] == {"intValue": "200"}
+
+
+def test_exceptions_are_recorded_as_error_status():
+    async def run(tracer):
+        try:
+            with tracer.start_trace("root"):
+                raise ValueError("boom")
+        except ValueError:
+            pass
+        await tracer.flush()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "spans.jsonl")
+        tracer = Tracer()
+        tracer.configure(path, 1.0)
+        asyncio.run(run(tracer))
+        (span,) = read_spans(path)
+
+    assert span["status"] == {"code": 2, "message": "boom"}
+    (event,) = span["events"]
+    assert event["name"] == "exception"
+    assert {"key": "exception.type", "value": {"stringValue": "ValueError"}} in (
+        event["attributes"]
+    )
+
+
+def test_sampling_decides_per_tool_call():
+    draws = iter([0.2, 0.7, 0.4, 0.9])
+    original = tool.random.random
+    tool.random.random = lambda: next(draws)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spans.jsonl")
+            traced_calls(path, calls=4, sample_rate=0.5)
+            roots = [s for s in read_spans(path) if s["parentSpanId"] == ""]
+            assert len(roots) == 2
+
+            disabled = os.path.join(directory, "disabled.jsonl")
+            traced_calls(disabled, calls=2, sample_rate=0.0)
+            assert not os.path.exists(disabled)
+    finally:
+        tool.random.random = original
+
+
+def test_spans_are_written_off_the_event_loop():
+    writers = []
+    append = Tracer._append
+
+    def recording_append(lines):
+        writers.append(threading.get_ident())
+        append(lines)
+
+    Tracer._append = staticmethod(recording_append)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spans.jsonl")
+            traced_calls(path, calls=3)
+            roots = [s for s in read_spans(path) if s["parentSpanId"] == ""]
+    finally:
+        Tracer._append = staticmethod(append)
+    assert len(roots) == 3
+    assert writers
+    assert threading.get_ident() not in writers
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"PASS {name}")
@@ -11,14 +11,623 @@ license: MIT
 """
 
 import asyncio
+import contextvars
+import cProfile
+import csv
+import functools
+import io
 import json
+import math
+import os
+import pstats
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
 import time
-from collections import Counter
-from datetime import datetime
-from typing import Callable, Any, Optional, List, Dict
+import urllib.parse
+import uuid
+import weakref
+from array import array
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Any, Optional, List, Dict, Iterable, Iterator
 from pydantic import BaseModel, Field
 import aiohttp
 
+try:
+    import numpy as np
+except ImportError:  # Optional: analytics fall back to pure Python
+    np = None
+
+try:
+    import orjson
+except ImportError:  # Optional: faster JSON codec
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # Optional: faster JSON codec
+    ujson = None
+
+# Maximum number of rendered task results kept in the per-instance render cache
+RENDER_CACHE_SIZE = 1024
+
+# Task statuses after which ByteBot does no further work
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED")
+
+# Statuses where the task is paused waiting for a human
+ATTENTION_STATUSES = ("NEEDS_HELP", "NEEDS_REVIEW")
+
+# Statuses of tasks the agent is currently working on or about to start
+ACTIVE_STATUSES = ("PENDING", "IN_PROGRESS", "QUEUED")
+
+# Every status counted by the global status aggregator
+ALL_STATUSES = ACTIVE_STATUSES + ATTENTION_STATUSES + TERMINAL_STATUSES
+
+# Replay order for queued outbox submissions (higher first)
+PRIORITY_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "URGENT": 3}
+
+# Provisional IDs handed out for submissions parked in the outbox
+OUTBOX_ID_PREFIX = "outbox-"
+
+# Seconds between status polls (Fibonacci-like progression)
+POLL_INTERVALS = [2, 3, 5, 8, 13, 20]
+
+# Columns written by export_tasks() in CSV format when no fields are given
+EXPORT_CSV_FIELDS = (
+    "id",
+    "status",
+    "priority",
+    "description",
+    "type",
+    "control",
+    "createdAt",
+    "updatedAt",
+    "model",
+)
+
+# export_tasks() hands buffered rows to a worker thread once this many chars accumulate
+EXPORT_FLUSH_CHARS = 256 * 1024
+
+# Largest GET /tasks page whose timeout may be derived from probe latency
+ADAPTIVE_TIMEOUT_MAX_PAGE = 20
+
+# Execution log lines longer than this are truncated
+LOG_LINE_CHARS = 200
+
+# Steps always kept from the start and end of a budgeted execution log
+LOG_HEAD_STEPS = 3
+LOG_TAIL_STEPS = 5
+
+# Log lines that mention a problem are kept ahead of ordinary middle steps
+_LOG_ERROR_RE = re.compile(
+    r"\b(error|errors|failed|failure|exception|traceback|unable|cannot|denied)\b",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp from the ByteBot API (cached)."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Read a timestamp without an offset as UTC, so it compares with API times."""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _format_created_timestamp(created: str) -> str:
+    """Render a createdAt value as 'YYYY-MM-DD HH:MM:SS'.
+
+    Canonical ISO strings (the common case) are sliced directly instead of
+    being parsed; anything else goes through the cached parser.
+    """
+    if not created:
+        return "Unknown"
+
+    if (
+        len(created) >= 19
+        and created[4] == "-"
+        and created[7] == "-"
+        and created[10] in "T "
+        and created[13] == ":"
+        and created[16] == ":"
+    ):
+        return created[:10] + " " + created[11:19]
+
+    parsed = _parse_timestamp(created)
+    if parsed is not None:
+        return parsed.strftime("%Y-%m-%d %H:%M:%S")
+    return created[:19].replace("T", " ")
+
+
+class JsonCodec:
+    """JSON decoder/encoder pair for ByteBot request and response bodies."""
+
+    __slots__ = ("name", "loads", "_dumps")
+
+    def __init__(self, name: str, loads: Callable, dumps: Callable):
+        self.name = name
+        self.loads = loads  # Accepts bytes or str
+        self._dumps = dumps
+
+    def dumps(self, obj: Any) -> bytes:
+        """Compact UTF-8 encoded JSON."""
+        data = self._dumps(obj)
+        return data if isinstance(data, bytes) else data.encode("utf-8")
+
+    def dumps_text(self, obj: Any) -> str:
+        """Compact JSON as a string (for form fields and text files)."""
+        data = self._dumps(obj)
+        return data.decode("utf-8") if isinstance(data, bytes) else data
+
+
+def _load_json_codec(name: str) -> JsonCodec:
+    """Codec for a json_codec valve value.
+
+    "auto" picks the fastest installed library (orjson, then ujson); a
+    named library that is not installed falls back to the stdlib.
+    """
+    name = (name or "auto").strip().lower()
+    if orjson is not None and name in ("auto", "orjson"):
+        return JsonCodec("orjson", orjson.loads, orjson.dumps)
+    if ujson is not None and name in ("auto", "ujson"):
+        return JsonCodec(
+            "ujson",
+            ujson.loads,
+            functools.partial(
+                ujson.dumps, ensure_ascii=False, escape_forward_slashes=False
+            ),
+        )
+    return JsonCodec(
+        "json",
+        json.loads,
+        functools.partial(json.dumps, separators=(",", ":"), ensure_ascii=False),
+    )
+
+
+def _format_seconds(seconds: float) -> str:
+    """Render a duration compactly (45s, 12.5m, 3.2h)."""
+    if seconds != seconds:  # NaN
+        return "-"
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def _quantile(ordered: List[float], q: float) -> float:
+    """Linearly interpolated quantile of a sorted list (numpy's default method)."""
+    if not ordered:
+        return math.nan
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class MessageRecord:
+    """The parts of a task message the tool displays."""
+
+    __slots__ = ("role", "text")
+
+    def __init__(self, role: str, text: str):
+        self.role = role
+        self.text = text
+
+    @classmethod
+    def latest_assistant(cls, messages: Optional[list]) -> Optional["MessageRecord"]:
+        """The newest ASSISTANT message with a text block, if any."""
+        for msg in reversed(messages or ()):
+            if msg.get("role") == "ASSISTANT":
+                for block in msg.get("content") or ():
+                    if block.get("type") == "text":
+                        return cls("ASSISTANT", block.get("text") or "")
+        return None
+
+
+class TaskRecord:
+    """Compact view of a task from the ByteBot API.
+
+    Holds only the fields listings and polling read, with categorical
+    strings interned and timestamps converted once, so large pages can be
+    kept without the full JSON dicts and their message lists.
+    """
+
+    __slots__ = (
+        "id",
+        "status",
+        "priority",
+        "description",
+        "created",
+        "updated",
+        "model",
+        "latest_message",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        status: str,
+        priority: str,
+        description: str,
+        created: str,
+        updated: Optional[float],
+        model: Optional[str],
+        latest_message: Optional[MessageRecord],
+    ):
+        self.id = id
+        self.status = status
+        self.priority = priority
+        self.description = description
+        self.created = created  # Display form, 'YYYY-MM-DD HH:MM:SS'
+        self.updated = updated  # Epoch seconds, None if missing or naive
+        self.model = model
+        self.latest_message = latest_message
+
+    @classmethod
+    def from_api(cls, task: dict) -> "TaskRecord":
+        """Parse one task dict from GET /tasks or GET /tasks/{id}."""
+        updated = _parse_timestamp(task.get("updatedAt") or "")
+        model = task.get("model") or {}
+        model_name = model.get("title") or model.get("name")
+        return cls(
+            task.get("id") or "N/A",
+            sys.intern(task.get("status") or "UNKNOWN"),
+            sys.intern(task.get("priority") or "MEDIUM"),
+            task.get("description") or "No description",
+            _format_created_timestamp(task.get("createdAt") or ""),
+            (
+                updated.timestamp()
+                if updated is not None and updated.tzinfo is not None
+                else None
+            ),
+            sys.intern(model_name) if model_name else None,
+            MessageRecord.latest_assistant(task.get("messages")),
+        )
+
+    @classmethod
+    def coerce(cls, tasks: Iterable) -> List["TaskRecord"]:
+        """Records for a mix of records and raw task dicts."""
+        return [t if isinstance(t, cls) else cls.from_api(t) for t in tasks]
+
+
+class TaskColumns:
+    """Columnar arrays of task fields for single-pass analytics.
+
+    Categorical fields are stored as small integer codes into name lists,
+    so group statistics reduce to array operations over a few flat arrays
+    instead of repeated walks over the task dicts.
+    """
+
+    FIELDS = ("status", "model", "priority")
+
+    def __init__(self):
+        self.created = array("d")
+        self.duration = array("d")  # NaN while the task is still running
+        self.status = array("H")
+        self.model = array("H")
+        self.priority = array("H")
+        self.names: Dict[str, List[str]] = {field: [] for field in self.FIELDS}
+        self._codes: Dict[str, Dict[str, int]] = {field: {} for field in self.FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def _code(self, field: str, value: str) -> int:
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.names[field].append(value)
+        return code
+
+    def append(self, task: dict):
+        """Add one task from a GET /tasks page."""
+        status = task.get("status", "UNKNOWN")
+        created = _parse_timestamp(task.get("createdAt") or "")
+        updated = _parse_timestamp(task.get("updatedAt") or "")
+        model = task.get("model") or {}
+
+        self.created.append(created.timestamp() if created else math.nan)
+        if (
+            created
+            and updated
+            and (status in TERMINAL_STATUSES or status in ATTENTION_STATUSES)
+        ):
+            self.duration.append((updated - created).total_seconds())
+        else:
+            self.duration.append(math.nan)
+        self.status.append(self._code("status", status))
+        self.model.append(
+            self._code("model", model.get("title") or model.get("name") or "unknown")
+        )
+        self.priority.append(self._code("priority", task.get("priority", "MEDIUM")))
+
+    def window_hours(self) -> float:
+        """Hours from the first task's creation to the last task's finish."""
+        if not len(self):
+            return 0.0
+        if np is not None:
+            created = np.frombuffer(self.created, dtype=np.float64)
+            ends = created + np.nan_to_num(np.frombuffer(self.duration))
+            if np.isnan(created).all():
+                return 0.0
+            return float(np.nanmax(ends) - np.nanmin(created)) / 3600
+        pairs = [
+            (c, c + (d if d == d else 0.0))
+            for c, d in zip(self.created, self.duration)
+            if c == c
+        ]
+        if not pairs:
+            return 0.0
+        return (max(e for _, e in pairs) - min(c for c, _ in pairs)) / 3600
+
+    def group_stats(self, field: Optional[str]) -> List[dict]:
+        """Count, duration p50/p95 and outcome counts per value of field.
+
+        field=None treats all tasks as one group.
+        """
+        if field is None:
+            codes, names = array("H", bytes(2 * len(self))), ["all"]
+        else:
+            codes, names = getattr(self, field), self.names[field]
+        status_codes = self._codes["status"]
+        outcome_codes = {
+            name: status_codes.get(name, -1)
+            for name in ("COMPLETED", "FAILED", "NEEDS_HELP")
+        }
+        if np is not None:
+            return self._group_stats_numpy(codes, names, outcome_codes)
+        return self._group_stats_python(codes, names, outcome_codes)
+
+    def _group_stats_numpy(self, codes, names, outcome_codes) -> List[dict]:
+        size = len(names)
+        group = np.frombuffer(codes, dtype=np.uint16).astype(np.intp)
+        status = np.frombuffer(self.status, dtype=np.uint16)
+        duration = np.frombuffer(self.duration, dtype=np.float64)
+        finished = ~np.isnan(duration)
+
+        counts = np.bincount(group, minlength=size)
+        finished_counts = np.bincount(group[finished], minlength=size)
+        outcomes = {
+            name: np.bincount(group, weights=status == code, minlength=size)
+            for name, code in outcome_codes.items()
+        }
+
+        # Sort finished durations by (group, duration) once, then slice per group
+        finished_group = group[finished]
+        order = np.lexsort((duration[finished], finished_group))
+        ordered = duration[finished][order]
+        bounds = np.searchsorted(finished_group[order], np.arange(size + 1))
+
+        rows = []
+        for code, name in enumerate(names):
+            values = ordered[bounds[code] : bounds[code + 1]]
+            p50, p95 = (
+                np.quantile(values, [0.5, 0.95]) if len(values) else (math.nan,) * 2
+            )
+            rows.append(
+                {
+                    "name": name,
+                    "tasks": int(counts[code]),
+                    "finished": int(finished_counts[code]),
+                    "p50": float(p50),
+                    "p95": float(p95),
+                    **{k.lower(): int(v[code]) for k, v in outcomes.items()},
+                }
+            )
+        return rows
+
+    def _group_stats_python(self, codes, names, outcome_codes) -> List[dict]:
+        durations: List[List[float]] = [[] for _ in names]
+        counts = [0] * len(names)
+        outcomes = {name: [0] * len(names) for name in outcome_codes}
+        code_outcomes = {code: name for name, code in outcome_codes.items()}
+        for code, status, duration in zip(codes, self.status, self.duration):
+            counts[code] += 1
+            if duration == duration:
+                durations[code].append(duration)
+            outcome = code_outcomes.get(status)
+            if outcome:
+                outcomes[outcome][code] += 1
+
+        rows = []
+        for code, name in enumerate(names):
+            ordered = sorted(durations[code])
+            rows.append(
+                {
+                    "name": name,
+                    "tasks": counts[code],
+                    "finished": len(ordered),
+                    "p50": _quantile(ordered, 0.5),
+                    "p95": _quantile(ordered, 0.95),
+                    **{k.lower(): v[code] for k, v in outcomes.items()},
+                }
+            )
+        return rows
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def _iter_log_lines(messages: Iterable[dict]) -> Iterator[str]:
+    """Yield the (truncated) text blocks of ASSISTANT messages in order."""
+    for msg in messages:
+        if msg.get("role") != "ASSISTANT":
+            continue
+        for block in msg.get("content", []):
+            if block.get("type") == "text":
+                text = block.get("text", "")
+                if len(text) > LOG_LINE_CHARS:
+                    text = text[:LOG_LINE_CHARS] + "..."
+                yield text
+
+
+def _shard_files(
+    files: List, sizes: List[int], max_files: int, max_bytes: int
+) -> List[List[int]]:
+    """Split file indexes into consecutive groups of at most max_files files
+    and max_bytes bytes (a larger file gets a group of its own)."""
+    shards: List[List[int]] = []
+    current: List[int] = []
+    current_bytes = 0
+    for index in range(len(files)):
+        size = sizes[index]
+        if current and (len(current) >= max_files or current_bytes + size > max_bytes):
+            shards.append(current)
+            current, current_bytes = [], 0
+        current.append(index)
+        current_bytes += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+class MessageStream:
+    """Incremental view of one task's messages across polls.
+
+    Remembers how many messages were already consumed (and the ID of the
+    last one), so each poll only looks at messages that arrived since the
+    previous poll instead of the whole history.
+    """
+
+    __slots__ = ("cursor", "last_id", "emitted")
+
+    def __init__(self):
+        self.cursor = 0
+        self.last_id: Optional[str] = None
+        self.emitted = 0  # Lines streamed so far
+
+    def new_messages(self, messages: List[dict]) -> List[dict]:
+        """Messages not seen on earlier polls."""
+        start = self.cursor
+        if start and (
+            start > len(messages) or messages[start - 1].get("id") != self.last_id
+        ):
+            # History changed under us: resume after the last message we saw,
+            # or skip to the end rather than repeat what was already shown
+            start = len(messages)
+            for i in range(len(messages) - 1, -1, -1):
+                if messages[i].get("id") == self.last_id:
+                    start = i + 1
+                    break
+        new = messages[start:]
+        if messages:
+            self.cursor = len(messages)
+            self.last_id = messages[-1].get("id")
+        return new
+
+
+def _collapse_repeats(lines: Iterable[str]) -> Iterator[tuple]:
+    """Merge runs of identical or near-identical lines into (text, count).
+
+    Lines are compared with digits and whitespace normalised, so
+    "Retrying click (attempt 3)" and "(attempt 4)" collapse together.
+    """
+    current, key, count = None, None, 0
+    for line in lines:
+        line_key = re.sub(r"\s+", " ", re.sub(r"\d+", "#", line.lower())).strip()
+        if line_key == key:
+            count += 1
+            continue
+        if current is not None:
+            yield current, count
+        current, key, count = line, line_key, 1
+    if current is not None:
+        yield current, count
+
+
+def _budget_log_lines(messages: Iterable[dict], token_budget: int) -> Iterator[str]:
+    """Yield execution log lines that fit within token_budget.
+
+    Repeated steps are collapsed, the first and last steps and any error
+    lines are kept first, and the remaining budget is spent on the most
+    recent middle steps. Gaps are marked with a single omission line. A
+    budget of 0 or less yields every line unchanged.
+
+    The log is read in one pass holding only the head, the newest steps that
+    could still fit and the newest error lines, so memory is bounded by the
+    budget rather than by the length of the log.
+    """
+    if token_budget <= 0:
+        for text in _iter_log_lines(messages):
+            yield f"- {text}"
+        return
+
+    # Steps are (line, tokens, count, steps before it)
+    head = []
+    recent: deque = deque()
+    recent_tokens = 0
+    older_errors: deque = deque()
+    error_tokens = 0
+    total = 0
+    for text, count in _collapse_repeats(_iter_log_lines(messages)):
+        line = f"- {text}" if count == 1 else f"- {text} (x{count})"
+        step = (line, _estimate_tokens(line) + 1, count, total)
+        total += count
+        if len(head) < LOG_HEAD_STEPS:
+            head.append(step)
+            continue
+        recent.append(step)
+        recent_tokens += step[1]
+        while len(recent) > LOG_TAIL_STEPS and recent_tokens > token_budget:
+            old = recent.popleft()
+            recent_tokens -= old[1]
+            if _LOG_ERROR_RE.search(old[0]):
+                older_errors.append(old)
+                error_tokens += old[1]
+                while error_tokens > token_budget:
+                    error_tokens -= older_errors.popleft()[1]
+    if not head:
+        return
+
+    middle = list(recent)
+    tail = middle[max(0, len(middle) - LOG_TAIL_STEPS) :]
+    del middle[len(middle) - len(tail) :]
+    errors = [s for s in reversed(middle) if _LOG_ERROR_RE.search(s[0])]
+    errors.extend(reversed(older_errors))
+    rest = [s for s in reversed(middle) if not _LOG_ERROR_RE.search(s[0])]
+
+    # Every gap costs one omission marker: reserve one for the gap between
+    # head and tail, and one more for each kept error that splits a gap
+    marker = _estimate_tokens(f"- ... {total} steps omitted ...") + 1
+    remaining = token_budget - marker
+    keep = []
+    for step in [*head, *tail]:
+        if step[1] <= remaining:
+            keep.append(step)
+            remaining -= step[1]
+    for step in errors:
+        if step[1] + marker <= remaining:
+            keep.append(step)
+            remaining -= step[1] + marker
+    for step in rest:
+        if step[1] > remaining:
+            break
+        keep.append(step)
+        remaining -= step[1]
+
+    position = 0
+    for line, _, count, before in sorted(keep, key=lambda step: step[3]):
+        if before > position:
+            yield f"- ... {before - position} steps omitted ..."
+        yield line
+        position = before + count
+    if total > position:
+        yield f"- ... {total - position} steps omitted ..."
+
 
 class EventEmitter:
     """Helper class for emitting status events to OpenWebUI."""
@@ -27,9 +636,13 @@ class EventEmitter:
         self,
         event_emitter: Optional[Callable[[dict], Any]] = None,
         verbosity: str = "normal",
+        metrics: Optional["MetricsRegistry"] = None,
+        tracer: Optional["Tracer"] = None,
     ):
         self.event_emitter = event_emitter
         self.verbosity = verbosity
+        self.metrics = metrics
+        self.tracer = tracer
         self.last_emit_time = 0
         self.emit_count = 0
 
@@ -43,22 +656,48 @@ class EventEmitter:
         time_since_last = current_time - self.last_emit_time
 
         if not done:
-            if self.verbosity == "minimal" and time_since_last < 10:
-                return  # Only emit every 10 seconds for minimal
-            elif (
+            if (self.verbosity == "minimal" and time_since_last < 10) or (
                 self.verbosity == "normal"
                 and time_since_last < 3
                 and self.emit_count > 0
             ):
-                return  # Every 3 seconds for normal (except first)
+                # Every 10 seconds for minimal, 3 seconds for normal (except first)
+                if self.metrics:
+                    self.metrics.inc("events_throttled_total")
+                return
 
-        await self.event_emitter(
-            {"type": "status", "data": {"description": description, "done": done}}
-        )
+        emit_start = time.perf_counter()
+        span = self.tracer.create_span("emit", done=done) if self.tracer else None
+        try:
+            await self.event_emitter(
+                {"type": "status", "data": {"description": description, "done": done}}
+            )
+        finally:
+            if span:
+                span.end()
+        if self.metrics:
+            self.metrics.inc("events_emitted_total", type="status")
+            self.metrics.observe(
+                "event_emit_duration_seconds", time.perf_counter() - emit_start
+            )
 
         self.last_emit_time = current_time
         self.emit_count += 1
 
+    async def emit_message(self, content: str):
+        """Append content to the chat message (never throttled)."""
+        if not self.event_emitter:
+            return
+
+        span = self.tracer.create_span("emit", type="message") if self.tracer else None
+        try:
+            await self.event_emitter({"type": "message", "data": {"content": content}})
+        finally:
+            if span:
+                span.end()
+        if self.metrics:
+            self.metrics.inc("events_emitted_total", type="message")
+
 
 class ErrorFormatter:
     """Format errors into user-friendly messages."""
@@ -142,224 +781,3747 @@ How to Help:
 Tip: Common reasons include ambiguous instructions, authentication prompts, or CAPTCHAs."""
 
 
-class Tools:
-    """ByteBot Automation Tool - Execute and manage automation tasks on ByteBot AI desktop agent."""
+class MetricsRegistry:
+    """In-process counters, gauges and histograms with Prometheus text export."""
+
+    PREFIX = "bytebot_tool_"
+
+    # Default histogram buckets (seconds) for latency-style metrics
+    LATENCY_BUCKETS = (
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+        30.0,
+        60.0,
+        300.0,
+    )
+    COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+    HELP = {
+        "http_request_duration_seconds": "HTTP request latency until response headers, per endpoint",
+        "http_responses_total": "HTTP responses by endpoint and status code",
+        "http_request_errors_total": "HTTP requests that failed without a response",
+        "http_requests_in_flight": "HTTP requests currently in flight",
+        "http_request_bytes_total": "Request body bytes sent",
+        "http_response_bytes_total": "Response body bytes received",
+        "request_retries_total": "Retries issued by _retry_request",
+        "request_failures_total": "Requests that failed after all retries",
+        "task_polls_total": "Status polls issued while waiting for tasks",
+        "task_polls_per_task": "Number of polls needed per waited task",
+        "task_completion_detection_seconds": "Delay between task updatedAt and detection of its terminal state",
+        "tasks_polling_in_flight": "Tasks currently being polled",
+        "uploads_in_flight": "File uploads currently in progress",
+        "upload_files_total": "Files uploaded",
+        "upload_bytes_total": "File content bytes uploaded",
+        "events_emitted_total": "Events delivered to the OpenWebUI event emitter",
+        "streamed_task_steps_total": "Task steps streamed into the chat while polling",
+        "shards_total": "Sharded file-upload tasks by final status",
+        "events_throttled_total": "Status events dropped by verbosity throttling",
+        "event_emit_duration_seconds": "Time spent awaiting the OpenWebUI event emitter",
+        "outbox_entries_total": "Outbox submissions by outcome (queued, submitted, duplicate, rejected, retry)",
+        "adaptive_timeout_seconds": "Request timeout derived from health probe latency, per host",
+        "scheduler_queued_submissions": "Task submissions waiting for their fair share of the agent",
+        "scheduler_wait_seconds": "Time task submissions waited in the per-user scheduler",
+    }
 
-    class Valves(BaseModel):
-        """Admin-level configuration for ByteBot integration."""
+    def __init__(self):
+        # Tool calls may run on several threads (one event loop each)
+        self._lock = threading.RLock()
+        self._counters: Dict[tuple, float] = {}
+        self._gauges: Dict[tuple, float] = {}
+        self._histograms: Dict[tuple, dict] = {}
+        self._histogram_buckets: Dict[str, tuple] = {}
 
-        bytebot_url: str = Field(
-            default="http://192.168.0.102:9991", description="ByteBot Agent API URL"
-        )
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Increment a counter."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        """Move a gauge up or down."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to an absolute value."""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(
+        self, name: str, value: float, buckets: Optional[tuple] = None, **labels
+    ):
+        """Record a histogram observation."""
+        key = self._key(name, labels)
+        with self._lock:
+            bounds = self._histogram_buckets.setdefault(
+                name, buckets or self.LATENCY_BUCKETS
+            )
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = {"counts": [0] * (len(bounds) + 1), "sum": 0.0, "count": 0}
+                self._histograms[key] = hist
+
+            index = len(bounds)
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    index = i
+                    break
+            hist["counts"][index] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self._counters.get(self._key(name, labels), 0)
+
+    def counters(self, name: str) -> List[tuple]:
+        """Return (labels, value) pairs for a counter."""
+        with self._lock:
+            return [(dict(k[1]), v) for k, v in self._counters.items() if k[0] == name]
+
+    def gauges(self, name: str) -> List[tuple]:
+        """Return (labels, value) pairs for a gauge."""
+        with self._lock:
+            return [(dict(k[1]), v) for k, v in self._gauges.items() if k[0] == name]
+
+    def histograms(self, name: str) -> List[tuple]:
+        """Return (labels, histogram) pairs for a histogram."""
+        with self._lock:
+            return [
+                (dict(k[1]), dict(h, counts=list(h["counts"])))
+                for k, h in self._histograms.items()
+                if k[0] == name
+            ]
+
+    def quantile(self, name: str, hist: dict, q: float) -> float:
+        """Estimate a quantile by interpolating within histogram buckets."""
+        if not hist["count"]:
+            return 0.0
+        bounds = self._histogram_buckets[name]
+        rank = q * hist["count"]
+        cumulative = 0
+        for i, count in enumerate(hist["counts"]):
+            if cumulative + count >= rank and count:
+                lower = bounds[i - 1] if i > 0 else 0.0
+                upper = bounds[i] if i < len(bounds) else bounds[-1]
+                return lower + (upper - lower) * ((rank - cumulative) / count)
+            cumulative += count
+        return bounds[-1]
 
-        litellm_proxy_url: str = Field(
-            default="",
-            description="LiteLLM proxy URL for model info (optional, e.g., http://localhost:4000)",
+    @staticmethod
+    def _escape_label_value(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    @classmethod
+    def _format_labels(cls, labels: tuple, extra: Optional[tuple] = None) -> str:
+        items = list(labels) + list(extra or ())
+        if not items:
+            return ""
+        rendered = ",".join(f'{k}="{cls._escape_label_value(v)}"' for k, v in items)
+        return "{" + rendered + "}"
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            return self._render_prometheus()
+
+    def _render_prometheus(self) -> str:
+        lines = []
+
+        def header(name: str, kind: str):
+            full = self.PREFIX + name
+            lines.append(f"# HELP {full} {self.HELP.get(name, name)}")
+            lines.append(f"# TYPE {full} {kind}")
+
+        for kind, store in (("counter", self._counters), ("gauge", self._gauges)):
+            for name in sorted({k[0] for k in store}):
+                header(name, kind)
+                for key in sorted(k for k in store if k[0] == name):
+                    lines.append(
+                        f"{self.PREFIX}{name}{self._format_labels(key[1])} {store[key]:g}"
+                    )
+
+        for name in sorted({k[0] for k in self._histograms}):
+            header(name, "histogram")
+            bounds = self._histogram_buckets[name]
+            for key in sorted(k for k in self._histograms if k[0] == name):
+                hist = self._histograms[key]
+                cumulative = 0
+                for bound, count in zip(bounds, hist["counts"]):
+                    cumulative += count
+                    labels = self._format_labels(key[1], (("le", f"{bound:g}"),))
+                    lines.append(f"{self.PREFIX}{name}_bucket{labels} {cumulative}")
+                labels = self._format_labels(key[1], (("le", "+Inf"),))
+                lines.append(f"{self.PREFIX}{name}_bucket{labels} {hist['count']}")
+                plain = self._format_labels(key[1])
+                lines.append(f"{self.PREFIX}{name}_sum{plain} {hist['sum']:g}")
+                lines.append(f"{self.PREFIX}{name}_count{plain} {hist['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Atomically write the exposition to a file (node_exporter textfile style)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _endpoint_host(url: str) -> str:
+    """Return scheme://host:port for a URL."""
+    scheme, _, rest = url.partition("://")
+    return f"{scheme}://{rest.split('/', 1)[0]}"
+
+
+def _endpoint_label(url: Any) -> str:
+    """Collapse a request URL to a low-cardinality endpoint label (e.g. /tasks/{id})."""
+    path = getattr(url, "path", None) or str(url).split("?", 1)[0]
+    segments = path.split("/")
+    for i in range(1, len(segments)):
+        if segments[i - 1] == "tasks" and segments[i]:
+            segments[i] = "{id}"
+    return "/".join(segments) or "/"
+
+
+def _is_transient_error(error: BaseException) -> bool:
+    """True for failures that retrying later can fix: connection errors,
+    timeouts, 5xx, 408 and 429. Other 4xx answers are permanent."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return not (400 <= error.status < 500) or error.status in (408, 429)
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+class Span:
+    """A single timed operation within a trace."""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_span_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "events",
+        "status_code",
+        "status_message",
+        "is_root",
+        "_tracer",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_span_id: str = "",
+        kind: int = 1,
+        attributes: Optional[dict] = None,
+    ):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = dict(attributes) if attributes else {}
+        self.events: List[dict] = []
+        self.status_code = 0  # STATUS_CODE_UNSET
+        self.status_message = ""
+        self.is_root = not parent_span_id
+
+    @property
+    def recording(self) -> bool:
+        return True
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException):
+        self.status_code = 2  # STATUS_CODE_ERROR
+        self.status_message = str(error)[:200]
+        self.events.append(
+            {
+                "name": "exception",
+                "timeUnixNano": str(time.time_ns()),
+                "attributes": Tracer.encode_attributes(
+                    {
+                        "exception.type": type(error).__name__,
+                        "exception.message": str(error)[:500],
+                    }
+                ),
+            }
         )
 
-        task_timeout_seconds: int = Field(
-            default=600,
-            description="Maximum time to wait for task completion (10 minutes)",
+    def end(self):
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        self._tracer.finish(self)
+
+
+class _NoopSpan:
+    """Stand-in span for unsampled or disabled traces."""
+
+    recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_exception(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    "bytebot_current_span", default=None
+)
+
+
+class _SpanScope:
+    """Context manager that activates a span for the current task."""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Any):
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and not isinstance(exc, asyncio.CancelledError):
+            self.span.record_exception(exc)
+        self.span.end()
+        _current_span.reset(self._token)
+        return False
+
+
+class Tracer:
+    """Minimal tracer exporting OTLP-compatible JSON lines to a local file.
+
+    Traces start at tool method boundaries; every other span is a child of
+    the active span and is dropped when there is none or it was not sampled.
+    Finished traces are queued and appended by one executor job at a time, so
+    the event loop never blocks on the file and lines keep their order.
+    """
+
+    SERVICE_NAME = "bytebot-openwebui-tool"
+    SCOPE_VERSION = "1.2.0"
+
+    # OTLP span kinds
+    KIND_INTERNAL = 1
+    KIND_SERVER = 2
+    KIND_CLIENT = 3
+
+    def __init__(self):
+        self.export_path = ""
+        self.sample_rate = 0.0
+        self._pending: Dict[str, List[Span]] = {}
+        self._queued: List[tuple] = []
+        self._queue_lock = threading.Lock()
+        self._writer: Optional[asyncio.Future] = None
+
+    def configure(self, export_path: str, sample_rate: float):
+        self.export_path = export_path
+        self.sample_rate = sample_rate
+
+    @staticmethod
+    def current_span() -> Any:
+        return _current_span.get() or _NOOP_SPAN
+
+    def start_trace(self, name: str, **attributes) -> _SpanScope:
+        """Open a root span, applying the sampling decision."""
+        if (
+            not self.export_path
+            or self.sample_rate <= 0
+            or random.random() >= self.sample_rate
+        ):
+            return _SpanScope(_NOOP_SPAN)
+        span = Span(
+            self,
+            name,
+            os.urandom(16).hex(),
+            kind=self.KIND_SERVER,
+            attributes=attributes,
+        )
+        self._pending[span.trace_id] = []
+        return _SpanScope(span)
+
+    def create_span(self, name: str, kind: int = KIND_INTERNAL, **attributes) -> Any:
+        """Create a child of the active span without activating it."""
+        parent = _current_span.get()
+        if parent is None or not parent.recording:
+            return _NOOP_SPAN
+        return Span(
+            self,
+            name,
+            parent.trace_id,
+            parent_span_id=parent.span_id,
+            kind=kind,
+            attributes=attributes,
         )
 
-        polling_interval_seconds: int = Field(
-            default=3, description="Initial polling interval for task status checks"
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes) -> _SpanScope:
+        """Create and activate a child of the active span."""
+        return _SpanScope(self.create_span(name, kind, **attributes))
+
+    def finish(self, span: Span):
+        """Buffer a finished span; export the whole trace when its root ends."""
+        pending = self._pending.get(span.trace_id)
+        if span.is_root:
+            spans = self._pending.pop(span.trace_id, [])
+            spans.append(span)
+            self._export(spans)
+        elif pending is not None:
+            pending.append(span)
+        else:
+            # Span outlived its root (e.g. a background watcher)
+            self._export([span])
+
+    @staticmethod
+    def encode_attributes(attributes: dict) -> List[dict]:
+        encoded = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                typed = {"boolValue": value}
+            elif isinstance(value, int):
+                typed = {"intValue": str(value)}
+            elif isinstance(value, float):
+                typed = {"doubleValue": value}
+            else:
+                typed = {"stringValue": str(value)}
+            encoded.append({"key": key, "value": typed})
+        return encoded
+
+    def _export(self, spans: List[Span]):
+        record = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": self.encode_attributes(
+                            {"service.name": self.SERVICE_NAME}
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {
+                                "name": self.SERVICE_NAME,
+                                "version": self.SCOPE_VERSION,
+                            },
+                            "spans": [
+                                {
+                                    "traceId": span.trace_id,
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_span_id,
+                                    "name": span.name,
+                                    "kind": span.kind,
+                                    "startTimeUnixNano": str(span.start_ns),
+                                    "endTimeUnixNano": str(span.end_ns),
+                                    "attributes": self.encode_attributes(
+                                        span.attributes
+                                    ),
+                                    "events": span.events,
+                                    "status": {
+                                        "code": span.status_code,
+                                        "message": span.status_message,
+                                    },
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._queue_lock:
+            self._queued.append((self.export_path, line))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._append(self._take_queued())  # No loop to block
+            return
+        if self._writer is None or self._writer.get_loop().is_closed():
+            self._start_writer(loop)
+
+    def _take_queued(self) -> List[tuple]:
+        with self._queue_lock:
+            lines, self._queued = self._queued, []
+        return lines
+
+    def _start_writer(self, loop: asyncio.AbstractEventLoop):
+        self._writer = loop.run_in_executor(None, self._append, self._take_queued())
+        self._writer.add_done_callback(self._writer_done)
+
+    def _writer_done(self, future: asyncio.Future):
+        self._writer = None
+        if self._queued:
+            self._start_writer(future.get_loop())
+
+    @staticmethod
+    def _append(lines: List[tuple]):
+        """Append queued (path, line) pairs, one open per run of the same path."""
+        index = 0
+        while index < len(lines):
+            path = lines[index][0]
+            end = index
+            while end < len(lines) and lines[end][0] == path:
+                end += 1
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(line for _, line in lines[index:end]))
+            except OSError:
+                pass  # Tracing must never break a tool call
+            index = end
+
+    async def flush(self):
+        """Wait until trace lines queued from this loop have been written."""
+        current = asyncio.get_running_loop()
+        while self._writer is not None and self._writer.get_loop() is current:
+            await asyncio.wait([self._writer])
+            await asyncio.sleep(0)  # Let the done callback start the next batch
+
+
+class _AsyncStackSampler(threading.Thread):
+    """Wall-clock sampler for one asyncio task.
+
+    While the task is running on the loop thread, the thread's Python stack is
+    sampled (CPU time). While it is suspended, its coroutine await chain is
+    sampled instead, so time spent waiting on I/O is attributed to the await
+    site that caused it.
+    """
+
+    def __init__(
+        self, task: asyncio.Task, loop: asyncio.AbstractEventLoop, interval: float
+    ):
+        super().__init__(name="bytebot-profiler", daemon=True)
+        self.task = task
+        self.loop = loop
+        self.interval = interval
+        self.loop_thread_id = threading.get_ident()
+        self.stop_event = threading.Event()
+        self.inclusive: Counter = Counter()
+        self.leaf: Counter = Counter()
+        self.cpu_samples = 0
+        self.await_samples = 0
+
+    @staticmethod
+    def _label(code: Any, lineno: int) -> str:
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+
+    def _thread_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code, frame.f_lineno))
+            frame = frame.f_back
+        return stack  # innermost first
+
+    def _await_stack(self) -> List[str]:
+        stack = []
+        awaitable = self.task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(
+                awaitable, "gi_frame", None
+            )
+            if frame is not None:
+                stack.append(self._label(frame.f_code, frame.f_lineno))
+            nested = getattr(awaitable, "cr_await", None)
+            if nested is None:
+                nested = getattr(awaitable, "gi_yieldfrom", None)
+            if nested is None:
+                break
+            awaitable = nested
+        if awaitable is not None and not hasattr(awaitable, "cr_frame"):
+            stack.append(f"<await {type(awaitable).__name__}>")
+        stack.reverse()  # innermost first
+        return stack
+
+    def sample(self):
+        if self.task.done():
+            return
+        try:
+            running = asyncio.current_task(self.loop) is self.task
+        except RuntimeError:
+            return
+        if running:
+            stack = self._thread_stack()
+            self.cpu_samples += 1
+        else:
+            stack = self._await_stack()
+            self.await_samples += 1
+        if not stack:
+            return
+        self.leaf[stack[0]] += 1
+        for label in set(stack):
+            self.inclusive[label] += 1
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def report(self, top_n: int) -> str:
+        total = self.cpu_samples + self.await_samples
+        lines = [
+            f"Samples: {total} every {self.interval * 1000:.1f}ms "
+            f"(running: {self.cpu_samples}, awaiting: {self.await_samples})",
+            "",
+            f"Top {top_n} by inclusive wall time:",
+        ]
+        for label, count in self.inclusive.most_common(top_n):
+            lines.append(f"  {count / max(total, 1):6.1%}  {count:6d}  {label}")
+        lines.append("")
+        lines.append(f"Top {top_n} by self wall time:")
+        for label, count in self.leaf.most_common(top_n):
+            lines.append(f"  {count / max(total, 1):6.1%}  {count:6d}  {label}")
+        return "\n".join(lines)
+
+
+class CallProfiler:
+    """Opt-in, rate-limited profiling of individual tool calls.
+
+    Reports are rendered and written by a worker thread so the event loop
+    does not wait on pstats or the file system.
+    """
+
+    def __init__(self):
+        self._call_counts: Counter = Counter()
+        self._deterministic_active = False
+
+    def should_profile(self, method: str, valves: Any) -> bool:
+        """Decide whether this call is profiled (one call in N per method)."""
+        if not valves.profiling_enabled:
+            return False
+        selected = [m.strip() for m in valves.profiling_methods.split(",") if m.strip()]
+        if selected and method not in selected:
+            return False
+        self._call_counts[method] += 1
+        every = max(1, valves.profiling_sample_every)
+        return (self._call_counts[method] - 1) % every == 0
+
+    async def profile(self, method: str, call: Callable, valves: Any) -> Any:
+        """Await call() under the configured profiler and write a report."""
+        mode = valves.profiling_mode.lower()
+        if mode == "deterministic":
+            if self._deterministic_active:
+                # cProfile cannot nest; concurrent calls run unprofiled
+                return await call()
+            return await self._profile_deterministic(method, call, valves)
+        return await self._profile_sampling(method, call, valves)
+
+    async def _profile_deterministic(self, method: str, call: Callable, valves: Any):
+        profile = cProfile.Profile()
+        self._deterministic_active = True
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            return await call()
+        finally:
+            profile.disable()
+            self._deterministic_active = False
+            await asyncio.to_thread(
+                self._write_report,
+                method,
+                "deterministic",
+                time.perf_counter() - start,
+                functools.partial(
+                    self._deterministic_report, profile, valves.profiling_top_n
+                ),
+                valves,
+            )
+
+    @staticmethod
+    def _deterministic_report(profile: cProfile.Profile, top_n: int) -> str:
+        buffer = io.StringIO()
+        stats = pstats.Stats(profile, stream=buffer)
+        stats.sort_stats("cumulative").print_stats(top_n)
+        return (
+            "Note: deterministic mode measures CPU time of everything running "
+            "on the event loop thread during the call.\n\n" + buffer.getvalue()
         )
 
-        max_retries: int = Field(
-            default=3, description="Maximum retry attempts for failed API requests"
+    async def _profile_sampling(self, method: str, call: Callable, valves: Any):
+        task = asyncio.ensure_future(call())
+        sampler = _AsyncStackSampler(
+            task,
+            asyncio.get_running_loop(),
+            max(valves.profiling_interval_ms, 1) / 1000,
         )
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            return await task
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop_event.set()
+            sampler.join()
+            # A call shorter than one interval has nothing worth reporting
+            if sampler.cpu_samples + sampler.await_samples:
+                await asyncio.to_thread(
+                    self._write_report,
+                    method,
+                    "sampling",
+                    elapsed,
+                    functools.partial(sampler.report, valves.profiling_top_n),
+                    valves,
+                )
 
-        max_file_size_mb: int = Field(
-            default=100, description="Maximum file size for uploads (MB)"
+    @staticmethod
+    def _write_report(
+        method: str, mode: str, elapsed: float, render: Callable[[], str], valves: Any
+    ):
+        directory = valves.profiling_output_dir or os.path.join(
+            tempfile.gettempdir(), "bytebot_profiles"
+        )
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(
+            directory, f"{stamp}-{method}-{os.getpid()}-{time.time_ns() % 10**6}.txt"
+        )
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"Tool method: {method}\nMode: {mode}\n")
+                f.write(f"Wall time: {elapsed:.3f}s\n\n{render()}\n")
+        except OSError:
+            pass  # Profiling must never break a tool call
+
+
+class TaskStore:
+    """Small SQLite store for tasks the tool is waiting on.
+
+    Records survive OpenWebUI restarts so polling can resume and results that
+    arrive while nobody is waiting are kept until the owning user calls in.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS inflight_tasks (
+            task_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL DEFAULT '',
+            chat_id TEXT NOT NULL DEFAULT '',
+            description TEXT NOT NULL DEFAULT '',
+            deadline REAL NOT NULL,
+            state TEXT NOT NULL DEFAULT 'waiting',
+            status TEXT NOT NULL DEFAULT '',
+            result TEXT NOT NULL DEFAULT '',
+            created REAL NOT NULL,
+            finished REAL,
+            delivered INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_inflight_state ON inflight_tasks (state, user_id);
+        CREATE TABLE IF NOT EXISTS outbox (
+            entry_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL DEFAULT '',
+            chat_id TEXT NOT NULL DEFAULT '',
+            priority TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            task_id TEXT NOT NULL DEFAULT '',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            attempted REAL,
+            error TEXT NOT NULL DEFAULT '',
+            created REAL NOT NULL,
+            updated REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_outbox_queue ON outbox (state, rank, created);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def _update(self, sql: str, params: tuple = ()) -> int:
+        """Run a write statement and return the number of rows it changed."""
+        with self._lock:
+            return self._connection().execute(sql, params).rowcount
+
+    def track(
+        self,
+        task_id: str,
+        deadline: float,
+        user_id: str = "",
+        chat_id: str = "",
+        description: str = "",
+    ):
+        """Record a task the tool has started waiting on."""
+        self._execute(
+            "INSERT OR REPLACE INTO inflight_tasks "
+            "(task_id, user_id, chat_id, description, deadline, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (task_id, user_id, chat_id, description[:500], deadline, time.time()),
         )
 
-        max_files_per_task: int = Field(
-            default=20, description="Maximum number of files per task"
+    def finish(self, task_id: str, status: str, result: str, delivered: bool):
+        """Store a task's final state and rendered result."""
+        self._execute(
+            "UPDATE inflight_tasks SET state = 'finished', status = ?, result = ?, "
+            "finished = ?, delivered = ? WHERE task_id = ?",
+            (status, result, time.time(), int(delivered), task_id),
         )
 
-        configured_models: str = Field(
-            default="Qwen3-VL-32B-Instruct",
-            description="Comma-separated list of configured models (for documentation)",
+    def forget(self, task_id: str):
+        self._execute("DELETE FROM inflight_tasks WHERE task_id = ?", (task_id,))
+
+    def waiting(self) -> List[sqlite3.Row]:
+        """Tasks that still have no recorded outcome."""
+        return self._execute(
+            "SELECT * FROM inflight_tasks WHERE state = 'waiting' ORDER BY created"
         )
 
-        default_model_name: str = Field(
-            default="openai/Qwen3-VL-32B-Instruct",
-            description="Default AI model name for task execution",
+    def undelivered(self, user_id: str) -> List[sqlite3.Row]:
+        """Finished tasks owned by user_id whose result nobody has seen yet."""
+        return self._execute(
+            "SELECT * FROM inflight_tasks WHERE state = 'finished' AND delivered = 0 "
+            "AND user_id = ? ORDER BY finished",
+            (user_id,),
         )
 
-        default_model_provider: str = Field(
-            default="proxy",
-            description="AI model provider (proxy, openai, anthropic, etc.)",
+    def mark_delivered(self, task_ids: List[str]):
+        for task_id in task_ids:
+            self._execute(
+                "UPDATE inflight_tasks SET delivered = 1 WHERE task_id = ?", (task_id,)
+            )
+
+    def prune(self, max_age_seconds: float):
+        """Drop delivered records and settled outbox entries older than max_age_seconds."""
+        cutoff = time.time() - max_age_seconds
+        self._execute(
+            "DELETE FROM inflight_tasks WHERE state = 'finished' AND delivered = 1 "
+            "AND finished < ?",
+            (cutoff,),
+        )
+        self._execute(
+            "DELETE FROM outbox WHERE state IN ('submitted', 'failed') AND updated < ?",
+            (cutoff,),
         )
 
-    class UserValves(BaseModel):
-        """User-specific preferences for ByteBot automation."""
+    # -- outbox --------------------------------------------------------------
+    #
+    # Submissions accepted while ByteBot is unreachable. An entry moves
+    # queued -> submitting -> submitted (or failed); "attempted" is set when a
+    # POST may have reached ByteBot without a response, so the replay checks
+    # for an existing task before posting again.
 
-        default_priority: str = Field(
-            default="MEDIUM",
-            description="Default task priority (LOW, MEDIUM, HIGH, URGENT)",
+    def enqueue(
+        self,
+        entry_id: str,
+        payload: str,
+        priority: str,
+        user_id: str = "",
+        chat_id: str = "",
+        attempted: Optional[float] = None,
+    ):
+        now = time.time()
+        self._execute(
+            "INSERT INTO outbox (entry_id, user_id, chat_id, priority, rank, payload, "
+            "attempted, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry_id,
+                user_id,
+                chat_id,
+                priority,
+                PRIORITY_RANK.get(priority, 1),
+                payload,
+                attempted,
+                now,
+                now,
+            ),
         )
 
-        default_wait_for_completion: bool = Field(
-            default=True,
-            description="Wait for task completion by default (True) or return task ID (False)",
+    def next_queued(self) -> Optional[sqlite3.Row]:
+        """The queued entry to replay next: highest priority, then oldest."""
+        rows = self._execute(
+            "SELECT * FROM outbox WHERE state = 'queued' "
+            "ORDER BY rank DESC, created LIMIT 1"
+        )
+        return rows[0] if rows else None
+
+    def claim(self, entry_id: str) -> bool:
+        """Mark a queued entry as being submitted; False if someone else has it."""
+        return (
+            self._update(
+                "UPDATE outbox SET state = 'submitting', updated = ? "
+                "WHERE entry_id = ? AND state = 'queued'",
+                (time.time(), entry_id),
+            )
+            == 1
         )
 
-        show_execution_logs: bool = Field(
-            default=True, description="Include detailed message logs in task results"
+    def requeue(self, entry_id: str, error: str, attempted: Optional[float]):
+        """Return an entry to the queue after a failed replay."""
+        self._execute(
+            "UPDATE outbox SET state = 'queued', attempts = attempts + 1, error = ?, "
+            "attempted = COALESCE(attempted, ?), updated = ? WHERE entry_id = ?",
+            (error[:500], attempted, time.time(), entry_id),
         )
 
-        task_history_limit: int = Field(
-            default=20, description="Number of tasks to show in list_tasks()"
+    def submitted(self, entry_id: str, task_id: str):
+        self._execute(
+            "UPDATE outbox SET state = 'submitted', task_id = ?, error = '', "
+            "updated = ? WHERE entry_id = ?",
+            (task_id, time.time(), entry_id),
         )
 
-        notification_verbosity: str = Field(
-            default="normal",
-            description="Progress update frequency (minimal, normal, verbose)",
+    def reject(self, entry_id: str, error: str):
+        """Give up on an entry ByteBot refused."""
+        self._execute(
+            "UPDATE outbox SET state = 'failed', attempts = attempts + 1, error = ?, "
+            "updated = ? WHERE entry_id = ?",
+            (error[:500], time.time(), entry_id),
         )
 
-        preferred_model_name: str = Field(
-            default="",
-            description="Override default model (leave empty to use admin default)",
+    def recover_stale(self, max_age_seconds: float):
+        """Requeue entries left 'submitting' by a process that died mid-POST."""
+        self._execute(
+            "UPDATE outbox SET state = 'queued', attempted = COALESCE(attempted, updated) "
+            "WHERE state = 'submitting' AND updated < ?",
+            (time.time() - max_age_seconds,),
         )
 
-    def __init__(self):
-        self.valves = self.Valves()
-        self.user_valves = self.UserValves()
-        self._session: Optional[aiohttp.ClientSession] = None
+    def outbox_entry(self, entry_id: str) -> Optional[sqlite3.Row]:
+        rows = self._execute("SELECT * FROM outbox WHERE entry_id = ?", (entry_id,))
+        return rows[0] if rows else None
+
+    def queued_ahead(self, entry_id: str) -> int:
+        """Queued entries that will be replayed before entry_id."""
+        rows = self._execute(
+            "SELECT COUNT(*) FROM outbox o, outbox e WHERE e.entry_id = ? "
+            "AND o.state = 'queued' AND o.entry_id != e.entry_id "
+            "AND (o.rank > e.rank OR (o.rank = e.rank AND o.created < e.created))",
+            (entry_id,),
+        )
+        return rows[0][0] if rows else 0
+
+    def tracked_task_ids(self, task_ids: List[str]) -> set:
+        """The IDs among task_ids already recorded for a wait or an outbox entry."""
+        if not task_ids:
+            return set()
+        marks = ",".join("?" * len(task_ids))
+        rows = self._execute(
+            f"SELECT task_id FROM inflight_tasks WHERE task_id IN ({marks}) "
+            f"UNION SELECT task_id FROM outbox WHERE task_id IN ({marks})",
+            tuple(task_ids) * 2,
+        )
+        return {row[0] for row in rows}
 
-    async def _get_session(self) -> aiohttp.ClientSession:
-        """Get or create aiohttp session with connection pooling."""
-        if self._session is None or self._session.closed:
-            timeout = aiohttp.ClientTimeout(total=self.valves.task_timeout_seconds)
-            connector = aiohttp.TCPConnector(
-                limit=10, limit_per_host=5, ttl_dns_cache=300
-            )
-            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
-        return self._session
+    def outbox_counts(self) -> Dict[str, int]:
+        """Number of outbox entries per state."""
+        rows = self._execute("SELECT state, COUNT(*) FROM outbox GROUP BY state")
+        return {row[0]: row[1] for row in rows}
 
-    async def _retry_request(
-        self, method: str, url: str, emitter: Optional[Any] = None, **kwargs
-    ) -> dict:
-        """Make HTTP request with exponential backoff retry."""
-        last_exception = None
 
-        for attempt in range(self.valves.max_retries):
-            try:
-                session = await self._get_session()
-                async with session.request(method, url, **kwargs) as response:
-                    response.raise_for_status()
-                    return await response.json()
+class _Lease:
+    """A concurrency slot (per model or per user), bound to a task ID once created."""
 
-            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
-                last_exception = e
+    __slots__ = ("key", "task_id", "acquired")
 
-                if attempt < self.valves.max_retries - 1:
-                    delay = 1.0 * (2**attempt)  # Exponential backoff
-                    if emitter:
-                        await emitter.emit(
-                            f"Request failed (attempt {attempt + 1}/{self.valves.max_retries}), "
-                            f"retrying in {delay:.1f}s...",
-                            done=False,
-                        )
-                    await asyncio.sleep(delay)
-                else:
-                    # Last attempt failed
-                    if emitter:
-                        await emitter.emit(
-                            f"All {self.valves.max_retries} retry attempts failed",
-                            done=False,
-                        )
+    def __init__(self, key: str):
+        self.key = key
+        self.task_id: Optional[str] = None
+        self.acquired = time.time()
 
-        # All retries exhausted
-        if last_exception:
-            raise last_exception
 
-    async def _poll_task_completion(
-        self, task_id: str, emitter: Optional[Any] = None
+class ModelLimiter:
+    """Per-model task concurrency caps and token-bucket submission rate limits.
+
+    Limits are keyed by model name (full name, the part after the last "/",
+    or "*" for any model). Callers queue in FIFO order per model. A slot is
+    held until the task created with it is seen finished; while a model is
+    full, the head of the queue periodically asks a revalidation callback
+    which leased tasks have finished without anyone polling them.
+    """
+
+    REVALIDATE_INTERVAL = 5.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spec: Optional[tuple] = None
+        self._concurrency: Dict[str, int] = {}
+        self._rates: Dict[str, tuple] = {}
+        self._models: Dict[str, dict] = {}
+        self._task_leases: Dict[str, _Lease] = {}
+
+    @staticmethod
+    def _parse(spec: str) -> Dict[str, str]:
+        """Parse 'name=value,name=value' into a dict."""
+        entries = {}
+        for item in (spec or "").split(","):
+            name, sep, value = item.rpartition("=")
+            if sep and name.strip() and value.strip():
+                entries[name.strip()] = value.strip()
+        return entries
+
+    @staticmethod
+    def _lookup(table: dict, model: str) -> Any:
+        for key in (model, model.split("/")[-1], "*"):
+            if key in table:
+                return table[key]
+        return None
+
+    def configure(self, concurrency_spec: str, rate_spec: str):
+        """Apply valve settings (cheap when they have not changed)."""
+        if (concurrency_spec, rate_spec) == self._spec:
+            return
+        self._spec = (concurrency_spec, rate_spec)
+
+        concurrency = {}
+        for name, value in self._parse(concurrency_spec).items():
+            try:
+                concurrency[name] = max(1, int(value))
+            except ValueError:
+                continue
+        rates = {}
+        for name, value in self._parse(rate_spec).items():
+            count, _, period = value.partition("/")
+            try:
+                count, period = float(count), float(period or 60)
+            except ValueError:
+                continue
+            if count > 0 and period > 0:
+                rates[name] = (count, period)
+
+        with self._lock:
+            self._concurrency, self._rates = concurrency, rates
+            for model, state in self._models.items():
+                state["limit"] = self._lookup(concurrency, model)
+                state["rate"] = self._lookup(rates, model)
+                if state["rate"]:
+                    state["tokens"] = min(state["tokens"], state["rate"][0])
+                self._wake(state)
+
+    def enabled(self, model: str) -> bool:
+        """True when any limit applies to model."""
+        return (
+            self._lookup(self._concurrency, model) is not None
+            or self._lookup(self._rates, model) is not None
+        )
+
+    def is_busy(self, model: str) -> bool:
+        """True when a new caller for model would have to wait."""
+        with self._lock:
+            state = self._models.get(model)
+            if state is None:
+                return False
+            return bool(state["queue"]) or (
+                state["limit"] is not None and len(state["leases"]) >= state["limit"]
+            )
+
+    def _state(self, model: str) -> dict:
+        state = self._models.get(model)
+        if state is None:
+            rate = self._lookup(self._rates, model)
+            state = {
+                "limit": self._lookup(self._concurrency, model),
+                "rate": rate,
+                "tokens": rate[0] if rate else 0.0,
+                "refilled": time.monotonic(),
+                "leases": set(),
+                "queue": [],
+                "waiters": {},
+                "revalidated": 0.0,
+                "acquired": 0,
+                "wait_seconds": 0.0,
+            }
+            self._models[model] = state
+        return state
+
+    @staticmethod
+    def _take_token(state: dict) -> float:
+        """Take a rate token; return 0, or the seconds until one is available."""
+        if not state["rate"]:
+            return 0.0
+        count, period = state["rate"]
+        now = time.monotonic()
+        state["tokens"] = min(
+            count, state["tokens"] + (now - state["refilled"]) * count / period
+        )
+        state["refilled"] = now
+        if state["tokens"] >= 1:
+            state["tokens"] -= 1
+            return 0.0
+        return (1 - state["tokens"]) * period / count
+
+    @staticmethod
+    def _wake(state: dict):
+        """Wake the caller at the head of the queue (from any thread or loop)."""
+        if not state["queue"]:
+            return
+        waiter = state["waiters"].get(state["queue"][0])
+        if waiter is not None:
+            loop, future = waiter
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+    async def acquire(
+        self,
+        model: str,
+        revalidate: Optional[Callable[[List[str]], Any]] = None,
+    ) -> Optional[_Lease]:
+        """Wait for a slot and a rate token; returns None when no concurrency cap applies."""
+        if not self.enabled(model):
+            return None
+
+        loop = asyncio.get_running_loop()
+        ticket = object()
+        started = time.monotonic()
+        with self._lock:
+            state = self._state(model)
+            state["queue"].append(ticket)
+
+        try:
+            while True:
+                future = loop.create_future()
+                recheck: List[str] = []
+                delay: Optional[float] = None
+                with self._lock:
+                    if state["queue"][0] is ticket:
+                        if (
+                            state["limit"] is not None
+                            and len(state["leases"]) >= state["limit"]
+                        ):
+                            delay = self.REVALIDATE_INTERVAL
+                            now = time.monotonic()
+                            if now - state["revalidated"] >= self.REVALIDATE_INTERVAL:
+                                state["revalidated"] = now
+                                recheck = [
+                                    lease.task_id
+                                    for lease in state["leases"]
+                                    if lease.task_id
+                                ]
+                        else:
+                            delay = self._take_token(state)
+                            if delay == 0:
+                                state["queue"].pop(0)
+                                state["acquired"] += 1
+                                state["wait_seconds"] += time.monotonic() - started
+                                self._wake(state)
+                                if state["limit"] is None:
+                                    return None  # Rate limited only
+                                lease = _Lease(model)
+                                state["leases"].add(lease)
+                                return lease
+                    if not recheck:
+                        state["waiters"][ticket] = (loop, future)
+
+                if recheck:
+                    if revalidate is not None:
+                        for task_id in await revalidate(recheck):
+                            self.release_task(task_id)
+                    continue
+
+                try:
+                    await asyncio.wait_for(future, delay)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    with self._lock:
+                        state["waiters"].pop(ticket, None)
+        finally:
+            with self._lock:
+                if ticket in state["queue"]:
+                    state["queue"].remove(ticket)
+                    self._wake(state)
+
+    def bind(self, lease: Optional[_Lease], task_id: Optional[str]):
+        """Attach a created task to its lease, or free the lease if none was created."""
+        if lease is None:
+            return
+        if not task_id:
+            self.release(lease)
+            return
+        with self._lock:
+            lease.task_id = task_id
+            self._task_leases[task_id] = lease
+
+    def release(self, lease: Optional[_Lease]):
+        """Free a slot."""
+        if lease is None:
+            return
+        with self._lock:
+            if lease.task_id:
+                self._task_leases.pop(lease.task_id, None)
+            state = self._models.get(lease.key)
+            if state is not None and lease in state["leases"]:
+                state["leases"].discard(lease)
+                self._wake(state)
+
+    def release_task(self, task_id: Optional[str]):
+        """Free the slot held by a task once it is known to be finished."""
+        lease = self._task_leases.get(task_id) if task_id else None
+        self.release(lease)
+
+    def snapshot(self) -> List[dict]:
+        """Current per-model limiter state for diagnostics."""
+        rows = []
+        with self._lock:
+            for model, state in sorted(self._models.items()):
+                if state["rate"]:
+                    count, period = state["rate"]
+                    tokens = min(
+                        count,
+                        state["tokens"]
+                        + (time.monotonic() - state["refilled"]) * count / period,
+                    )
+                else:
+                    tokens = None
+                rows.append(
+                    {
+                        "model": model,
+                        "running": len(state["leases"]),
+                        "limit": state["limit"],
+                        "queued": len(state["queue"]),
+                        "rate": state["rate"],
+                        "tokens": tokens,
+                        "acquired": state["acquired"],
+                        "avg_wait": (
+                            state["wait_seconds"] / state["acquired"]
+                            if state["acquired"]
+                            else 0.0
+                        ),
+                    }
+                )
+        return rows
+
+
+class _QuotaExceeded(Exception):
+    """A user's submission quota was used up while their submission waited."""
+
+
+class FairScheduler:
+    """Weighted deficit round-robin admission of task submissions per user.
+
+    Each user has a FIFO queue of pending submissions. When agent capacity
+    frees up, users with queued work are visited in round-robin order and
+    earn `weight` credits per visit; a submission costs one credit, so a
+    user with a batch of 50 tasks cannot starve others. Slots are leases
+    bound to the created task ID, like ModelLimiter's.
+    """
+
+    REVALIDATE_INTERVAL = 5.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.capacity = 0
+        self.per_user = 0
+        self.weights: Dict[str, float] = {}
+        self._users: Dict[str, dict] = {}
+        self._active: List[str] = []  # Round-robin order of users with queued work
+        self._running = 0
+        self._task_leases: Dict[str, _Lease] = {}
+        self._revalidated = 0.0
+
+    def configure(self, capacity: int, per_user: int, weights_spec: str):
+        """Apply valve settings."""
+        weights = {}
+        for name, value in ModelLimiter._parse(weights_spec).items():
+            try:
+                weights[name] = max(0.01, float(value))
+            except ValueError:
+                continue
+        with self._lock:
+            changed = (capacity, per_user) != (self.capacity, self.per_user)
+            self.capacity, self.per_user, self.weights = capacity, per_user, weights
+            if changed:
+                self._dispatch()
+
+    def enabled(self) -> bool:
+        return self.capacity > 0 or self.per_user > 0
+
+    def _user(self, user_id: str) -> dict:
+        state = self._users.get(user_id)
+        if state is None:
+            state = {
+                "queue": [],
+                "deficit": 0.0,
+                "running": set(),
+                "granted": 0,
+                "wait_seconds": 0.0,
+                "max_wait": 0.0,
+                "submitted": [],
+            }
+            self._users[user_id] = state
+        return state
+
+    def _quota_used(self, user_id: str, window: float) -> List[float]:
+        """The user's submission times within the window (lock held)."""
+        submitted = self._user(user_id)["submitted"]
+        cutoff = time.time() - window
+        while submitted and submitted[0] <= cutoff:
+            submitted.pop(0)
+        return submitted
+
+    def quota_retry_after(self, user_id: str, quota: int, window: float) -> float:
+        """Seconds until user_id may submit again under quota (0 when allowed)."""
+        if quota <= 0:
+            return 0.0
+        with self._lock:
+            submitted = self._quota_used(user_id, window)
+            if len(submitted) < quota:
+                return 0.0
+            return submitted[0] - (time.time() - window)
+
+    def reserve_quota(self, user_id: str, quota: int, window: float) -> tuple:
+        """Take one of the user's submissions under quota in a single step.
+
+        Returns (token, retry_after). token is passed to release_quota if the
+        submission fails; it is None when there is no quota, or when the
+        quota is used up and retry_after says for how long.
+        """
+        if quota <= 0:
+            return None, 0.0
+        with self._lock:
+            submitted = self._quota_used(user_id, window)
+            if len(submitted) >= quota:
+                return None, submitted[0] - (time.time() - window)
+            token = time.time()
+            submitted.append(token)
+            return token, 0.0
+
+    def release_quota(self, user_id: str, token: Optional[float]):
+        """Give back a reserved submission whose task was not created."""
+        if token is None:
+            return
+        with self._lock:
+            submitted = self._user(user_id)["submitted"]
+            if token in submitted:
+                submitted.remove(token)
+
+    def _grant(self, user_id: str, state: dict):
+        """Hand the head of a user's queue a lease (lock held)."""
+        waiter = state["queue"].pop(0)
+        lease = _Lease(user_id)
+        waiter["lease"] = lease
+        state["running"].add(lease)
+        state["granted"] += 1
+        waited = time.monotonic() - waiter["enqueued"]
+        state["wait_seconds"] += waited
+        state["max_wait"] = max(state["max_wait"], waited)
+        self._running += 1
+        future = waiter["future"]
+        waiter["loop"].call_soon_threadsafe(
+            lambda: future.done() or future.set_result(None)
+        )
+
+    def _dispatch(self):
+        """Grant queued submissions in weighted round-robin order (lock held)."""
+        while self._active and (not self.capacity or self._running < self.capacity):
+            eligible = False
+            for _ in range(len(self._active)):
+                user_id = self._active[0]
+                state = self._users[user_id]
+                if not state["queue"]:
+                    self._active.pop(0)
+                    state["deficit"] = 0.0
+                    continue
+                if self.per_user and len(state["running"]) >= self.per_user:
+                    self._active.append(self._active.pop(0))
+                    continue
+                eligible = True
+                if state["deficit"] < 1:
+                    state["deficit"] += self.weights.get(user_id, 1.0)
+                if state["deficit"] >= 1:
+                    state["deficit"] -= 1
+                    self._grant(user_id, state)
+                    if not state["queue"]:
+                        self._active.pop(0)
+                        state["deficit"] = 0.0
+                    elif state["deficit"] < 1:
+                        self._active.append(self._active.pop(0))
+                    break
+                self._active.append(self._active.pop(0))
+            if not eligible:
+                return
+
+    async def acquire(
+        self,
+        user_id: str,
+        revalidate: Optional[Callable[[List[str]], Any]] = None,
+    ) -> Optional[_Lease]:
+        """Wait for this user's fair share of agent capacity."""
+        if not self.enabled():
+            return None
+
+        loop = asyncio.get_running_loop()
+        waiter = {
+            "loop": loop,
+            "future": loop.create_future(),
+            "enqueued": time.monotonic(),
+            "lease": None,
+        }
+        with self._lock:
+            state = self._user(user_id)
+            state["queue"].append(waiter)
+            if user_id not in self._active:
+                self._active.append(user_id)
+            self._dispatch()
+
+        try:
+            while True:
+                if waiter["lease"] is not None:
+                    return waiter["lease"]
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(waiter["future"]), self.REVALIDATE_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    recheck = self._claim_revalidation()
+                    if recheck and revalidate is not None:
+                        for task_id in await revalidate(recheck):
+                            self.release_task(task_id)
+        except BaseException:
+            with self._lock:
+                if waiter["lease"] is not None:
+                    self._release(waiter["lease"])
+                elif waiter in state["queue"]:
+                    state["queue"].remove(waiter)
+            raise
+
+    def _claim_revalidation(self) -> List[str]:
+        """Task IDs to re-check when capacity is exhausted, at most every interval."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._revalidated < self.REVALIDATE_INTERVAL:
+                return []
+            self._revalidated = now
+            return [
+                lease.task_id
+                for state in self._users.values()
+                for lease in state["running"]
+                if lease.task_id
+            ]
+
+    def bind(self, lease: Optional[_Lease], task_id: Optional[str]):
+        """Attach a created task to its lease, or free the lease if none was created."""
+        if lease is None:
+            return
+        if not task_id:
+            self.release(lease)
+            return
+        with self._lock:
+            lease.task_id = task_id
+            self._task_leases[task_id] = lease
+
+    def _release(self, lease: _Lease):
+        state = self._users.get(lease.key)
+        if lease.task_id:
+            self._task_leases.pop(lease.task_id, None)
+        if state is not None and lease in state["running"]:
+            state["running"].discard(lease)
+            self._running -= 1
+            self._dispatch()
+
+    def release(self, lease: Optional[_Lease]):
+        """Free a slot and admit the next submission."""
+        if lease is None:
+            return
+        with self._lock:
+            self._release(lease)
+
+    def release_task(self, task_id: Optional[str]):
+        """Free the slot held by a task once it is known to be finished."""
+        lease = self._task_leases.get(task_id) if task_id else None
+        self.release(lease)
+
+    def queued_ahead(self) -> int:
+        """Submissions waiting across all users."""
+        with self._lock:
+            return sum(len(state["queue"]) for state in self._users.values())
+
+    def snapshot(self) -> dict:
+        """Scheduler totals and per-user queue depth, running tasks and waits."""
+        with self._lock:
+            users = [
+                {
+                    "user": user_id,
+                    "queued": len(state["queue"]),
+                    "running": len(state["running"]),
+                    "granted": state["granted"],
+                    "avg_wait": (
+                        state["wait_seconds"] / state["granted"]
+                        if state["granted"]
+                        else 0.0
+                    ),
+                    "max_wait": state["max_wait"],
+                    "weight": self.weights.get(user_id, 1.0),
+                }
+                for user_id, state in sorted(self._users.items())
+            ]
+            return {
+                "running": self._running,
+                "capacity": self.capacity,
+                "per_user": self.per_user,
+                "users": users,
+            }
+
+
+class StatusAggregator:
+    """Global task counts per status, cached with a short TTL.
+
+    Snapshots come from server-side status filters when ByteBot honours
+    them (one limit=1 request per status, reading `total`), otherwise from
+    a scan of every page, which is kept for a longer TTL of its own. Each
+    snapshot also keeps the active tasks, the
+    only ones whose status can still change. Between snapshots, status
+    changes the tool sees itself (task creation, polls, cancellation) are
+    applied incrementally; a task missing from the snapshot that shows up
+    active was created since and is counted then.
+    """
+
+    MAX_KNOWN = 10000
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.refreshed = 0.0
+        self.source = ""
+        self.filter_supported: Optional[bool] = None
+        self._known: "OrderedDict[str, str]" = OrderedDict()
+        self.active: Dict[str, TaskRecord] = {}
+        self.active_complete = False  # False once an active task has no record
+        self.refreshing: Optional[asyncio.Future] = None
+
+    def age(self) -> float:
+        return time.time() - self.refreshed if self.refreshed else math.inf
+
+    def replace(
+        self,
+        counts: Counter,
+        total: int,
+        source: str,
+        active: Iterable[TaskRecord] = (),
+    ):
+        """Install a fresh snapshot and the active tasks it contains."""
+        self.counts = counts
+        self.total = total
+        self.source = source
+        self.refreshed = time.time()
+        # Statuses seen before the snapshot may already be superseded by it
+        self._known.clear()
+        self.active = {record.id: record for record in active}
+        self.active_complete = True
+        for record in self.active.values():
+            self._known[record.id] = record.status
+
+    def observe(
+        self,
+        task_id: Optional[str],
+        status: Optional[str],
+        created=False,
+        record: Optional[TaskRecord] = None,
+    ):
+        """Apply a status the tool has just seen for a task."""
+        if not task_id or not status or not self.refreshed:
+            return
+        previous = self._known.pop(task_id, None)
+        self._known[task_id] = status
+        if len(self._known) > self.MAX_KNOWN:
+            self._known.popitem(last=False)
+        if previous is None:
+            # Every active task was in the snapshot, so an unknown one that is
+            # active now is new; an unknown finished one was counted already
+            if created or status in ACTIVE_STATUSES:
+                self.counts[status] += 1
+                self.total += 1
+        elif previous != status:
+            self.counts[previous] = max(0, self.counts[previous] - 1)
+            self.counts[status] += 1
+
+        if status not in ACTIVE_STATUSES:
+            self.active.pop(task_id, None)
+        elif record is not None:
+            self.active[task_id] = record
+        elif task_id in self.active:
+            self.active[task_id].status = sys.intern(status)
+        else:
+            self.active_complete = False
+
+    def active_tasks(self) -> List[TaskRecord]:
+        """Active tasks as of the snapshot plus what the tool has seen since, newest first."""
+        return sorted(self.active.values(), key=lambda r: r.created, reverse=True)
+
+
+async def _close_with_loop(session: aiohttp.ClientSession):
+    """Async generator that closes session when its loop shuts down generators."""
+    try:
+        yield
+    finally:
+        if not session.closed:
+            await session.close()
+
+
+async def _periodic(owner_ref: "weakref.ref", step: str):
+    """Run owner.<step>() repeatedly while the owner object is alive.
+
+    The step returns the seconds to wait before running again, or None to
+    stop. Only a weak reference is held between steps, so a Tools object
+    that is dropped is collected and its background loops end.
+    """
+    while True:
+        owner = owner_ref()
+        if owner is None:
+            return
+        delay = await getattr(owner, step)()
+        owner = None
+        if delay is None:
+            return
+        await asyncio.sleep(delay)
+
+
+class LoopSessions:
+    """One pooled aiohttp session per running event loop.
+
+    A ClientSession is bound to the loop that created it, so a Tools object
+    called from several loops (thread-pool workers running asyncio.run, test
+    harnesses) keeps a separate session for each. Every session is paired
+    with a small async generator on its loop; asyncio.run (or any host that
+    calls loop.shutdown_asyncgens()) closes it, which closes the session on
+    its own loop before the loop goes away. Entries of loops that closed
+    are dropped on the next lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[asyncio.AbstractEventLoop, tuple] = {}
+
+    def current(self) -> Optional[aiohttp.ClientSession]:
+        """The open session of the running loop, if any."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        with self._lock:
+            entry = self._sessions.get(loop)
+        if entry is None or entry[0].closed:
+            return None
+        return entry[0]
+
+    async def get(self, factory: Callable[[], aiohttp.ClientSession]) -> tuple:
+        """Return (session, created) for the running loop, creating it if needed."""
+        session = self.current()
+        if session is not None:
+            return session, False
+        loop = asyncio.get_running_loop()
+        session = factory()
+        guard = _close_with_loop(session)
+        await guard.__anext__()  # Registers the generator with the loop
+        with self._lock:
+            for other in [l for l in self._sessions if l.is_closed()]:
+                del self._sessions[other]
+            self._sessions[loop] = (session, guard)
+        return session, True
+
+    async def close_current(self):
+        """Close the running loop's session now instead of at loop shutdown."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._sessions.pop(loop, None)
+        if entry is not None:
+            await entry[1].aclose()  # The guard's finally closes the session
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for s, _ in self._sessions.values() if not s.closed)
+
+
+class HealthMonitor:
+    """Rolling latency and error statistics per host from background probes.
+
+    Keeps the most recent WINDOW samples per host; a sample is the probe's
+    round-trip time, or None when the probe failed.
+    """
+
+    WINDOW = 120
+
+    def __init__(self):
+        self._samples: Dict[str, deque] = {}
+        self._consecutive_failures: Dict[str, int] = {}
+
+    def record(self, host: str, rtt: Optional[float]):
+        samples = self._samples.get(host)
+        if samples is None:
+            samples = self._samples[host] = deque(maxlen=self.WINDOW)
+        samples.append((time.time(), rtt))
+        if rtt is None:
+            self._consecutive_failures[host] = (
+                self._consecutive_failures.get(host, 0) + 1
+            )
+        else:
+            self._consecutive_failures[host] = 0
+
+    def stats(self, host: str) -> Optional[dict]:
+        """Latency percentiles and error rate for host, or None without samples."""
+        samples = self._samples.get(host)
+        if not samples:
+            return None
+        ok = sorted(rtt for _, rtt in samples if rtt is not None)
+        return {
+            "samples": len(samples),
+            "error_rate": 1 - len(ok) / len(samples),
+            "consecutive_failures": self._consecutive_failures.get(host, 0),
+            "p50": _quantile(ok, 0.5),
+            "p95": _quantile(ok, 0.95),
+            "p99": _quantile(ok, 0.99),
+            "updated": samples[-1][0],
+        }
+
+    def healthy(self, host: str) -> bool:
+        """False after several probes in a row have failed."""
+        return self._consecutive_failures.get(host, 0) < 3
+
+    def hosts(self) -> List[str]:
+        return sorted(self._samples)
+
+
+def _instrumented(func: Callable) -> Callable:
+    """Run a tool method inside a root trace span, profiling it when selected."""
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        self._tracer.configure(
+            self.valves.trace_export_path, self.valves.trace_sample_rate
+        )
+        self._start_background_work()
+        with self._tracer.start_trace(f"tool.{func.__name__}") as span:
+            if self._profiler.should_profile(func.__name__, self.valves):
+                result = await self._profiler.profile(
+                    func.__name__,
+                    functools.partial(func, self, *args, **kwargs),
+                    self.valves,
+                )
+            else:
+                result = await func(self, *args, **kwargs)
+            if span.recording and isinstance(result, str):
+                span.set_attribute("tool.result_chars", len(result))
+            user = kwargs.get("__user__")
+            if user and isinstance(result, str):
+                result = await self._deliver_recovered_results(
+                    user.get("id", ""), result
+                )
+            return result
+
+    return wrapper
+
+
+class Tools:
+    """ByteBot Automation Tool - Execute and manage automation tasks on ByteBot AI desktop agent."""
+
+    class Valves(BaseModel):
+        """Admin-level configuration for ByteBot integration."""
+
+        bytebot_url: str = Field(
+            default="http://192.168.0.102:9991", description="ByteBot Agent API URL"
+        )
+
+        litellm_proxy_url: str = Field(
+            default="",
+            description="LiteLLM proxy URL for model info (optional, e.g., http://localhost:4000)",
+        )
+
+        task_timeout_seconds: int = Field(
+            default=600,
+            description="Maximum time to wait for task completion (10 minutes)",
+        )
+
+        polling_interval_seconds: int = Field(
+            default=3, description="Initial polling interval for task status checks"
+        )
+
+        max_retries: int = Field(
+            default=3, description="Maximum retry attempts for failed API requests"
+        )
+
+        json_codec: str = Field(
+            default="auto",
+            description="JSON library for API bodies: auto (fastest installed), orjson, ujson or json (stdlib)",
+        )
+
+        max_file_size_mb: int = Field(
+            default=100, description="Maximum file size for uploads (MB)"
+        )
+
+        max_files_per_task: int = Field(
+            default=20, description="Maximum number of files per task"
+        )
+
+        shard_max_files: int = Field(
+            default=5,
+            description="Sharded uploads: most files per shard task",
+        )
+
+        shard_max_mb: float = Field(
+            default=50.0,
+            description="Sharded uploads: most megabytes per shard task",
+        )
+
+        shard_agent_urls: str = Field(
+            default="",
+            description="Sharded uploads: extra ByteBot agent URLs to spread shards across, comma-separated (bytebot_url is always used)",
+        )
+
+        configured_models: str = Field(
+            default="Qwen3-VL-32B-Instruct",
+            description="Comma-separated list of configured models (for documentation)",
+        )
+
+        default_model_name: str = Field(
+            default="openai/Qwen3-VL-32B-Instruct",
+            description="Default AI model name for task execution",
+        )
+
+        default_model_provider: str = Field(
+            default="proxy",
+            description="AI model provider (proxy, openai, anthropic, etc.)",
+        )
+
+        metrics_textfile_path: str = Field(
+            default="",
+            description="Write Prometheus metrics to this file for a local scraper (empty to disable)",
+        )
+
+        metrics_export_interval_seconds: int = Field(
+            default=15,
+            description="Minimum seconds between metrics textfile writes",
+        )
+
+        trace_export_path: str = Field(
+            default="",
+            description="Append OTLP JSON trace lines to this file (empty to disable tracing)",
+        )
+
+        trace_sample_rate: float = Field(
+            default=0.1,
+            description="Fraction of tool calls to trace (0.0-1.0)",
+        )
+
+        profiling_enabled: bool = Field(
+            default=False,
+            description="Profile selected tool calls and write hot-function reports",
+        )
+
+        profiling_methods: str = Field(
+            default="",
+            description="Comma-separated tool methods to profile (empty for all)",
+        )
+
+        profiling_sample_every: int = Field(
+            default=10,
+            description="Profile one call in N per method",
+        )
+
+        profiling_mode: str = Field(
+            default="sampling",
+            description="sampling (async-aware wall clock) or deterministic (cProfile)",
+        )
+
+        profiling_interval_ms: int = Field(
+            default=5,
+            description="Sampling interval for the sampling profiler (ms)",
+        )
+
+        profiling_top_n: int = Field(
+            default=25,
+            description="Number of hot functions listed in each report",
+        )
+
+        profiling_output_dir: str = Field(
+            default="",
+            description="Directory for profile reports (empty for the system temp dir)",
+        )
+
+        prewarm_connections: bool = Field(
+            default=False,
+            description="Open keep-alive connections to ByteBot/LiteLLM ahead of the first call (starts alongside the first tool call)",
+        )
+
+        prewarm_connection_count: int = Field(
+            default=2,
+            description="Keep-alive connections to pre-open and keep warm per host",
+        )
+
+        keepalive_ping_interval_seconds: int = Field(
+            default=10,
+            description="Seconds between keep-alive health pings when pre-warming (0 to disable)",
+        )
+
+        health_monitor_enabled: bool = Field(
+            default=False,
+            description="Probe ByteBot/LiteLLM in the background and adapt request timeouts and retry delays",
+        )
+
+        health_monitor_interval_seconds: int = Field(
+            default=15,
+            description="Seconds between background health probes",
+        )
+
+        adaptive_timeout_multiplier: float = Field(
+            default=4.0,
+            description="Timeout for light reads (GET of one task, or a task list page of up to 20) as a multiple of the observed p99 probe latency; task creation, uploads, cancellations and larger pages keep task_timeout_seconds",
+        )
+
+        adaptive_timeout_min_seconds: float = Field(
+            default=5.0,
+            description="Lower bound for adaptive request timeouts",
+        )
+
+        adaptive_timeout_max_seconds: float = Field(
+            default=60.0,
+            description="Upper bound for adaptive request timeouts and retry delays",
+        )
+
+        persist_inflight_tasks: bool = Field(
+            default=False,
+            description="Record waited-on tasks on disk so polling resumes after a restart",
+        )
+
+        state_db_path: str = Field(
+            default="",
+            description="SQLite file for persisted task state (empty for $DATA_DIR or the temp dir)",
+        )
+
+        background_poll_max_interval_seconds: int = Field(
+            default=5,
+            description="Longest polling interval used by background completion watchers",
+        )
+
+        outbox_enabled: bool = Field(
+            default=False,
+            description="Keep execute_task submissions in the state database while ByteBot is unreachable and submit them once it recovers (requires persist_inflight_tasks)",
+        )
+
+        outbox_drain_interval_seconds: float = Field(
+            default=2.0,
+            description="Pause between replayed outbox submissions (doubled while ByteBot stays unreachable)",
+        )
+
+        outbox_max_attempts: int = Field(
+            default=20,
+            description="Give up on a queued outbox submission after this many failed attempts (0 for no limit)",
+        )
+
+        outbox_max_age_seconds: int = Field(
+            default=86400,
+            description="Give up on a queued outbox submission this long after it was queued (0 for no limit)",
+        )
+
+        agent_max_concurrent_tasks: int = Field(
+            default=0,
+            description="Tasks allowed to run on the agent at once, shared fairly between users (0 for no limit)",
+        )
+
+        user_max_concurrent_tasks: int = Field(
+            default=0,
+            description="Tasks a single user may have running at once (0 for no limit)",
+        )
+
+        user_task_quota: int = Field(
+            default=0,
+            description="Tasks a single user may submit per quota window (0 for no quota)",
+        )
+
+        user_quota_window_seconds: int = Field(
+            default=3600,
+            description="Length of the per-user quota window",
+        )
+
+        user_weights: str = Field(
+            default="",
+            description="Fair-share weights by user ID, e.g. 'user-id-1=2,user-id-2=0.5' (default weight 1)",
+        )
+
+        model_concurrency_limits: str = Field(
+            default="",
+            description="Max concurrently running tasks per model, e.g. 'Qwen3-VL-32B-Instruct=4,*=8' (empty for no limit)",
+        )
+
+        model_rate_limits: str = Field(
+            default="",
+            description="Max task submissions per model as count/seconds, e.g. 'Qwen3-VL-32B-Instruct=10/60'",
+        )
+
+        export_dir: str = Field(
+            default="",
+            description="Directory for export_tasks() files (empty for $DATA_DIR/bytebot_exports or the temp dir)",
+        )
+
+        export_prefetch_pages: int = Field(
+            default=4,
+            description="Task list pages fetched ahead concurrently during exports",
+        )
+
+        diagnostics_samples: int = Field(
+            default=5,
+            description="Latency samples per endpoint taken by check_connection()",
+        )
+
+        diagnostics_time_budget_seconds: float = Field(
+            default=5.0,
+            description="Time budget for all check_connection() latency probes",
+        )
+
+        status_counts_ttl_seconds: int = Field(
+            default=15,
+            description="Seconds global task status counts are served from cache",
+        )
+
+        status_counts_scan_ttl_seconds: int = Field(
+            default=300,
+            description="Seconds counts from a scan of every page (ByteBot without ?status= filtering) are served from cache",
+        )
+
+        analytics_cache_seconds: int = Field(
+            default=60,
+            description="Seconds a task scan for get_task_analytics() is reused",
+        )
+
+        bulk_cancel_concurrency: int = Field(
+            default=8,
+            description="Concurrent DELETE requests issued by cancel_tasks()",
+        )
+
+        execution_log_token_budget: int = Field(
+            default=1500,
+            description="Approximate token budget for the execution log in task results (shared by all tasks in one reply; 0 for the full log)",
+        )
+
+    class UserValves(BaseModel):
+        """User-specific preferences for ByteBot automation."""
+
+        default_priority: str = Field(
+            default="MEDIUM",
+            description="Default task priority (LOW, MEDIUM, HIGH, URGENT)",
+        )
+
+        default_wait_for_completion: bool = Field(
+            default=True,
+            description="Wait for task completion by default (True) or return task ID (False)",
+        )
+
+        show_execution_logs: bool = Field(
+            default=True, description="Include detailed message logs in task results"
+        )
+
+        task_history_limit: int = Field(
+            default=20, description="Number of tasks to show in list_tasks()"
+        )
+
+        notification_verbosity: str = Field(
+            default="normal",
+            description="Progress update frequency (minimal, normal, verbose)",
+        )
+
+        preferred_model_name: str = Field(
+            default="",
+            description="Override default model (leave empty to use admin default)",
+        )
+
+        default_notify_on_completion: bool = Field(
+            default=False,
+            description="When not waiting, post the result to the chat once the task finishes",
+        )
+
+        stream_task_messages: bool = Field(
+            default=False,
+            description="While waiting for a task, append each new agent step to the chat as it happens",
+        )
+
+    def __init__(self):
+        self.valves = self.Valves()
+        self.user_valves = self.UserValves()
+        self._sessions = LoopSessions()
+        self._json_codec: Optional[JsonCodec] = None
+        self._json_codec_choice: Optional[str] = None
+        self._render_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._metrics = MetricsRegistry()
+        self._last_metrics_export = 0.0
+        self._tracer = Tracer()
+        self._profiler = CallProfiler()
+        self._background_tasks: set = set()
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._health = HealthMonitor()
+        self._health_task: Optional[asyncio.Task] = None
+        self._outbox_task: Optional[asyncio.Task] = None
+        self._outbox_delay: Optional[float] = None
+        self._rtt_baseline: Dict[str, dict] = {}
+        self._store: Optional[TaskStore] = None
+        self._store_path = ""
+        self._watched_tasks: set = set()
+        self._resumed = False
+        self._limiter = ModelLimiter()
+        self._scheduler = FairScheduler()
+        self._analytics_cache: Optional[tuple] = None
+        self._status_counts = StatusAggregator()
+
+    def _start_background_work(self):
+        """Start keep-alive pings, health probes and resume persisted waits.
+
+        Runs at every tool call (each part is a no-op while it is already
+        running), never at construction, so building a Tools spawns no
+        tasks. Warm-up therefore starts alongside the first call, which may
+        still open its own connection.
+        """
+        self._start_keepalive()
+        self._start_health_monitor()
+        self._resume_inflight()
+        self._start_outbox_drainer()
+
+    async def _aclose(self):
+        """Stop background work and close this loop's pooled session.
+
+        For hosts and tests shutting the tool down; private so it is not
+        offered to the model as a tool. Background loops also end by
+        themselves once the Tools object is garbage collected.
+        """
+        current = asyncio.get_running_loop()
+        waiting = []
+        for task in list(self._background_tasks):
+            loop = task.get_loop()
+            if task is asyncio.current_task():
+                continue
+            if loop is current:
+                task.cancel()
+                waiting.append(task)
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
+        await asyncio.gather(*waiting, return_exceptions=True)
+        await self._tracer.flush()
+        await self._sessions.close_current()
+
+    def _get_store(self) -> Optional[TaskStore]:
+        """Return the persisted task store, or None when disabled or unavailable."""
+        if not self.valves.persist_inflight_tasks:
+            return None
+        path = self.valves.state_db_path or os.path.join(
+            os.environ.get("DATA_DIR", tempfile.gettempdir()),
+            "bytebot_tool_state.db",
+        )
+        if self._store is None or self._store_path != path:
+            self._store = TaskStore(path)
+            self._store_path = path
+        return self._store
+
+    async def _store_call(self, method: str, *args, **kwargs) -> Any:
+        """Call a TaskStore method in a worker thread, treating storage errors as non-fatal."""
+        store = self._get_store()
+        if store is None:
+            return None
+        try:
+            return await asyncio.to_thread(getattr(store, method), *args, **kwargs)
+        except (sqlite3.Error, OSError):
+            return None
+
+    def _resume_inflight(self):
+        """Start background watchers for persisted tasks nobody is waiting on."""
+        if self._resumed:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._resumed = True
+        if self._get_store() is not None:
+            self._spawn_background(self._resume_watchers(), "bytebot-resume")
+
+    async def _resume_watchers(self):
+        """Prune old records and watch every persisted task still waiting."""
+        await self._store_call("prune", 7 * 24 * 3600)
+        for record in await self._store_call("waiting") or []:
+            if record["task_id"] not in self._watched_tasks:
+                self._spawn_background(
+                    self._watch_persisted_task(record["task_id"], record["deadline"]),
+                    f"bytebot-resume-{record['task_id']}",
+                )
+
+    async def _watch_persisted_task(self, task_id: str, deadline: float):
+        """Poll a task recovered from the store and record its outcome for delivery."""
+        self._watched_tasks.add(task_id)
+        try:
+            remaining = deadline - time.time()
+            if remaining > 0:
+                completed_task = await self._poll_task_completion(
+                    task_id, timeout=remaining, ride_out_errors=True
+                )
+            else:
+                # Past the deadline: one last look so finished work is not lost
+                completed_task = await self._retry_request(
+                    "GET", f"{self.valves.bytebot_url}/tasks/{task_id}"
+                )
+                if not self._is_finished_status(completed_task.get("status")):
+                    completed_task = {
+                        "status": "TIMEOUT",
+                        "task_id": task_id,
+                        "timeout_info": "Stopped watching after the original deadline",
+                    }
+            await self._store_call(
+                "finish",
+                task_id,
+                completed_task.get("status", "UNKNOWN"),
+                self._format_completion(task_id, completed_task),
+                False,
+            )
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
+                await self._store_call("forget", task_id)
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            pass  # Still unreachable past the deadline; retried on the next start-up
+        except Exception as e:
+            await self._record_watch_error(task_id, e)
+        finally:
+            self._watched_tasks.discard(task_id)
+
+    @staticmethod
+    def _watch_error_text(task_id: str, error: Exception) -> str:
+        """Result text for a background wait that gave up on an error."""
+        if isinstance(error, aiohttp.ClientError):
+            reason = ErrorFormatter.format_api_error(error, "Checking the task")
+        else:
+            reason = f"Unexpected error: {error}"
+        return (
+            f"**Stopped watching task** `{task_id}`. {reason}\n\n"
+            f"Use get_task_status('{task_id}') to check on it."
+        )
+
+    async def _record_watch_error(self, task_id: str, error: Exception):
+        """Close a persisted wait that failed unexpectedly and tell its owner later."""
+        await self._store_call(
+            "finish", task_id, "ERROR", self._watch_error_text(task_id, error), False
+        )
+
+    async def _notify_on_completion(
+        self,
+        task_id: str,
+        event_emitter: Callable[[dict], Any],
+        user: dict,
+        chat_id: Optional[str],
+        description: str,
+        result_prefix: str = "",
+    ):
+        """Watch a submitted task and push its outcome into the originating chat."""
+        await self._store_call(
+            "track",
+            task_id,
+            time.time() + self.valves.task_timeout_seconds,
+            user_id=(user or {}).get("id", ""),
+            chat_id=chat_id or "",
+            description=description,
+        )
+        self._watched_tasks.add(task_id)
+        try:
+            # Outages are ridden out until the deadline, so the chat always
+            # hears back: a result, a timeout or why watching stopped
+            completed_task = await self._poll_task_completion(
+                task_id,
+                max_interval=self.valves.background_poll_max_interval_seconds,
+                ride_out_errors=True,
+            )
+            status = completed_task.get("status", "UNKNOWN")
+            result = result_prefix + self._format_completion(task_id, completed_task)
+            summary = f"Task {task_id} finished: {status}"
+        except Exception as e:
+            status = "ERROR"
+            result = result_prefix + self._watch_error_text(task_id, e)
+            summary = f"Stopped watching task {task_id}"
+        finally:
+            self._watched_tasks.discard(task_id)
+
+        emitter = self._create_emitter(event_emitter)
+        try:
+            await emitter.emit(summary, done=True)
+            await emitter.emit_message(f"\n\n{result}")
+            delivered = True
+        except Exception:
+            delivered = False  # Chat went away; deliver on the user's next call
+
+        if status == "TIMEOUT" and delivered:
+            await self._store_call("forget", task_id)
+        else:
+            await self._store_call("finish", task_id, status, result, delivered)
+
+    async def _wait_with_tracking(
+        self,
+        task_id: str,
+        emitter: EventEmitter,
+        user: dict,
+        chat_id: Optional[str],
+        description: str,
+    ) -> dict:
+        """Poll a task to completion while its wait is recorded in the store."""
+        await self._store_call(
+            "track",
+            task_id,
+            time.time() + self.valves.task_timeout_seconds,
+            user_id=(user or {}).get("id", ""),
+            chat_id=chat_id or "",
+            description=description,
+        )
+        self._watched_tasks.add(task_id)
+        try:
+            completed_task = await self._poll_task_completion(
+                task_id, emitter, stream=self.user_valves.stream_task_messages
+            )
+        finally:
+            self._watched_tasks.discard(task_id)
+
+        if completed_task.get("status") == "TIMEOUT":
+            # The user is told to check manually; nothing left to deliver
+            await self._store_call("forget", task_id)
+        else:
+            await self._store_call(
+                "finish", task_id, completed_task.get("status", "UNKNOWN"), "", True
+            )
+        return completed_task
+
+    async def _deliver_recovered_results(self, user_id: str, result: str) -> str:
+        """Prepend results of tasks that finished while nobody was waiting."""
+        if not user_id:
+            return result
+        records = await self._store_call("undelivered", user_id)
+        if not records:
+            return result
+        await self._store_call("mark_delivered", [r["task_id"] for r in records])
+        notices = ["**Tasks finished while you were away:**", ""]
+        for record in records:
+            notices.append(record["result"])
+            notices.append("")
+        notices.append("---")
+        notices.append("")
+        return "\n".join(notices) + result
+
+    def _outbox_accepts(self, error: Optional[BaseException] = None) -> bool:
+        """True if a submission should go to the outbox instead of failing.
+
+        Without an error, asks whether ByteBot is known to be down already
+        (health monitor); with one, whether it looks like an outage.
+        """
+        if not self.valves.outbox_enabled or self._get_store() is None:
+            return False
+        if error is None:
+            return self.valves.health_monitor_enabled and not self._health.healthy(
+                _endpoint_host(self.valves.bytebot_url)
+            )
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status >= 500
+        return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+    async def _queue_in_outbox(
+        self,
+        task_data: dict,
+        user: Optional[dict],
+        chat_id: Optional[str],
+        emitter: EventEmitter,
+        attempted: Optional[float] = None,
+    ) -> str:
+        """Park a submission in the outbox and return the provisional-ID message."""
+        entry_id = f"{OUTBOX_ID_PREFIX}{uuid.uuid4()}"
+        await self._store_call(
+            "enqueue",
+            entry_id,
+            self._codec().dumps_text(task_data),
+            task_data["priority"],
+            user_id=(user or {}).get("id", ""),
+            chat_id=chat_id or "",
+            attempted=attempted,
+        )
+        if await self._store_call("outbox_entry", entry_id) is None:
+            raise RuntimeError("ByteBot is unreachable and the outbox is unavailable")
+        self._metrics.inc("outbox_entries_total", outcome="queued")
+        self._start_outbox_drainer()
+
+        await emitter.emit("ByteBot unreachable; task saved to the outbox", done=True)
+        return (
+            "ByteBot is currently unreachable, so the task was saved to the local "
+            "outbox and will be submitted automatically when ByteBot recovers.\n\n"
+            f"**Provisional ID:** `{entry_id}`\n\n"
+            f"Use get_task_status('{entry_id}') to check on it. The result will be "
+            "included in your next request after the task finishes."
+        )
+
+    def _start_outbox_drainer(self):
+        """Start replaying queued outbox entries if enabled and not running."""
+        if not self.valves.outbox_enabled or self._get_store() is None:
+            return
+        if self._outbox_task is not None and not self._outbox_task.done():
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._outbox_task = self._spawn_background(
+            _periodic(weakref.ref(self), "_drain_outbox_step"), "bytebot-outbox"
+        )
+
+    async def _drain_outbox_step(self) -> Optional[float]:
+        """Submit the next queued entry, highest priority first.
+
+        Returns the pause before the next one, or None once the queue is
+        empty. Pacing submissions (and backing off while ByteBot stays down)
+        keeps a recovering agent from receiving the whole backlog at once.
+        """
+        interval = max(0.1, self.valves.outbox_drain_interval_seconds)
+        if self._outbox_delay is None:
+            await self._store_call("recover_stale", self.valves.task_timeout_seconds)
+            self._outbox_delay = interval
+        entry = (
+            await self._store_call("next_queued")
+            if self.valves.outbox_enabled
+            else None
+        )
+        if entry is None:
+            self._outbox_delay = None
+            return None
+        if self._outbox_accepts():
+            return self._outbox_delay  # Health monitor still reports it down
+        if not await self._store_call("claim", entry["entry_id"]):
+            return 0  # Another worker took it
+        with self._tracer.span("outbox.replay", **{"outbox.id": entry["entry_id"]}):
+            outcome = await self._replay_outbox_entry(entry)
+        self._metrics.inc("outbox_entries_total", outcome=outcome)
+        if outcome == "retry":
+            self._outbox_delay = min(
+                self._outbox_delay * 2, self.valves.adaptive_timeout_max_seconds
+            )
+        else:
+            self._outbox_delay = interval
+        return self._outbox_delay
+
+    async def _replay_outbox_entry(self, entry: sqlite3.Row) -> str:
+        """Submit one claimed entry.
+
+        Returns submitted, duplicate, rejected, expired or retry. Only an
+        error answer to the POST itself rejects an entry; failures of the
+        duplicate lookup are retried like outages.
+        """
+        entry_id = entry["entry_id"]
+        task_data = self._codec().loads(entry["payload"])
+        user = {"id": entry["user_id"]}
+        attempted = entry["attempted"]
+        expired = self._outbox_expired(entry)
+
+        # An earlier POST may have reached ByteBot; never create it twice
+        if attempted is not None:
+            try:
+                task_id = await self._find_submitted_task(task_data, attempted)
+            except Exception as e:
+                if expired:
+                    await self._fail_outbox_entry(entry, task_data, expired)
+                    return "expired"
+                await self._store_call(
+                    "requeue", entry_id, str(e) or type(e).__name__, attempted
+                )
+                return "retry"
+            if task_id:
+                await self._outbox_submitted(entry, task_id)
+                return "duplicate"
+
+        if expired:
+            await self._fail_outbox_entry(entry, task_data, expired)
+            return "expired"
+
+        leases = (None, None, None)
+        try:
+            leases = await self._admit_submission(
+                task_data["model"]["name"], user, self._create_emitter(None)
+            )
+            attempted = time.time()
+            task = await self._retry_request(
+                "POST", f"{self.valves.bytebot_url}/tasks", json=task_data
+            )
+        except BaseException as e:
+            self._release_slots(leases)
+            if isinstance(e, aiohttp.ClientResponseError) and not self._outbox_accepts(
+                e
+            ):
+                await self._fail_outbox_entry(
+                    entry,
+                    task_data,
+                    f"ByteBot rejected the task: {e.status} {e.message}",
+                )
+                return "rejected"
+            ambiguous = not isinstance(e, aiohttp.ClientConnectorError)
+            await self._store_call(
+                "requeue",
+                entry_id,
+                str(e) or type(e).__name__,
+                attempted if ambiguous else None,
+            )
+            if not isinstance(e, Exception):
+                raise
+            return "retry"
+
+        task_id = task.get("id")
+        self._bind_slots(leases, task_id)
+        await self._outbox_submitted(entry, task_id)
+        return "submitted"
+
+    def _outbox_expired(self, entry: sqlite3.Row) -> Optional[str]:
+        """Why an entry has run out of attempts or time, or None if it has not."""
+        max_attempts = self.valves.outbox_max_attempts
+        if max_attempts > 0 and entry["attempts"] >= max_attempts:
+            return f"Gave up after {entry['attempts']} attempts: {entry['error']}"
+        max_age = self.valves.outbox_max_age_seconds
+        if max_age > 0 and time.time() - entry["created"] > max_age:
+            return f"Gave up after {max_age}s in the outbox: {entry['error']}"
+        return None
+
+    async def _fail_outbox_entry(
+        self, entry: sqlite3.Row, task_data: dict, message: str
+    ):
+        """Mark an entry failed and leave the reason for its owner's next call."""
+        entry_id = entry["entry_id"]
+        await self._store_call("reject", entry_id, message)
+        await self._store_call(
+            "track", entry_id, time.time(), entry["user_id"], entry["chat_id"]
+        )
+        await self._store_call(
+            "finish",
+            entry_id,
+            "FAILED",
+            f"**Queued task could not be submitted**\n\n"
+            f"**Provisional ID:** `{entry_id}`\n"
+            f"**Description:** {task_data['description']}\n"
+            f"**Error:** {message}",
+            False,
+        )
+
+    async def _outbox_submitted(self, entry: sqlite3.Row, task_id: str):
+        """Record the ByteBot task for an entry and watch it for the owner."""
+        task_data = self._codec().loads(entry["payload"])
+        deadline = time.time() + self.valves.task_timeout_seconds
+        await self._store_call("submitted", entry["entry_id"], task_id)
+        await self._store_call(
+            "track",
+            task_id,
+            deadline,
+            user_id=entry["user_id"],
+            chat_id=entry["chat_id"],
+            description=task_data["description"],
+        )
+        if task_id not in self._watched_tasks:
+            self._spawn_background(
+                self._watch_persisted_task(task_id, deadline),
+                f"bytebot-resume-{task_id}",
+            )
+
+    async def _find_submitted_task(
+        self, task_data: dict, attempted: float
+    ) -> Optional[str]:
+        """ID of an untracked task matching task_data created since attempted, if any."""
+        cutoff = attempted - 60  # Allow for clock skew between tool and ByteBot
+        model_name = task_data["model"]["name"]
+        pages = self._iter_task_pages(page_size=100)
+        try:
+            async for page in pages:
+                candidates = []
+                done = False
+                for task in page:
+                    created = _parse_timestamp(task.get("createdAt") or "")
+                    if created is not None and created.tzinfo is not None:
+                        if created.timestamp() < cutoff:
+                            done = True  # Pages are newest first
+                            break
+                    model = task.get("model") or {}
+                    if (
+                        task.get("id")
+                        and task.get("description") == task_data["description"]
+                        and task.get("priority", task_data["priority"])
+                        == task_data["priority"]
+                        and model.get("name", model_name) == model_name
+                    ):
+                        candidates.append(task["id"])
+                if candidates:
+                    # Tasks another entry or wait already owns are not ours
+                    tracked = await self._store_call("tracked_task_ids", candidates)
+                    for task_id in candidates:
+                        if task_id not in (tracked or ()):
+                            return task_id
+                if done:
+                    return None
+        finally:
+            await pages.aclose()
+        return None
+
+    async def _format_outbox_entry(self, entry: sqlite3.Row) -> str:
+        """Describe an outbox entry that has no ByteBot task yet."""
+        task_data = self._codec().loads(entry["payload"])
+        state = "QUEUED IN OUTBOX" if entry["state"] != "failed" else "REJECTED"
+        lines = [
+            f"**{state}** (Priority: {entry['priority']})",
+            f"**Provisional ID:** `{entry['entry_id']}`",
+            f"**Description:** {task_data['description']}",
+            f"**Queued:** {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['created']))}",
+        ]
+        if entry["state"] in ("queued", "submitting"):
+            ahead = await self._store_call("queued_ahead", entry["entry_id"]) or 0
+            lines.append(
+                f"**Waiting for ByteBot:** {ahead} queued submissions ahead, "
+                f"{entry['attempts']} attempts so far"
+            )
+        if entry["error"]:
+            lines.append(f"**Last error:** {entry['error']}")
+        return "\n".join(lines)
+
+    def _format_completion(
+        self, task_id: str, completed_task: dict, log_budget: Optional[int] = None
+    ) -> str:
+        """Format the final outcome of a waited-on task."""
+        if completed_task.get("status") == "TIMEOUT":
+            return self._format_task_result(completed_task, log_budget)
+        elif completed_task.get("status") == "NEEDS_HELP":
+            return ErrorFormatter.format_needs_help(task_id)
+        elif completed_task.get("status") == "FAILED":
+            messages = completed_task.get("messages", [])
+            return ErrorFormatter.format_task_failed(task_id, messages)
+
+        return self._format_task_result(completed_task, log_budget)
+
+    def _shared_log_budget(self, task_count: int) -> int:
+        """Per-task execution log budget when task_count results share one reply."""
+        budget = self.valves.execution_log_token_budget
+        if budget <= 0:
+            return budget
+        return max(1, budget // max(1, task_count))
+
+    def _create_emitter(
+        self, event_emitter: Optional[Callable[[dict], Any]]
+    ) -> EventEmitter:
+        """Create an instrumented EventEmitter honouring the user's verbosity."""
+        return EventEmitter(
+            event_emitter,
+            self.user_valves.notification_verbosity,
+            self._metrics,
+            self._tracer,
+        )
+
+    async def _run_latency_probes(self) -> Dict[str, dict]:
+        """Sample every configured endpoint concurrently within the time budget."""
+        samples = max(1, self.valves.diagnostics_samples)
+        deadline = time.perf_counter() + self.valves.diagnostics_time_budget_seconds
+        endpoints = {
+            "ByteBot /tasks": (f"{self.valves.bytebot_url}/tasks?limit=1", samples),
+            "ByteBot task list": (
+                f"{self.valves.bytebot_url}/tasks?limit=100",
+                max(1, samples // 2),
+            ),
+        }
+        if self.valves.litellm_proxy_url:
+            endpoints["LiteLLM /model/info"] = (
+                f"{self.valves.litellm_proxy_url}/model/info",
+                samples,
+            )
+
+        with self._tracer.span("diagnostics.probes", endpoints=len(endpoints)):
+            results = await asyncio.gather(
+                *(
+                    self._probe_endpoint(url, count, deadline)
+                    for url, count in endpoints.values()
+                )
+            )
+        return dict(zip(endpoints, results))
+
+    async def _probe_endpoint(self, url: str, samples: int, deadline: float) -> dict:
+        """Time sequential GETs of url: total, time to first byte, connect, reuse."""
+        session = await self._get_session()
+        result = {
+            "rtt": [],
+            "ttfb": [],
+            "connect": [],
+            "reused": 0,
+            "bytes": 0,
+            "status": None,
+            "body": "",
+            "errors": [],
+        }
+        for _ in range(samples):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            probe: dict = {}
+            start = time.perf_counter()
+            try:
+                async with session.get(
+                    url,
+                    trace_request_ctx=probe,
+                    timeout=aiohttp.ClientTimeout(total=remaining),
+                ) as response:
+                    body = await response.read()
+            except aiohttp.ClientConnectorError as e:
+                result["errors"].append(str(e))
+                break  # Unreachable; more samples would only repeat this
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                result["errors"].append(str(e) or type(e).__name__)
+                continue
+            elapsed = time.perf_counter() - start
+
+            result["status"] = response.status
+            if not result["body"]:
+                result["body"] = body[:200].decode("utf-8", errors="replace")
+            result["rtt"].append(elapsed)
+            result["ttfb"].append(probe.get("ttfb", elapsed))
+            if "connect" in probe:
+                result["connect"].append(probe["connect"])
+            if probe.get("reused"):
+                result["reused"] += 1
+            result["bytes"] += len(body)
+        return result
+
+    def _format_latency_probes(self, results: Dict[str, dict]) -> List[str]:
+        """Render latency probe results as a markdown table."""
+        lines = [
+            f"**Latency ({self.valves.diagnostics_samples} samples, "
+            f"{self.valves.diagnostics_time_budget_seconds:g}s budget):**",
+            "| Endpoint | Samples | Min | p50 | p95 | TTFB p50 | Connect | Reused |",
+            "|---|---|---|---|---|---|---|---|",
+        ]
+
+        def ms(value: float) -> str:
+            return "-" if value != value else f"{value * 1000:.1f}ms"
+
+        for name, result in results.items():
+            rtt = sorted(result["rtt"])
+            if not rtt:
+                error = result["errors"][0] if result["errors"] else "no samples"
+                lines.append(f"| {name} | 0 | - | - | - | - | - | {error[:40]} |")
+                continue
+            connect = (
+                ms(sum(result["connect"]) / len(result["connect"]))
+                if result["connect"]
+                else "pooled"
+            )
+            lines.append(
+                f"| {name} | {len(rtt)} | {ms(rtt[0])} | {ms(_quantile(rtt, 0.5))} "
+                f"| {ms(_quantile(rtt, 0.95))} | {ms(_quantile(sorted(result['ttfb']), 0.5))} "
+                f"| {connect} | {result['reused']}/{len(rtt)} |"
+            )
+
+        listing = results.get("ByteBot task list")
+        if listing and listing["rtt"]:
+            seconds = sum(listing["rtt"])
+            size = listing["bytes"] / len(listing["rtt"])
+            lines.append("")
+            lines.append(
+                f"Task list payload: {size / 1024:.1f} KB per page, "
+                f"{listing['bytes'] / seconds / (1024 * 1024):.2f} MB/s"
+            )
+        return lines
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        """Build aiohttp trace hooks that feed HTTP metrics and client spans."""
+        metrics = self._metrics
+        tracer = self._tracer
+        trace_config = aiohttp.TraceConfig()
+
+        def probe_of(ctx) -> Optional[dict]:
+            """Timing dict passed by diagnostics as trace_request_ctx, if any."""
+            probe = getattr(ctx, "trace_request_ctx", None)
+            return probe if isinstance(probe, dict) else None
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+            ctx.method = params.method
+            ctx.endpoint = _endpoint_label(params.url)
+            ctx.bytes_sent = 0
+            ctx.bytes_received = 0
+            ctx.span = tracer.create_span(
+                f"HTTP {params.method} {ctx.endpoint}",
+                kind=Tracer.KIND_CLIENT,
+                **{"http.request.method": params.method, "url.full": str(params.url)},
+            )
+            metrics.add_gauge("http_requests_in_flight", 1)
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            probe = probe_of(ctx)
+            if probe is not None:
+                probe["connect"] = time.perf_counter() - ctx.connect_start
+
+        async def on_connection_reuseconn(session, ctx, params):
+            probe = probe_of(ctx)
+            if probe is not None:
+                probe["reused"] = True
+
+        async def on_request_chunk_sent(session, ctx, params):
+            ctx.bytes_sent += len(params.chunk)
+
+        async def on_response_chunk_received(session, ctx, params):
+            ctx.bytes_received += len(params.chunk)
+            metrics.inc(
+                "http_response_bytes_total",
+                len(params.chunk),
+                method=ctx.method,
+                endpoint=ctx.endpoint,
+            )
+
+        async def on_request_end(session, ctx, params):
+            probe = probe_of(ctx)
+            if probe is not None:
+                probe["ttfb"] = time.perf_counter() - ctx.start
+            metrics.add_gauge("http_requests_in_flight", -1)
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - ctx.start,
+                method=ctx.method,
+                endpoint=ctx.endpoint,
+            )
+            metrics.inc(
+                "http_responses_total",
+                method=ctx.method,
+                endpoint=ctx.endpoint,
+                status=str(params.response.status),
+            )
+            metrics.inc(
+                "http_request_bytes_total",
+                ctx.bytes_sent,
+                method=ctx.method,
+                endpoint=ctx.endpoint,
+            )
+            ctx.span.set_attribute("http.response.status_code", params.response.status)
+            ctx.span.set_attribute("http.request.body.size", ctx.bytes_sent)
+            ctx.span.end()
+
+        async def on_request_exception(session, ctx, params):
+            metrics.add_gauge("http_requests_in_flight", -1)
+            ctx.span.record_exception(params.exception)
+            ctx.span.end()
+            metrics.inc(
+                "http_request_errors_total",
+                method=ctx.method,
+                endpoint=ctx.endpoint,
+                error=type(params.exception).__name__,
+            )
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        return trace_config
+
+    async def _maybe_export_metrics(self, force: bool = False):
+        """Write the Prometheus textfile if configured and the interval has passed.
+
+        The file is written by a worker thread so disk I/O never blocks the
+        event loop.
+        """
+        path = self.valves.metrics_textfile_path
+        if not path:
+            return
+        now = time.time()
+        if (
+            not force
+            and now - self._last_metrics_export
+            < self.valves.metrics_export_interval_seconds
+        ):
+            return
+        self._last_metrics_export = now
+        try:
+            await asyncio.to_thread(self._metrics.write_textfile, path)
+        except OSError:
+            pass  # Metrics export must never break a tool call
+
+    @property
+    def _session(self) -> Optional[aiohttp.ClientSession]:
+        """The running event loop's session (None before first use)."""
+        return self._sessions.current()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the running loop's aiohttp session with connection pooling."""
+        session, created = await self._sessions.get(self._new_session)
+        if created:
+            self._start_keepalive()
+            self._start_health_monitor()
+        return session
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        timeout = aiohttp.ClientTimeout(total=self.valves.task_timeout_seconds)
+        connector = aiohttp.TCPConnector(
+            limit=10,
+            limit_per_host=5,
+            ttl_dns_cache=300,
+            keepalive_timeout=self._keepalive_timeout(),
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            trace_configs=[self._build_trace_config()],
+        )
+
+    def _keepalive_timeout(self) -> float:
+        """Idle keep-alive lifetime, long enough to survive between health pings."""
+        interval = self.valves.keepalive_ping_interval_seconds
+        if self.valves.prewarm_connections and interval > 0:
+            return max(15.0, interval * 2 + 5.0)
+        return 15.0
+
+    def _spawn_background(self, coro: Any, name: str) -> asyncio.Task:
+        """Run a coroutine in the background, keeping a reference until it finishes."""
+        task = asyncio.ensure_future(coro)
+        task.set_name(name)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _start_keepalive(self):
+        """Start the warm-up and keep-alive ping loop if enabled and not running."""
+        if not self.valves.prewarm_connections:
+            return
+        if self._keepalive_task is not None and not self._keepalive_task.done():
+            return
+        self._keepalive_task = self._spawn_background(
+            _periodic(weakref.ref(self), "_keepalive_step"), "bytebot-keepalive"
+        )
+
+    def _ping_targets(self) -> List[str]:
+        """Lightweight endpoints used to open and refresh pooled connections."""
+        targets = [f"{self.valves.bytebot_url}/tasks?limit=1"]
+        if self.valves.litellm_proxy_url:
+            targets.append(f"{self.valves.litellm_proxy_url}/health/liveliness")
+        return targets
+
+    async def _ping(self, url: str) -> Optional[float]:
+        """Issue one lightweight request and record its RTT; None on failure."""
+        try:
+            session = await self._get_session()
+            start = time.perf_counter()
+            async with session.get(
+                url, timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                await response.read()
+            rtt = time.perf_counter() - start
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            return None
+
+        host = _endpoint_host(url)
+        baseline = self._rtt_baseline.get(host)
+        if baseline is None:
+            self._rtt_baseline[host] = {
+                "last": rtt,
+                "min": rtt,
+                "ewma": rtt,
+                "samples": 1,
+                "updated": time.time(),
+            }
+        else:
+            baseline["last"] = rtt
+            baseline["min"] = min(baseline["min"], rtt)
+            baseline["ewma"] = 0.8 * baseline["ewma"] + 0.2 * rtt
+            baseline["samples"] += 1
+            baseline["updated"] = time.time()
+        return rtt
+
+    async def _warm_up(self):
+        """Open the pool and establish keep-alive connections to every target."""
+        count = max(1, self.valves.prewarm_connection_count)
+        # Concurrent requests force distinct connections instead of reusing one
+        await asyncio.gather(
+            *(self._ping(url) for url in self._ping_targets() for _ in range(count))
+        )
+
+    async def _keepalive_step(self) -> Optional[float]:
+        """Warm the pool; return the delay until the next keep-alive ping."""
+        await self._warm_up()
+        interval = self.valves.keepalive_ping_interval_seconds
+        if not self.valves.prewarm_connections or interval <= 0:
+            return None
+        return interval
+
+    def _start_health_monitor(self):
+        """Start the background health probe loop if enabled and not running."""
+        if not self.valves.health_monitor_enabled:
+            return
+        if self._health_task is not None and not self._health_task.done():
+            return
+        self._health_task = self._spawn_background(
+            _periodic(weakref.ref(self), "_health_step"), "bytebot-health"
+        )
+
+    async def _health_step(self) -> Optional[float]:
+        """Probe every target once and feed the rolling statistics."""
+        if not self.valves.health_monitor_enabled:
+            return None
+        targets = self._ping_targets()
+        rtts = await asyncio.gather(*(self._ping(url) for url in targets))
+        for url, rtt in zip(targets, rtts):
+            self._health.record(_endpoint_host(url), rtt)
+        return max(1, self.valves.health_monitor_interval_seconds)
+
+    @staticmethod
+    def _is_light_read(method: str, url: str, params: Optional[dict] = None) -> bool:
+        """True for GETs sized like a health probe, whose timeout may adapt.
+
+        Writes and large list pages can be slow while the host is healthy,
+        so they keep the session timeout.
+        """
+        if method != "GET":
+            return False
+        parts = urllib.parse.urlsplit(str(url))
+        if not parts.path.rstrip("/").endswith("/tasks"):
+            return True  # One task, or a health endpoint
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        query.update(params or {})
+        try:
+            limit = int(query.get("limit", ADAPTIVE_TIMEOUT_MAX_PAGE))
+        except ValueError:
+            return False
+        return limit <= ADAPTIVE_TIMEOUT_MAX_PAGE
+
+    def _adaptive_timeout(self, url: str) -> Optional[float]:
+        """Request timeout for url's host from observed latency, or None to keep the default."""
+        if not self.valves.health_monitor_enabled:
+            return None
+        host = _endpoint_host(url)
+        stats = self._health.stats(host)
+        if stats is None or stats["samples"] < 5 or stats["p99"] != stats["p99"]:
+            return None
+        timeout = min(
+            self.valves.adaptive_timeout_max_seconds,
+            max(
+                self.valves.adaptive_timeout_min_seconds,
+                self.valves.adaptive_timeout_multiplier * stats["p99"],
+            ),
+        )
+        self._metrics.set_gauge("adaptive_timeout_seconds", timeout, host=host)
+        return timeout
+
+    def _retry_delay(self, url: str, attempt: int) -> float:
+        """Exponential backoff, stretched for slow or error-prone hosts."""
+        delay = 1.0 * (2**attempt)
+        if not self.valves.health_monitor_enabled:
+            return delay
+        stats = self._health.stats(_endpoint_host(url))
+        if stats is None or stats["samples"] < 5:
+            return delay
+        p95 = stats["p95"] if stats["p95"] == stats["p95"] else 0.0
+        delay = max(1.0, p95) * (2**attempt) * (1 + 2 * stats["error_rate"])
+        return min(delay, self.valves.adaptive_timeout_max_seconds)
+
+    def _codec(self) -> JsonCodec:
+        """JSON codec selected by the json_codec valve."""
+        wanted = self.valves.json_codec
+        if self._json_codec is None or wanted != self._json_codec_choice:
+            self._json_codec = _load_json_codec(wanted)
+            self._json_codec_choice = wanted
+        return self._json_codec
+
+    async def _read_json(self, response: aiohttp.ClientResponse) -> Any:
+        """Decode a JSON response body with the configured codec.
+
+        Like aiohttp's response.json(), a body that is not JSON (a proxy's
+        HTML error page, say) raises ContentTypeError, so it is retried and
+        formatted like any other client error instead of escaping as a
+        codec ValueError.
+        """
+        body = await response.read()
+        if not body.strip():
+            return None
+        content_type = response.content_type
+        if "json" not in content_type:
+            raise aiohttp.ContentTypeError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=f"Expected JSON but received {content_type or 'no content type'}",
+                headers=response.headers,
+            )
+        try:
+            return self._codec().loads(body)
+        except ValueError as e:
+            raise aiohttp.ContentTypeError(
+                response.request_info,
+                response.history,
+                status=response.status,
+                message=f"Invalid JSON body: {e}",
+                headers=response.headers,
+            ) from None
+
+    async def _retry_request(
+        self, method: str, url: str, emitter: Optional[Any] = None, **kwargs
+    ) -> dict:
+        """Make HTTP request with exponential backoff retry.
+
+        Connection errors, timeouts, 5xx, 408 and 429 are retried. Other 4xx
+        answers are raised at once, since repeating the request cannot change
+        them. Success without a JSON body (204, or a DELETE acknowledged with
+        text) returns an empty dict.
+        """
+        last_exception = None
+        endpoint = _endpoint_label(url)
+        if "json" in kwargs:
+            kwargs["data"] = self._codec().dumps(kwargs.pop("json"))
+            kwargs["headers"] = {
+                **kwargs.get("headers", {}),
+                "Content-Type": "application/json",
+            }
+        if "timeout" not in kwargs and self._is_light_read(
+            method, url, kwargs.get("params")
+        ):
+            timeout = self._adaptive_timeout(url)
+            if timeout is not None:
+                kwargs["timeout"] = aiohttp.ClientTimeout(total=timeout)
+
+        for attempt in range(self.valves.max_retries):
+            try:
+                with self._tracer.span(
+                    "request.attempt",
+                    attempt=attempt + 1,
+                    **{"http.request.method": method, "http.route": endpoint},
+                ):
+                    session = await self._get_session()
+                    async with session.request(method, url, **kwargs) as response:
+                        response.raise_for_status()
+                        if response.status == 204 or (
+                            method == "DELETE"
+                            and response.content_type != "application/json"
+                        ):
+                            result = {}  # Nothing to decode
+                        else:
+                            result = await self._read_json(response)
+                await self._maybe_export_metrics()
+                return result
+
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                last_exception = e
+
+                # Client errors other than timeouts/throttling will not go away
+                if not _is_transient_error(e):
+                    self._metrics.inc(
+                        "request_failures_total", method=method, endpoint=endpoint
+                    )
+                    raise
+
+                if attempt < self.valves.max_retries - 1:
+                    delay = self._retry_delay(url, attempt)
+                    self._metrics.inc(
+                        "request_retries_total", method=method, endpoint=endpoint
+                    )
+                    if emitter:
+                        await emitter.emit(
+                            f"Request failed (attempt {attempt + 1}/{self.valves.max_retries}), "
+                            f"retrying in {delay:.1f}s...",
+                            done=False,
+                        )
+                    with self._tracer.span(
+                        "backoff", attempt=attempt + 1, delay_seconds=delay
+                    ):
+                        await asyncio.sleep(delay)
+                else:
+                    # Last attempt failed
+                    self._metrics.inc(
+                        "request_failures_total", method=method, endpoint=endpoint
+                    )
+                    await self._maybe_export_metrics()
+                    if emitter:
+                        await emitter.emit(
+                            f"All {self.valves.max_retries} retry attempts failed",
+                            done=False,
+                        )
+
+        # All retries exhausted
+        if last_exception:
+            raise last_exception
+
+    async def _poll_task_completion(
+        self,
+        task_id: str,
+        emitter: Optional[Any] = None,
+        timeout: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        stream: bool = False,
+        base_url: Optional[str] = None,
+        ride_out_errors: bool = False,
     ) -> dict:
-        """Poll task with adaptive intervals until completion or timeout."""
-        intervals = [2, 3, 5, 8, 13, 20]  # Fibonacci-like progression
+        """Poll task with adaptive intervals until completion or timeout.
+
+        With stream, new ASSISTANT steps are appended to the chat after each
+        poll (one message event per poll). base_url selects another agent.
+        With ride_out_errors, transient failures (see _is_transient_error)
+        that outlast the request retries are skipped like _poll_many does,
+        backing off until the timeout instead of raising.
+        """
+        base_url = base_url or self.valves.bytebot_url
+        intervals = POLL_INTERVALS
+        message_stream = MessageStream() if stream and emitter else None
+        if max_interval is not None:
+            intervals = [min(i, max_interval) for i in intervals]
         poll_count = 0
         start_time = time.time()
+        if timeout is None:
+            timeout = self.valves.task_timeout_seconds
+
+        self._metrics.add_gauge("tasks_polling_in_flight", 1)
+        try:
+            while True:
+                # Determine current interval
+                interval = intervals[min(poll_count, len(intervals) - 1)]
+
+                # Check timeout
+                elapsed = time.time() - start_time
+                if elapsed > timeout:
+                    if emitter:
+                        await emitter.emit(
+                            f"Task timeout after {elapsed:.0f}s. Task still running.",
+                            done=True,
+                        )
+                    return {
+                        "status": "TIMEOUT",
+                        "task_id": task_id,
+                        "timeout_info": f"Exceeded {timeout:.0f}s timeout",
+                    }
+
+                # Poll status
+                try:
+                    with self._tracer.span(
+                        "poll",
+                        **{"bytebot.task_id": task_id, "poll.number": poll_count + 1},
+                    ) as poll_span:
+                        task = await self._retry_request(
+                            "GET", f"{base_url}/tasks/{task_id}", emitter=emitter
+                        )
+                        record = TaskRecord.from_api(task)
+                        poll_span.set_attribute("bytebot.status", record.status)
+                    self._metrics.inc("task_polls_total")
+                    self._status_counts.observe(task_id, task.get("status"))
+                except Exception as e:
+                    if ride_out_errors and _is_transient_error(e):
+                        with self._tracer.span("poll.wait", interval_seconds=interval):
+                            await asyncio.sleep(interval)
+                        poll_count += 1
+                        continue
+                    if emitter:
+                        await emitter.emit(
+                            f"Error polling task status: {str(e)}", done=True
+                        )
+                    raise
+
+                status = task.get("status")
 
-        while True:
-            # Determine current interval
-            interval = intervals[min(poll_count, len(intervals) - 1)]
+                if message_stream is not None:
+                    await self._stream_new_messages(task, message_stream, emitter)
 
-            # Check timeout
-            elapsed = time.time() - start_time
-            if elapsed > self.valves.task_timeout_seconds:
+                # Emit progress update based on verbosity
                 if emitter:
+                    latest_message = record.latest_message
+                    if latest_message and latest_message.text:
+                        description = f"{status}: {latest_message.text[:80]}..."
+                    else:
+                        description = f"Task status: {status}"
+                    await emitter.emit(description, done=False)
+
+                # Check terminal states
+                if self._is_finished_status(status):
+                    self._record_task_detection(record, poll_count + 1)
+                    self._release_task_slots(task_id)
+                    if emitter and status == "NEEDS_HELP":
+                        await emitter.emit("Task needs human assistance", done=True)
+                    elif emitter and status == "NEEDS_REVIEW":
+                        await emitter.emit("Task needs review", done=True)
+                    return task
+
+                # Wait before next poll
+                with self._tracer.span("poll.wait", interval_seconds=interval):
+                    await asyncio.sleep(interval)
+                poll_count += 1
+        finally:
+            self._metrics.add_gauge("tasks_polling_in_flight", -1)
+            await self._maybe_export_metrics()
+
+    async def _stream_new_messages(
+        self, task: dict, message_stream: MessageStream, emitter: EventEmitter
+    ):
+        """Append steps added since the last poll to the chat as one message event."""
+        new = message_stream.new_messages(task.get("messages") or [])
+        lines = [
+            f"- {text} (x{count})" if count > 1 else f"- {text}"
+            for text, count in _collapse_repeats(_iter_log_lines(new))
+        ]
+        if not lines:
+            return
+        header = "" if message_stream.emitted else "\n\n**Task progress:**\n"
+        await emitter.emit_message(header + "\n".join(lines) + "\n")
+        message_stream.emitted += len(lines)
+        self._metrics.inc("streamed_task_steps_total", len(lines))
+
+    @staticmethod
+    def _is_finished_status(status: Optional[str]) -> bool:
+        """True once polling can stop: terminal or waiting on a human."""
+        return status in TERMINAL_STATUSES or status in ATTENTION_STATUSES
+
+    def _record_task_detection(self, task: TaskRecord, polls: int):
+        """Record polls needed and completion-to-detection lag for a finished task."""
+        self._metrics.observe(
+            "task_polls_per_task", polls, buckets=MetricsRegistry.COUNT_BUCKETS
+        )
+        if task.updated is not None:
+            lag = time.time() - task.updated
+            if lag >= 0:
+                self._metrics.observe(
+                    "task_completion_detection_seconds", lag, status=task.status
+                )
+
+    def _check_user_quota(self, user: Optional[dict]) -> Optional[str]:
+        """Return an error message when the user has used up their submission quota."""
+        retry_after = self._scheduler.quota_retry_after(
+            (user or {}).get("id", ""),
+            self.valves.user_task_quota,
+            self.valves.user_quota_window_seconds,
+        )
+        if retry_after <= 0:
+            return None
+        return f"Error: {self._quota_message(retry_after)}"
+
+    def _quota_message(self, retry_after: float) -> str:
+        return (
+            f"Task quota reached ({self.valves.user_task_quota} tasks per "
+            f"{self.valves.user_quota_window_seconds}s). Try again in {retry_after:.0f}s."
+        )
+
+    def _reserve_quota(self, user: Optional[dict]) -> tuple:
+        """Count a submission against the user's quota before it is sent.
+
+        Concurrent submissions from one user each take their own slot, so
+        together they cannot exceed user_task_quota. Raises _QuotaExceeded
+        when none is left.
+        """
+        user_id = (user or {}).get("id", "")
+        token, retry_after = self._scheduler.reserve_quota(
+            user_id,
+            self.valves.user_task_quota,
+            self.valves.user_quota_window_seconds,
+        )
+        if retry_after > 0:
+            raise _QuotaExceeded(self._quota_message(retry_after))
+        return user_id, token
+
+    async def _admit_submission(
+        self, model_name: str, user: Optional[dict], emitter: EventEmitter
+    ) -> tuple:
+        """Reserve the user's quota, then wait for their fair share of the
+        agent and the model's limits.
+
+        Returns the (user, model, quota) leases to bind to the created task.
+        """
+        user_id = (user or {}).get("id", "")
+        quota = self._reserve_quota(user)
+        self._scheduler.configure(
+            self.valves.agent_max_concurrent_tasks,
+            self.valves.user_max_concurrent_tasks,
+            self.valves.user_weights,
+        )
+
+        user_lease = None
+        try:
+            if self._scheduler.enabled():
+                queued = self._scheduler.queued_ahead()
+                if queued:
                     await emitter.emit(
-                        f"Task timeout after {elapsed:.0f}s. Task still running.",
-                        done=True,
+                        f"Queued for ByteBot ({queued} submissions ahead)...",
+                        done=False,
+                    )
+                started = time.perf_counter()
+                self._metrics.add_gauge("scheduler_queued_submissions", 1)
+                try:
+                    with self._tracer.span("scheduler.wait"):
+                        user_lease = await self._scheduler.acquire(
+                            user_id, self._finished_task_ids
+                        )
+                finally:
+                    self._metrics.add_gauge("scheduler_queued_submissions", -1)
+                self._metrics.observe(
+                    "scheduler_wait_seconds", time.perf_counter() - started
+                )
+
+            model_lease = await self._acquire_model_slot(model_name, emitter)
+        except BaseException:
+            self._release_slots((user_lease, None, quota))
+            raise
+        return user_lease, model_lease, quota
+
+    def _bind_slots(self, leases: tuple, task_id: Optional[str]):
+        """Attach a created task to its scheduler and limiter slots."""
+        self._status_counts.observe(task_id, "PENDING", created=True)
+        user_lease, model_lease, quota = leases
+        self._scheduler.bind(user_lease, task_id)
+        self._limiter.bind(model_lease, task_id)
+        if not task_id and quota is not None:
+            self._scheduler.release_quota(*quota)
+
+    def _release_slots(self, leases: tuple):
+        """Free slots and the quota reservation of a submission that failed."""
+        user_lease, model_lease, quota = leases
+        self._scheduler.release(user_lease)
+        self._limiter.release(model_lease)
+        if quota is not None:
+            self._scheduler.release_quota(*quota)
+
+    def _release_task_slots(self, task_id: Optional[str]):
+        """Free any slots held by a task that is known to be finished."""
+        self._scheduler.release_task(task_id)
+        self._limiter.release_task(task_id)
+
+    async def _acquire_model_slot(
+        self, model_name: str, emitter: EventEmitter
+    ) -> Optional[_Lease]:
+        """Wait for the per-model concurrency and rate limits before a submission."""
+        self._limiter.configure(
+            self.valves.model_concurrency_limits, self.valves.model_rate_limits
+        )
+        if not self._limiter.enabled(model_name):
+            return None
+        if self._limiter.is_busy(model_name):
+            await emitter.emit(
+                f"Waiting for a free slot on {model_name.split('/')[-1]}...",
+                done=False,
+            )
+        with self._tracer.span("model_slot.wait", model=model_name):
+            return await self._limiter.acquire(model_name, self._finished_task_ids)
+
+    async def _finished_task_ids(self, task_ids: List[str]) -> List[str]:
+        """Return the IDs among task_ids that are finished or no longer exist."""
+
+        async def check(task_id: str) -> bool:
+            session = await self._get_session()
+            try:
+                async with session.get(
+                    f"{self.valves.bytebot_url}/tasks/{task_id}"
+                ) as response:
+                    if response.status == 404:
+                        return True
+                    response.raise_for_status()
+                    task = await self._read_json(response)
+            except (asyncio.TimeoutError, aiohttp.ClientError, ValueError):
+                return False
+            return self._is_finished_status(task.get("status"))
+
+        finished = await asyncio.gather(*(check(task_id) for task_id in task_ids))
+        return [task_id for task_id, done in zip(task_ids, finished) if done]
+
+    async def _get_status_counts(
+        self, emitter: Optional[EventEmitter] = None, need_active: bool = False
+    ) -> StatusAggregator:
+        """Return global status counts, refreshing them once the TTL has passed.
+
+        With need_active, also refresh when a task seen since the snapshot
+        is missing from the active list. Concurrent callers share a single
+        refresh.
+        """
+        aggregator = self._status_counts
+        if aggregator.age() < self._status_counts_ttl() and (
+            aggregator.active_complete or not need_active
+        ):
+            return aggregator
+        # A refresh running on another thread's loop cannot be awaited here
+        if (
+            aggregator.refreshing is None
+            or aggregator.refreshing.done()
+            or aggregator.refreshing.get_loop() is not asyncio.get_running_loop()
+        ):
+            aggregator.refreshing = asyncio.ensure_future(
+                self._refresh_status_counts(emitter)
+            )
+        await asyncio.shield(aggregator.refreshing)
+        return aggregator
+
+    def _status_counts_ttl(self) -> float:
+        """Cache lifetime of the current snapshot; scans walk every page."""
+        ttl = self.valves.status_counts_ttl_seconds
+        if self._status_counts.source == "scan":
+            ttl = max(ttl, self.valves.status_counts_scan_ttl_seconds)
+        return ttl
+
+    async def _refresh_status_counts(self, emitter: Optional[EventEmitter] = None):
+        """Take a new global status snapshot."""
+        aggregator = self._status_counts
+        url = f"{self.valves.bytebot_url}/tasks"
+
+        with self._tracer.span("status_counts.refresh"):
+            if aggregator.filter_supported is not False:
+                responses = await asyncio.gather(
+                    self._retry_request("GET", url, params={"limit": "1"}),
+                    *(
+                        self._retry_request(
+                            "GET", url, params={"limit": "1", "status": status}
+                        )
+                        for status in ALL_STATUSES
+                    ),
+                )
+                unfiltered, filtered = responses[0], responses[1:]
+                supported = all(
+                    self._validate_api_response(data, ["tasks"])
+                    and "total" in data
+                    and all(t.get("status") == status for t in data["tasks"])
+                    for status, data in zip(ALL_STATUSES, filtered)
+                )
+                aggregator.filter_supported = supported
+                if supported:
+                    counts = Counter(
+                        {
+                            status: data["total"]
+                            for status, data in zip(ALL_STATUSES, filtered)
+                            if data["total"]
+                        }
                     )
-                return {
-                    "status": "TIMEOUT",
-                    "task_id": task_id,
-                    "timeout_info": f"Exceeded {self.valves.task_timeout_seconds}s timeout",
-                }
+                    # One status per query, for servers that take a single value
+                    active = await asyncio.gather(
+                        *(
+                            self._collect_task_pages(status, emitter)
+                            for status in ACTIVE_STATUSES
+                            if counts[status]
+                        )
+                    )
+                    aggregator.replace(
+                        counts,
+                        unfiltered.get("total", sum(counts.values())),
+                        "filter",
+                        (record for records in active for record in records),
+                    )
+                    return
 
-            # Poll status
+            # Server ignores ?status=: count every page instead
+            counts = Counter()
+            active = []
+            pages = self._iter_task_pages(
+                page_size=100,
+                emitter=emitter,
+                prefetch=self.valves.export_prefetch_pages,
+            )
             try:
-                task = await self._retry_request(
-                    "GET", f"{self.valves.bytebot_url}/tasks/{task_id}", emitter=emitter
+                async for page in pages:
+                    for task in page:
+                        status = task.get("status") or "UNKNOWN"
+                        counts[status] += 1
+                        if status in ACTIVE_STATUSES:
+                            active.append(TaskRecord.from_api(task))
+            finally:
+                await pages.aclose()
+            aggregator.replace(counts, sum(counts.values()), "scan", active)
+
+    async def _collect_task_pages(
+        self, status: str, emitter: Optional[EventEmitter] = None
+    ) -> List[TaskRecord]:
+        """Records of every task with one status, via server-side filtering."""
+        records = []
+        pages = self._iter_task_pages(
+            status,
+            page_size=100,
+            emitter=emitter,
+            prefetch=self.valves.export_prefetch_pages,
+        )
+        try:
+            async for page in pages:
+                records.extend(
+                    TaskRecord.from_api(t) for t in page if t.get("status") == status
                 )
-            except Exception as e:
-                if emitter:
-                    await emitter.emit(
-                        f"Error polling task status: {str(e)}", done=True
-                    )
-                raise
+        finally:
+            await pages.aclose()
+        return records
+
+    async def _iter_tasks_by_status(
+        self,
+        statuses: Optional[Iterable[str]],
+        emitter: Optional[EventEmitter] = None,
+        prefetch: int = 1,
+    ):
+        """Yield tasks in any of statuses (all tasks for None), newest first.
 
-            status = task.get("status")
+        ByteBot filters on a single status, so each status is queried on its
+        own and the streams are merged by createdAt. A server known to ignore
+        ?status= gets one unfiltered scan instead. Tasks pushed onto the next
+        page by new arrivals are yielded once.
+        """
+        wanted = sorted(set(statuses)) if statuses else []
+        if not wanted:
+            streams: Dict[Optional[str], Optional[set]] = {None: None}
+        elif len(wanted) > 1 and self._status_counts.filter_supported is False:
+            streams = {None: set(wanted)}
+        else:
+            streams = {status: {status} for status in wanted}
+        pages = {
+            key: self._iter_task_pages(
+                key, page_size=100, emitter=emitter, prefetch=prefetch
+            )
+            for key in streams
+        }
+        previous_ids: Dict[Optional[str], set] = {key: set() for key in streams}
+
+        async def next_tasks(key: Optional[str]) -> Optional[deque]:
+            async for page in pages[key]:
+                seen, previous_ids[key] = previous_ids[key], {t.get("id") for t in page}
+                kept = deque(
+                    t
+                    for t in page
+                    if t.get("id") not in seen
+                    and (streams[key] is None or t.get("status") in streams[key])
+                )
+                if kept:
+                    return kept
+            return None
 
-            # Emit progress update based on verbosity
-            if emitter:
-                latest_message = self._get_latest_message_text(task)
-                if latest_message:
-                    description = f"{status}: {latest_message[:80]}..."
-                else:
-                    description = f"Task status: {status}"
-                await emitter.emit(description, done=False)
+        try:
+            heads = await asyncio.gather(*(next_tasks(key) for key in streams))
+            buffers = {key: tasks for key, tasks in zip(streams, heads) if tasks}
+            while buffers:
+                key = max(buffers, key=lambda k: buffers[k][0].get("createdAt") or "")
+                yield buffers[key].popleft()
+                if not buffers[key]:
+                    tasks = await next_tasks(key)
+                    if tasks:
+                        buffers[key] = tasks
+                    else:
+                        del buffers[key]
+        finally:
+            for stream in pages.values():
+                await stream.aclose()
 
-            # Check terminal states
-            if status in ["COMPLETED", "FAILED", "CANCELLED"]:
-                return task
+    async def _iter_task_pages(
+        self,
+        status: Optional[str] = None,
+        page_size: int = 100,
+        emitter: Optional[EventEmitter] = None,
+        prefetch: int = 1,
+    ):
+        """Yield successive pages of GET /tasks (newest first) until exhausted.
 
-            if status == "NEEDS_HELP":
-                if emitter:
-                    await emitter.emit("Task needs human assistance", done=True)
-                return task
+        Up to `prefetch` later pages are fetched concurrently while the
+        caller consumes the current one; pages are still yielded in order.
+        """
+        params = {"limit": str(page_size)}
+        if status:
+            params["status"] = status
 
-            if status == "NEEDS_REVIEW":
-                if emitter:
-                    await emitter.emit("Task needs review", done=True)
-                return task
+        async def fetch(page: int) -> dict:
+            data = await self._retry_request(
+                "GET",
+                f"{self.valves.bytebot_url}/tasks",
+                emitter=emitter,
+                params=dict(params, page=str(page)),
+            )
+            if not self._validate_api_response(data, ["tasks"]):
+                raise ValueError("Unexpected API response format")
+            return data
+
+        data = await fetch(1)
+        if not data.get("tasks"):
+            return
+        yield data["tasks"]
 
-            # Wait before next poll
-            await asyncio.sleep(interval)
-            poll_count += 1
+        total_pages = data.get("totalPages", 1)
+        next_page = 2
+        pending: deque = deque()
+        try:
+            while next_page <= total_pages or pending:
+                while next_page <= total_pages and len(pending) < max(1, prefetch):
+                    pending.append(asyncio.ensure_future(fetch(next_page)))
+                    next_page += 1
+                tasks = (await pending.popleft()).get("tasks", [])
+                if not tasks:
+                    return
+                yield tasks
+        finally:
+            for future in pending:
+                future.cancel()
+            # Reap the cancelled fetches so their errors are not logged as unretrieved
+            await asyncio.gather(*pending, return_exceptions=True)
 
     def _get_latest_message_text(self, task: dict) -> str:
         """Extract latest message text from task."""
-        messages = task.get("messages", [])
-        if not messages:
-            return ""
+        latest = MessageRecord.latest_assistant(task.get("messages"))
+        return latest.text if latest else ""
 
-        for msg in reversed(messages):
-            if msg.get("role") == "ASSISTANT":
-                content_blocks = msg.get("content", [])
-                for block in content_blocks:
-                    if block.get("type") == "text":
-                        return block.get("text", "")
+    def _format_task_result(self, task: dict, log_budget: Optional[int] = None) -> str:
+        """Format completed task as markdown (cached by task id, updatedAt and options).
 
-        return ""
+        log_budget overrides execution_log_token_budget for the execution log.
+        """
+        if log_budget is None:
+            log_budget = self.valves.execution_log_token_budget
+        with self._tracer.span("format_task_result"):
+            return self._format_task_result_cached(task, log_budget)
+
+    def _format_task_result_cached(self, task: dict, log_budget: int) -> str:
+        """Look up or render a task result through the render cache."""
+        task_id = task.get("id")
+        updated = task.get("updatedAt")
+
+        # Only tasks with a stable identity and revision can be cached
+        if not task_id or not updated:
+            return self._render_task_result(task, log_budget)
+
+        messages = task.get("messages")
+        cache_key = (
+            task_id,
+            updated,
+            task.get("status"),
+            self.user_valves.show_execution_logs,
+            log_budget,
+            None if messages is None else len(messages),
+            task.get("timeout_info"),
+        )
 
-    def _format_task_result(self, task: dict) -> str:
-        """Format completed task as markdown."""
+        cached = self._render_cache.get(cache_key)
+        if cached is not None:
+            self._render_cache.move_to_end(cache_key)
+            return cached
+
+        rendered = self._render_task_result(task, log_budget)
+        self._render_cache[cache_key] = rendered
+        if len(self._render_cache) > RENDER_CACHE_SIZE:
+            self._render_cache.popitem(last=False)
+        return rendered
+
+    def _render_task_result(self, task: dict, log_budget: Optional[int] = None) -> str:
+        """Render a task as markdown without consulting the cache."""
+        if log_budget is None:
+            log_budget = self.valves.execution_log_token_budget
         status = task.get("status", "UNKNOWN")
         task_id = task.get("id", "N/A")
         description = task.get("description", "No description")
@@ -367,12 +4529,12 @@ class Tools:
         updated = task.get("updatedAt", "")
 
         # Calculate duration
+        start = _parse_timestamp(created) if created else None
+        end = _parse_timestamp(updated) if updated else None
         try:
-            start = datetime.fromisoformat(created.replace("Z", "+00:00"))
-            end = datetime.fromisoformat(updated.replace("Z", "+00:00"))
             duration = (end - start).total_seconds()
             duration_str = f"{duration:.0f} seconds"
-        except:
+        except TypeError:
             duration_str = "Unknown"
 
         # Build output
@@ -398,16 +4560,7 @@ class Tools:
             messages = task.get("messages", [])
             if messages:
                 output.append("**Execution Log:**")
-                for msg in messages:
-                    if msg.get("role") == "ASSISTANT":
-                        content_blocks = msg.get("content", [])
-                        for block in content_blocks:
-                            if block.get("type") == "text":
-                                text = block.get("text", "")
-                                # Truncate very long messages
-                                if len(text) > 200:
-                                    text = text[:200] + "..."
-                                output.append(f"- {text}")
+                output.extend(_budget_log_lines(messages, log_budget))
                 output.append("")
 
         # Action items based on status
@@ -447,12 +4600,12 @@ class Tools:
             "contextWindow": 128000,
         }
 
-    def _format_task_summary(self, tasks: List[dict]) -> str:
-        """Generate status summary from task list."""
+    def _format_task_summary(self, tasks: List[TaskRecord]) -> str:
+        """Generate status summary from task records (raw dicts are converted)."""
         if not tasks:
             return ""
 
-        status_counts = Counter(t.get("status", "UNKNOWN") for t in tasks)
+        status_counts = Counter(t.status for t in TaskRecord.coerce(tasks))
 
         summary_lines = ["**Task Summary:**"]
 
@@ -488,12 +4641,17 @@ class Tools:
         return "\n".join(summary_lines)
 
     def _format_task_list(
-        self, tasks: List[dict], page: int = 1, total_pages: int = 1, total: int = 0
+        self,
+        tasks: List[TaskRecord],
+        page: int = 1,
+        total_pages: int = 1,
+        total: int = 0,
     ) -> str:
-        """Format task list as markdown with summary and pagination."""
+        """Format task records as markdown with summary and pagination."""
         if not tasks:
             return "No tasks found."
 
+        tasks = TaskRecord.coerce(tasks)
         output = []
 
         # Add summary
@@ -510,36 +4668,32 @@ class Tools:
         output.append(f"**Recent Tasks ({len(tasks)}):**")
         output.append("")
 
-        for task in tasks:
-            status = task.get("status", "UNKNOWN")
-            desc = task.get("description", "No description")
-            if len(desc) > 60:
-                desc = desc[:60] + "..."
-
-            created = task.get("createdAt", "")
-            try:
-                created_dt = datetime.fromisoformat(created.replace("Z", "+00:00"))
-                created_str = created_dt.strftime("%Y-%m-%d %H:%M:%S")
-            except:
-                created_str = created[:19].replace("T", " ") if created else "Unknown"
-
-            priority = task.get("priority", "MEDIUM")
-
-            output.append(f"**{status}** (Priority: {priority})")
-            output.append(f"  - ID: `{task.get('id', 'N/A')}`")
-            output.append(f"  - {desc}")
-            output.append(f"  - Created: {created_str}")
-            output.append("")
+        # One pre-joined block per task keeps large listings cheap to build
+        output.extend(
+            f"**{task.status}** (Priority: {task.priority})\n"
+            f"  - ID: `{task.id}`\n"
+            f"  - {self._truncate_description(task.description)}\n"
+            f"  - Created: {task.created}\n"
+            for task in tasks
+        )
 
         return "\n".join(output)
 
+    @staticmethod
+    def _truncate_description(desc: str) -> str:
+        """Shorten a task description for list views."""
+        return desc[:60] + "..." if len(desc) > 60 else desc
+
+    @_instrumented
     async def execute_task(
         self,
         task_description: str,
         priority: Optional[str] = None,
         wait_for_completion: Optional[bool] = None,
+        notify_on_completion: Optional[bool] = None,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
         __user__: dict = {},
+        __chat_id__: Optional[str] = None,
     ) -> str:
         """
         Execute an automation task on ByteBot.
@@ -547,6 +4701,7 @@ class Tools:
         :param task_description: Natural language task description (e.g., "Download invoices from vendor portal")
         :param priority: Task urgency - LOW, MEDIUM, HIGH, or URGENT (defaults to user preference)
         :param wait_for_completion: Poll until done (True) or return task ID immediately (False)
+        :param notify_on_completion: When not waiting, post the result to this chat once the task finishes
         :return: Task execution results or task ID
         """
         # Use defaults from user preferences
@@ -554,10 +4709,10 @@ class Tools:
             priority = self.user_valves.default_priority
         if wait_for_completion is None:
             wait_for_completion = self.user_valves.default_wait_for_completion
+        if notify_on_completion is None:
+            notify_on_completion = self.user_valves.default_notify_on_completion
 
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
-        )
+        emitter = self._create_emitter(__event_emitter__)
 
         # Validate inputs
         if not task_description or len(task_description.strip()) < 5:
@@ -566,66 +4721,248 @@ class Tools:
         if priority not in ["LOW", "MEDIUM", "HIGH", "URGENT"]:
             return f"Error: Invalid priority '{priority}'. Must be LOW, MEDIUM, HIGH, or URGENT."
 
+        quota_error = self._check_user_quota(__user__)
+        if quota_error:
+            return quota_error
+
         await emitter.emit("Connecting to ByteBot...", done=False)
 
         # Submit task
         try:
+            model = self._get_model_config()
             task_data = {
                 "description": task_description,
                 "priority": priority,
                 "type": "IMMEDIATE",
                 "control": "ASSISTANT",
-                "model": self._get_model_config(),
+                "model": model,
             }
 
-            task = await self._retry_request(
-                "POST",
-                f"{self.valves.bytebot_url}/tasks",
-                emitter=emitter,
-                json=task_data,
-            )
+            if self._outbox_accepts():
+                return await self._queue_in_outbox(
+                    task_data, __user__, __chat_id__, emitter
+                )
+
+            leases = await self._admit_submission(model["name"], __user__, emitter)
+            attempted = time.time()
+            try:
+                task = await self._retry_request(
+                    "POST",
+                    f"{self.valves.bytebot_url}/tasks",
+                    emitter=emitter,
+                    json=task_data,
+                )
+            except BaseException as e:
+                self._release_slots(leases)
+                if not self._outbox_accepts(e):
+                    raise
+                return await self._queue_in_outbox(
+                    task_data,
+                    __user__,
+                    __chat_id__,
+                    emitter,
+                    None if isinstance(e, aiohttp.ClientConnectorError) else attempted,
+                )
 
             task_id = task.get("id")
+            self._bind_slots(leases, task_id)
+            self._tracer.current_span().set_attribute("bytebot.task_id", task_id)
 
             await emitter.emit(f"Task created: {task_id}", done=False)
 
             # Return immediately if not waiting
             if not wait_for_completion:
                 await emitter.emit("Task submitted successfully", done=True)
+                if notify_on_completion and __event_emitter__:
+                    self._spawn_background(
+                        self._notify_on_completion(
+                            task_id,
+                            __event_emitter__,
+                            __user__,
+                            __chat_id__,
+                            task_description,
+                        ),
+                        f"bytebot-notify-{task_id}",
+                    )
+                    return f"Task submitted successfully.\n\n**Task ID:** `{task_id}`\n\nThe result will be posted to this chat when the task finishes."
                 return f"Task submitted successfully.\n\n**Task ID:** `{task_id}`\n\nUse get_task_status('{task_id}') to check progress."
 
             # Poll for completion
             await emitter.emit("Monitoring task progress...", done=False)
-            completed_task = await self._poll_task_completion(task_id, emitter)
+            completed_task = await self._wait_with_tracking(
+                task_id, emitter, __user__, __chat_id__, task_description
+            )
 
             await emitter.emit("Task monitoring complete", done=True)
 
-            # Handle special statuses
-            if completed_task.get("status") == "TIMEOUT":
-                return self._format_task_result(completed_task)
-            elif completed_task.get("status") == "NEEDS_HELP":
-                return ErrorFormatter.format_needs_help(task_id)
-            elif completed_task.get("status") == "FAILED":
-                messages = completed_task.get("messages", [])
-                return ErrorFormatter.format_task_failed(task_id, messages)
-
-            return self._format_task_result(completed_task)
+            return self._format_completion(task_id, completed_task)
 
         except aiohttp.ClientError as e:
             error_msg = ErrorFormatter.format_api_error(e, "task execution")
             await emitter.emit(error_msg, done=True)
             return error_msg
+        except _QuotaExceeded as e:
+            error_msg = f"Error: {e}"
+            await emitter.emit(error_msg, done=True)
+            return error_msg
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             await emitter.emit(error_msg, done=True)
             return error_msg
 
+    @_instrumented
+    async def wait_for_tasks(
+        self,
+        task_ids: List[str],
+        mode: str = "all",
+        timeout: Optional[int] = None,
+        __event_emitter__: Optional[Callable[[dict], Any]] = None,
+        __user__: dict = {},
+    ) -> str:
+        """
+        Wait on several tasks at once and return their combined results.
+
+        :param task_ids: Task IDs to wait on (list, or a comma-separated string)
+        :param mode: "any" returns as soon as one task finishes, "all" waits for every task
+        :param timeout: Maximum seconds to wait (defaults to the task timeout)
+        :return: Combined status and results for all tasks
+        """
+        if isinstance(task_ids, str):
+            task_ids = task_ids.split(",")
+        ids = list(dict.fromkeys(t.strip() for t in task_ids or [] if t and t.strip()))
+        mode = (mode or "all").lower()
+
+        if not ids:
+            return "Error: Provide at least one task ID."
+        if mode not in ("any", "all"):
+            return f"Error: Invalid mode '{mode}'. Must be 'any' or 'all'."
+        if timeout is None:
+            timeout = self.valves.task_timeout_seconds
+
+        emitter = self._create_emitter(__event_emitter__)
+        await emitter.emit(f"Waiting for {len(ids)} tasks ({mode})...", done=False)
+
+        try:
+            finished, latest, timed_out = await self._poll_many(
+                ids, mode, timeout, emitter
+            )
+        except Exception as e:
+            error_msg = f"Error waiting for tasks: {str(e)}"
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+
+        await emitter.emit(f"{len(finished)} of {len(ids)} tasks finished", done=True)
+
+        output = [
+            f"**Wait Result:** {len(finished)} of {len(ids)} tasks finished (mode: {mode})"
+        ]
+        if timed_out:
+            output.append(f"Stopped waiting after {timeout}s.")
+        output.append("")
+
+        # The execution logs of all finished tasks share one budget
+        log_budget = self._shared_log_budget(len(finished))
+        for task_id in ids:
+            if task_id in finished:
+                task = finished[task_id]
+                if task.get("status") == "NOT_FOUND":
+                    output.append(f"Task not found: {task_id}")
+                else:
+                    output.append(self._format_completion(task_id, task, log_budget))
+            else:
+                task = latest.get(task_id) or {}
+                status = task.get("status", "UNKNOWN")
+                output.append(f"**{status}** `{task_id}` - still running")
+                output.append(f"Use get_task_status('{task_id}') to check progress.")
+            output.append("")
+
+        return "\n".join(output).rstrip()
+
+    async def _poll_many(
+        self, task_ids: List[str], mode: str, timeout: float, emitter: EventEmitter
+    ) -> tuple:
+        """Poll several tasks in one shared loop until any/all finish or timeout.
+
+        Returns (finished tasks by ID, latest seen task by ID, timed_out).
+        """
+        pending = list(task_ids)
+        finished: Dict[str, dict] = {}
+        latest: Dict[str, dict] = {}
+        poll_count = 0
+        start_time = time.time()
+
+        self._metrics.add_gauge("tasks_polling_in_flight", len(pending))
+        try:
+            while True:
+                with self._tracer.span(
+                    "poll", tasks=len(pending), **{"poll.number": poll_count + 1}
+                ):
+                    responses = await asyncio.gather(
+                        *(
+                            self._retry_request(
+                                "GET", f"{self.valves.bytebot_url}/tasks/{task_id}"
+                            )
+                            for task_id in pending
+                        ),
+                        return_exceptions=True,
+                    )
+                self._metrics.inc("task_polls_total", len(pending))
+
+                still_pending = []
+                for task_id, response in zip(pending, responses):
+                    if isinstance(response, aiohttp.ClientResponseError) and (
+                        response.status == 404
+                    ):
+                        finished[task_id] = {"status": "NOT_FOUND", "id": task_id}
+                    elif isinstance(response, BaseException):
+                        if isinstance(
+                            response, (asyncio.TimeoutError, aiohttp.ClientError)
+                        ):
+                            still_pending.append(task_id)  # Transient; retry next round
+                        else:
+                            raise response
+                    elif self._is_finished_status(response.get("status")):
+                        self._status_counts.observe(task_id, response.get("status"))
+                        self._record_task_detection(
+                            TaskRecord.from_api(response), poll_count + 1
+                        )
+                        self._release_task_slots(task_id)
+                        finished[task_id] = response
+                    else:
+                        self._status_counts.observe(task_id, response.get("status"))
+                        latest[task_id] = response
+                        still_pending.append(task_id)
+
+                self._metrics.add_gauge(
+                    "tasks_polling_in_flight", len(still_pending) - len(pending)
+                )
+                pending = still_pending
+
+                if not pending or (mode == "any" and finished):
+                    return finished, latest, False
+
+                await emitter.emit(
+                    f"{len(finished)} of {len(task_ids)} tasks finished", done=False
+                )
+
+                interval = POLL_INTERVALS[min(poll_count, len(POLL_INTERVALS) - 1)]
+                remaining = timeout - (time.time() - start_time)
+                if remaining <= 0:
+                    return finished, latest, True
+                with self._tracer.span("poll.wait", interval_seconds=interval):
+                    await asyncio.sleep(min(interval, remaining))
+                poll_count += 1
+        finally:
+            self._metrics.add_gauge("tasks_polling_in_flight", -len(pending))
+
+    @_instrumented
     async def list_tasks(
         self,
         status_filter: Optional[str] = None,
         limit: Optional[int] = None,
         page: int = 1,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
+        __user__: dict = {},
     ) -> str:
         """
         List recent ByteBot automation tasks with pagination.
@@ -638,9 +4975,7 @@ class Tools:
         if limit is None:
             limit = self.user_valves.task_history_limit
 
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
-        )
+        emitter = self._create_emitter(__event_emitter__)
 
         await emitter.emit("Fetching task list...", done=False)
 
@@ -661,14 +4996,14 @@ class Tools:
             if not self._validate_api_response(response_data, ["tasks"]):
                 return "Error: Unexpected API response format. Please check ByteBot version compatibility."
 
-            tasks = response_data.get("tasks", [])
+            tasks = [TaskRecord.from_api(t) for t in response_data.get("tasks", [])]
             total = response_data.get("total", len(tasks))
             total_pages = response_data.get("totalPages", 1)
 
             # Client-side filtering if needed (server may not support status filter)
             if status_filter and "status" not in params:
                 status_filter_upper = status_filter.upper()
-                tasks = [t for t in tasks if t.get("status") == status_filter_upper]
+                tasks = [t for t in tasks if t.status == status_filter_upper]
 
             await emitter.emit(
                 f"Found {len(tasks)} tasks (page {page}/{total_pages})", done=True
@@ -685,9 +5020,11 @@ class Tools:
             await emitter.emit(error_msg, done=True)
             return error_msg
 
+    @_instrumented
     async def list_active_tasks(
         self,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
+        __user__: dict = {},
     ) -> str:
         """
         List only currently running tasks (PENDING, IN_PROGRESS, QUEUED).
@@ -696,24 +5033,15 @@ class Tools:
 
         :return: Formatted list of active tasks with summary
         """
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
-        )
+        emitter = self._create_emitter(__event_emitter__)
 
         await emitter.emit("Fetching active tasks...", done=False)
 
         try:
-            response_data = await self._retry_request(
-                "GET", f"{self.valves.bytebot_url}/tasks", emitter=emitter
-            )
-
-            # Validate response structure
-            if not self._validate_api_response(response_data, ["tasks"]):
-                return "Error: Unexpected API response format. Please check ByteBot version compatibility."
-
-            tasks = response_data.get("tasks", [])
-            active_statuses = ["PENDING", "IN_PROGRESS", "QUEUED"]
-            active_tasks = [t for t in tasks if t.get("status") in active_statuses]
+            # The cached status snapshot keeps the active tasks, so repeated
+            # calls within status_counts_ttl_seconds issue no requests
+            aggregator = await self._get_status_counts(emitter, need_active=True)
+            active_tasks = aggregator.active_tasks()
 
             await emitter.emit(f"Found {len(active_tasks)} active tasks", done=True)
 
@@ -731,6 +5059,7 @@ class Tools:
             await emitter.emit(error_msg, done=True)
             return error_msg
 
+    @_instrumented
     async def get_available_models(
         self,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
@@ -740,9 +5069,7 @@ class Tools:
 
         :return: Formatted list of available model configurations
         """
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
-        )
+        emitter = self._create_emitter(__event_emitter__)
 
         try:
             await emitter.emit("Scanning tasks for available models...", done=False)
@@ -808,113 +5135,597 @@ preferred_model_name: "openai/YourModelName"
             await emitter.emit(error_msg, done=True)
             return error_msg
 
-    async def get_task_status(
+    @_instrumented
+    async def get_task_status(
+        self,
+        task_id: str,
+        include_messages: Optional[bool] = None,
+        __event_emitter__: Optional[Callable[[dict], Any]] = None,
+        __user__: dict = {},
+    ) -> str:
+        """
+        Check the status of a specific automation task.
+
+        :param task_id: The task ID to check
+        :param include_messages: Include execution message logs (defaults to user preference)
+        :return: Current status and progress information
+        """
+        if include_messages is None:
+            include_messages = self.user_valves.show_execution_logs
+
+        emitter = self._create_emitter(__event_emitter__)
+
+        self._tracer.current_span().set_attribute("bytebot.task_id", task_id)
+        await emitter.emit(f"Retrieving status for task {task_id}...", done=False)
+
+        if task_id.startswith(OUTBOX_ID_PREFIX):
+            entry = await self._store_call("outbox_entry", task_id)
+            if entry is None:
+                await emitter.emit(f"Task not found: {task_id}", done=True)
+                return f"Task not found: {task_id}"
+            if not entry["task_id"]:
+                await emitter.emit("Task is waiting in the outbox", done=True)
+                return await self._format_outbox_entry(entry)
+            task_id = entry["task_id"]
+
+        try:
+            task = await self._retry_request(
+                "GET", f"{self.valves.bytebot_url}/tasks/{task_id}", emitter=emitter
+            )
+
+            await emitter.emit("Status retrieved successfully", done=True)
+            self._status_counts.observe(task_id, task.get("status"))
+
+            # The user is looking at this task now; no need to re-deliver it
+            if self._is_finished_status(task.get("status")):
+                await self._store_call("mark_delivered", [task_id])
+                self._release_task_slots(task_id)
+
+            # Format based on include_messages preference
+            if not include_messages:
+                # Remove messages for cleaner output
+                task_copy = task.copy()
+                task_copy.pop("messages", None)
+                return self._format_task_result(task_copy)
+
+            return self._format_task_result(task)
+
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
+                error_msg = f"Task not found: {task_id}"
+            else:
+                error_msg = ErrorFormatter.format_api_error(e, "retrieving task status")
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+        except aiohttp.ClientError as e:
+            error_msg = ErrorFormatter.format_api_error(e, "retrieving task status")
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+        except Exception as e:
+            error_msg = f"Error retrieving task status: {str(e)}"
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+
+    @_instrumented
+    async def cancel_task(
+        self,
+        task_id: str,
+        __event_emitter__: Optional[Callable[[dict], Any]] = None,
+    ) -> str:
+        """
+        Cancel a running or pending ByteBot task.
+
+        :param task_id: The task ID to cancel
+        :return: Cancellation confirmation or error message
+        """
+        emitter = self._create_emitter(__event_emitter__)
+
+        self._tracer.current_span().set_attribute("bytebot.task_id", task_id)
+        await emitter.emit(f"Cancelling task {task_id}...", done=False)
+
+        try:
+            session = await self._get_session()
+            async with session.delete(
+                f"{self.valves.bytebot_url}/tasks/{task_id}"
+            ) as response:
+                if response.status == 204:
+                    self._release_task_slots(task_id)
+                    self._status_counts.observe(task_id, "CANCELLED")
+                    await emitter.emit("Task cancelled successfully", done=True)
+                    return f"Task cancelled successfully.\n\n**Task ID:** `{task_id}`"
+                else:
+                    response.raise_for_status()
+                    return f"Task cancelled (status: {response.status}).\n\n**Task ID:** `{task_id}`"
+
+        except aiohttp.ClientResponseError as e:
+            if e.status == 404:
+                error_msg = f"Task not found: {task_id}"
+            else:
+                error_msg = ErrorFormatter.format_api_error(e, "cancelling task")
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+        except aiohttp.ClientError as e:
+            error_msg = ErrorFormatter.format_api_error(e, "cancelling task")
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+        except Exception as e:
+            error_msg = f"Error cancelling task: {str(e)}"
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+
+    @_instrumented
+    async def cancel_tasks(
+        self,
+        task_ids: Optional[List[str]] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        older_than_minutes: Optional[int] = None,
+        description_contains: Optional[str] = None,
+        max_tasks: int = 100,
+        dry_run: bool = False,
+        __event_emitter__: Optional[Callable[[dict], Any]] = None,
+        __user__: dict = {},
+    ) -> str:
+        """
+        Cancel many ByteBot tasks at once, by ID list or by filter.
+
+        :param task_ids: Task IDs to cancel (list, or a comma-separated string); filters are ignored when given
+        :param status: Only tasks in these statuses, comma-separated (default: PENDING,IN_PROGRESS,QUEUED,NEEDS_HELP,NEEDS_REVIEW)
+        :param priority: Only tasks with this priority (LOW, MEDIUM, HIGH, URGENT)
+        :param older_than_minutes: Only tasks created more than this many minutes ago
+        :param description_contains: Only tasks whose description contains this text (case-insensitive)
+        :param max_tasks: Maximum number of tasks to cancel (default: 100); IDs beyond it are listed as skipped
+        :param dry_run: List the matching tasks without cancelling them
+        :return: Table with the outcome for each task
+        """
+        emitter = self._create_emitter(__event_emitter__)
+
+        if isinstance(task_ids, str):
+            task_ids = task_ids.split(",")
+        ids = list(dict.fromkeys(t.strip() for t in task_ids or [] if t and t.strip()))
+        has_filter = any(
+            v not in (None, "")
+            for v in (status, priority, older_than_minutes, description_contains)
+        )
+        if not ids and not has_filter:
+            return "Error: Provide task IDs or at least one filter (status, priority, older_than_minutes, description_contains)."
+        if priority and priority.upper() not in ["LOW", "MEDIUM", "HIGH", "URGENT"]:
+            return f"Error: Invalid priority '{priority}'. Must be LOW, MEDIUM, HIGH, or URGENT."
+
+        max_tasks = max(1, max_tasks)
+        skipped = ids[max_tasks:]
+        try:
+            if ids:
+                targets = [{"id": task_id} for task_id in ids[:max_tasks]]
+            else:
+                await emitter.emit("Finding matching tasks...", done=False)
+                targets = await self._find_tasks(
+                    status,
+                    priority,
+                    older_than_minutes,
+                    description_contains,
+                    max_tasks,
+                )
+        except aiohttp.ClientError as e:
+            error_msg = ErrorFormatter.format_api_error(e, "finding tasks to cancel")
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+        except Exception as e:
+            error_msg = f"Error finding tasks to cancel: {str(e)}"
+            await emitter.emit(error_msg, done=True)
+            return error_msg
+
+        if not targets:
+            await emitter.emit("No matching tasks", done=True)
+            return "No matching tasks to cancel."
+
+        if dry_run:
+            await emitter.emit(f"{len(targets)} tasks match", done=True)
+            outcomes = {task["id"]: "would cancel" for task in targets}
+        else:
+            await emitter.emit(f"Cancelling {len(targets)} tasks...", done=False)
+            outcomes = await self._cancel_many([task["id"] for task in targets])
+            cancelled = sum(outcome == "cancelled" for outcome in outcomes.values())
+            await emitter.emit(
+                f"Cancelled {cancelled} of {len(targets)} tasks", done=True
+            )
+
+        output = self._format_cancel_outcomes(targets, outcomes, dry_run)
+        if skipped:
+            output += f"\n\n**Skipped (over max_tasks={max_tasks}):** " + ", ".join(
+                f"`{task_id}`" for task_id in skipped
+            )
+        elif not ids and len(targets) >= max_tasks:
+            output += f"\n\nStopped at max_tasks={max_tasks}; more tasks may match."
+        return output
+
+    async def _find_tasks(
+        self,
+        status: Optional[str],
+        priority: Optional[str],
+        older_than_minutes: Optional[int],
+        description_contains: Optional[str],
+        max_tasks: int,
+    ) -> List[dict]:
+        """Scan the task list for tasks matching every given filter."""
+        statuses = (
+            {s.strip().upper() for s in status.split(",") if s.strip()}
+            if status
+            else {"PENDING", "IN_PROGRESS", "QUEUED", *ATTENTION_STATUSES}
+        )
+        cutoff = (
+            time.time() - older_than_minutes * 60
+            if older_than_minutes is not None
+            else None
+        )
+        needle = (description_contains or "").lower()
+
+        matches = []
+        tasks = self._iter_tasks_by_status(statuses)
+        try:
+            async for task in tasks:
+                if priority and task.get("priority") != priority.upper():
+                    continue
+                if needle and needle not in task.get("description", "").lower():
+                    continue
+                if cutoff is not None:
+                    created = _parse_timestamp(task.get("createdAt", ""))
+                    if created is None or created.timestamp() > cutoff:
+                        continue
+                matches.append(task)
+                if len(matches) >= max_tasks:
+                    return matches
+        finally:
+            await tasks.aclose()
+        return matches
+
+    async def _cancel_many(self, task_ids: List[str]) -> Dict[str, str]:
+        """DELETE tasks concurrently with bounded parallelism; return outcome per ID."""
+        semaphore = asyncio.Semaphore(max(1, self.valves.bulk_cancel_concurrency))
+
+        async def cancel(task_id: str) -> str:
+            async with semaphore:
+                try:
+                    await self._retry_request(
+                        "DELETE", f"{self.valves.bytebot_url}/tasks/{task_id}"
+                    )
+                except aiohttp.ClientResponseError as e:
+                    if e.status == 404:
+                        return "not found"
+                    return f"failed (HTTP {e.status})"
+                except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                    return f"failed ({type(e).__name__})"
+                except Exception as e:
+                    return f"failed ({str(e) or type(e).__name__})"
+            self._release_task_slots(task_id)
+            self._status_counts.observe(task_id, "CANCELLED")
+            return "cancelled"
+
+        results = await asyncio.gather(*(cancel(task_id) for task_id in task_ids))
+        return dict(zip(task_ids, results))
+
+    def _format_cancel_outcomes(
+        self, targets: List[dict], outcomes: Dict[str, str], dry_run: bool
+    ) -> str:
+        """Render the per-task outcome table for cancel_tasks()."""
+        counts = Counter(outcomes.values())
+        title = "Tasks Matching (dry run)" if dry_run else "Bulk Cancellation"
+        output = [
+            f"**{title}:** " + ", ".join(f"{n} {o}" for o, n in counts.most_common()),
+            "",
+            "| Task ID | Status | Priority | Description | Outcome |",
+            "|---|---|---|---|---|",
+        ]
+        for task in targets:
+            description = self._truncate_description(
+                task.get("description", "")
+            ).replace("|", "\\|")
+            output.append(
+                f"| `{task['id']}` | {task.get('status', '-')} "
+                f"| {task.get('priority', '-')} | {description or '-'} "
+                f"| {outcomes.get(task['id'], '-')} |"
+            )
+        return "\n".join(output)
+
+    @_instrumented
+    async def export_tasks(
         self,
-        task_id: str,
-        include_messages: Optional[bool] = None,
+        output_format: str = "ndjson",
+        fields: Optional[str] = None,
+        since: Optional[str] = None,
+        status: Optional[str] = None,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
     ) -> str:
         """
-        Check the status of a specific automation task.
+        Export the full task history to a local NDJSON or CSV file for audits.
 
-        :param task_id: The task ID to check
-        :param include_messages: Include execution message logs (defaults to user preference)
-        :return: Current status and progress information
+        :param output_format: "ndjson" (one JSON object per line) or "csv"
+        :param fields: Comma-separated fields to include (e.g. "id,status,createdAt"; default: all list fields)
+        :param since: Only export tasks created at or after this ISO timestamp, UTC unless it has an offset (use the cursor from a previous export)
+        :param status: Only export tasks in these statuses, comma-separated
+        :return: Export file path, record count and the cursor for the next incremental export
         """
-        if include_messages is None:
-            include_messages = self.user_valves.show_execution_logs
+        emitter = self._create_emitter(__event_emitter__)
+        output_format = (output_format or "ndjson").lower()
+        if output_format not in ("ndjson", "csv"):
+            return (
+                f"Error: Invalid format '{output_format}'. Must be 'ndjson' or 'csv'."
+            )
+
+        since_dt = None
+        if since:
+            since_dt = _parse_timestamp(since.strip())
+            if since_dt is None:
+                return f"Error: Invalid since timestamp '{since}'. Use ISO 8601, e.g. 2025-01-31T12:00:00Z."
+            since_dt = _as_utc(since_dt)
 
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
+        columns = [f.strip() for f in (fields or "").split(",") if f.strip()]
+        if not columns and output_format == "csv":
+            columns = list(EXPORT_CSV_FIELDS)
+
+        directory = self.valves.export_dir or os.path.join(
+            os.environ.get("DATA_DIR", tempfile.gettempdir()), "bytebot_exports"
+        )
+        path = os.path.join(
+            directory,
+            f"bytebot_tasks_{time.strftime('%Y%m%d_%H%M%S')}.{output_format}",
         )
 
-        await emitter.emit(f"Retrieving status for task {task_id}...", done=False)
+        await emitter.emit("Exporting task history...", done=False)
 
+        statuses = [s.strip() for s in (status or "").upper().split(",") if s.strip()]
+        records = self._iter_export_records(statuses, since_dt, columns, emitter)
         try:
-            task = await self._retry_request(
-                "GET", f"{self.valves.bytebot_url}/tasks/{task_id}", emitter=emitter
+            await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+            count, cursor = await self._write_export(
+                path, output_format, columns, records
             )
-
-            await emitter.emit("Status retrieved successfully", done=True)
-
-            # Format based on include_messages preference
-            if not include_messages:
-                # Remove messages for cleaner output
-                task_copy = task.copy()
-                task_copy.pop("messages", None)
-                return self._format_task_result(task_copy)
-
-            return self._format_task_result(task)
-
-        except aiohttp.ClientResponseError as e:
-            if e.status == 404:
-                error_msg = f"Task not found: {task_id}"
-            else:
-                error_msg = ErrorFormatter.format_api_error(e, "retrieving task status")
-            await emitter.emit(error_msg, done=True)
-            return error_msg
         except aiohttp.ClientError as e:
-            error_msg = ErrorFormatter.format_api_error(e, "retrieving task status")
+            error_msg = ErrorFormatter.format_api_error(e, "exporting tasks")
             await emitter.emit(error_msg, done=True)
             return error_msg
         except Exception as e:
-            error_msg = f"Error retrieving task status: {str(e)}"
+            error_msg = f"Error exporting tasks: {str(e)}"
             await emitter.emit(error_msg, done=True)
             return error_msg
+        finally:
+            await records.aclose()
 
-    async def cancel_task(
+        await emitter.emit(f"Exported {count} tasks", done=True)
+        size = await asyncio.to_thread(os.path.getsize, path)
+
+        output = [
+            "**Task Export Complete**",
+            "",
+            f"**File:** `{path}`",
+            f"**Format:** {output_format.upper()}",
+            f"**Tasks:** {count}",
+            f"**Size:** {size / 1024:.1f} KB",
+        ]
+        if cursor:
+            output.append(
+                f"**Next cursor:** `{cursor}` (pass as since= to export newer tasks; tasks created at the cursor are included again)"
+            )
+        return "\n".join(output)
+
+    async def _iter_export_records(
         self,
-        task_id: str,
+        statuses: List[str],
+        since: Optional[datetime],
+        columns: List[str],
+        emitter: EventEmitter,
+    ):
+        """Yield (createdAt, projected record) newest first, stopping at the since cursor."""
+        seen = 0
+        tasks = self._iter_tasks_by_status(
+            statuses, emitter=emitter, prefetch=self.valves.export_prefetch_pages
+        )
+        try:
+            async for task in tasks:
+                if since is not None:
+                    # The cursor is inclusive: tasks sharing its createdAt
+                    # may have arrived after the previous export
+                    created = _parse_timestamp(task.get("createdAt", ""))
+                    if created is not None and _as_utc(created) < since:
+                        return  # Tasks arrive newest first; the rest are older
+                record = {c: task.get(c) for c in columns} if columns else task
+                yield task.get("createdAt"), record
+                seen += 1
+                if seen % 100 == 0:
+                    await emitter.emit(f"Exported {seen} tasks...", done=False)
+        finally:
+            await tasks.aclose()
+
+    @staticmethod
+    async def _write_export(
+        path: str, output_format: str, columns: List[str], records
+    ) -> tuple:
+        """Stream records into path (atomically); return (count, newest createdAt).
+
+        Rows are buffered in memory and written by a worker thread, so disk
+        I/O never blocks the event loop.
+        """
+        count = 0
+        cursor = None
+        partial = path + ".partial"
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if output_format == "csv" else None
+
+        async def flush(f):
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                await asyncio.to_thread(f.write, chunk)
+
+        try:
+            f = await asyncio.to_thread(
+                open, partial, "w", encoding="utf-8", newline=""
+            )
+            try:
+                if writer is not None:
+                    writer.writerow(columns)
+                async for created, record in records:
+                    if writer is not None:
+                        writer.writerow(
+                            [
+                                (
+                                    json.dumps(record.get(c))
+                                    if isinstance(record.get(c), (dict, list))
+                                    else record.get(c)
+                                )
+                                for c in columns
+                            ]
+                        )
+                    else:
+                        buffer.write(json.dumps(record, separators=(",", ":")))
+                        buffer.write("\n")
+                    if count == 0:
+                        cursor = created
+                    count += 1
+                    if buffer.tell() >= EXPORT_FLUSH_CHARS:
+                        await flush(f)
+                await flush(f)
+            finally:
+                await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, partial, path)
+        except BaseException:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            raise
+        return count, cursor
+
+    @_instrumented
+    async def get_task_analytics(
+        self,
+        since_hours: Optional[int] = None,
+        max_tasks: int = 5000,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
     ) -> str:
         """
-        Cancel a running or pending ByteBot task.
+        Analyse task history: duration percentiles, failure and needs-help rates, and throughput by model and priority.
 
-        :param task_id: The task ID to cancel
-        :return: Cancellation confirmation or error message
+        :param since_hours: Only include tasks created in the last N hours (default: all, up to max_tasks)
+        :param max_tasks: Maximum number of most recent tasks to analyse (default: 5000)
+        :return: Compact analytics tables
         """
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
-        )
-
-        await emitter.emit(f"Cancelling task {task_id}...", done=False)
+        emitter = self._create_emitter(__event_emitter__)
+        await emitter.emit("Collecting task history...", done=False)
 
         try:
-            session = await self._get_session()
-            async with session.delete(
-                f"{self.valves.bytebot_url}/tasks/{task_id}"
-            ) as response:
-                if response.status == 204:
-                    await emitter.emit("Task cancelled successfully", done=True)
-                    return f"Task cancelled successfully.\n\n**Task ID:** `{task_id}`"
-                else:
-                    response.raise_for_status()
-                    return f"Task cancelled (status: {response.status}).\n\n**Task ID:** `{task_id}`"
-
-        except aiohttp.ClientResponseError as e:
-            if e.status == 404:
-                error_msg = f"Task not found: {task_id}"
-            else:
-                error_msg = ErrorFormatter.format_api_error(e, "cancelling task")
-            await emitter.emit(error_msg, done=True)
-            return error_msg
+            columns = await self._scan_task_columns(since_hours, max_tasks, emitter)
         except aiohttp.ClientError as e:
-            error_msg = ErrorFormatter.format_api_error(e, "cancelling task")
+            error_msg = ErrorFormatter.format_api_error(e, "collecting task analytics")
             await emitter.emit(error_msg, done=True)
             return error_msg
         except Exception as e:
-            error_msg = f"Error cancelling task: {str(e)}"
+            error_msg = f"Error collecting task analytics: {str(e)}"
             await emitter.emit(error_msg, done=True)
             return error_msg
 
+        if not len(columns):
+            await emitter.emit("No tasks found", done=True)
+            return "No tasks found for analytics."
+
+        with self._tracer.span("analytics.compute", tasks=len(columns)):
+            hours = columns.window_hours()
+            overall = columns.group_stats(None)[0]
+            by_model = columns.group_stats("model")
+            by_priority = columns.group_stats("priority")
+            by_status = columns.group_stats("status")
+
+        await emitter.emit(f"Analysed {len(columns)} tasks", done=True)
+
+        def rate(count: int, finished: int) -> str:
+            return f"{count / finished:.1%}" if finished else "-"
+
+        def throughput(completed: int) -> str:
+            return f"{completed / hours:.1f}" if hours > 0 else "-"
+
+        def table(title: str, rows: List[dict]) -> List[str]:
+            lines = [
+                f"**By {title}:**",
+                f"| {title} | Tasks | p50 | p95 | Failed | Needs help | Completed/h |",
+                "|---|---|---|---|---|---|---|",
+            ]
+            for row in sorted(rows, key=lambda r: -r["tasks"]):
+                lines.append(
+                    f"| {row['name']} | {row['tasks']} | {_format_seconds(row['p50'])} "
+                    f"| {_format_seconds(row['p95'])} | {rate(row['failed'], row['finished'])} "
+                    f"| {rate(row['needs_help'], row['finished'])} | {throughput(row['completed'])} |"
+                )
+            lines.append("")
+            return lines
+
+        output = [
+            f"**Task Analytics** ({len(columns)} tasks over {hours:.1f}h)",
+            "",
+            f"Duration p50 {_format_seconds(overall['p50'])}, p95 {_format_seconds(overall['p95'])} "
+            f"| Failed {rate(overall['failed'], overall['finished'])} "
+            f"| Needs help {rate(overall['needs_help'], overall['finished'])} "
+            f"| Completed/h {throughput(overall['completed'])}",
+            "Statuses: "
+            + ", ".join(
+                f"{row['name']} {row['tasks']}"
+                for row in sorted(by_status, key=lambda r: -r["tasks"])
+            ),
+            "",
+        ]
+        output.extend(table("Model", by_model))
+        output.extend(table("Priority", by_priority))
+        return "\n".join(output).rstrip()
+
+    async def _scan_task_columns(
+        self, since_hours: Optional[int], max_tasks: int, emitter: EventEmitter
+    ) -> TaskColumns:
+        """Page through recent tasks into columnar arrays (cached briefly)."""
+        key = (self.valves.bytebot_url, since_hours, max_tasks)
+        if self._analytics_cache is not None:
+            cached_key, cached_at, columns = self._analytics_cache
+            if (
+                cached_key == key
+                and time.time() - cached_at < self.valves.analytics_cache_seconds
+            ):
+                return columns
+
+        cutoff = time.time() - since_hours * 3600 if since_hours else None
+        columns = TaskColumns()
+        pages = self._iter_task_pages(
+            page_size=100, emitter=emitter, prefetch=self.valves.export_prefetch_pages
+        )
+        try:
+            async for page in pages:
+                for task in page:
+                    if cutoff is not None:
+                        created = _parse_timestamp(task.get("createdAt") or "")
+                        if created is not None and created.timestamp() < cutoff:
+                            return self._cache_columns(key, columns)
+                    columns.append(task)
+                    if len(columns) >= max_tasks:
+                        return self._cache_columns(key, columns)
+                await emitter.emit(f"Scanned {len(columns)} tasks...", done=False)
+        finally:
+            await pages.aclose()
+        return self._cache_columns(key, columns)
+
+    def _cache_columns(self, key: tuple, columns: TaskColumns) -> TaskColumns:
+        self._analytics_cache = (key, time.time(), columns)
+        return columns
+
+    @_instrumented
     async def execute_task_with_files(
         self,
         task_description: str,
         priority: Optional[str] = None,
         wait_for_completion: Optional[bool] = None,
+        notify_on_completion: Optional[bool] = None,
+        shard_files: bool = False,
         __files__: Optional[List] = None,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
         __user__: dict = {},
+        __chat_id__: Optional[str] = None,
     ) -> str:
         """
         Execute a task with file uploads for processing.
@@ -922,6 +5733,8 @@ preferred_model_name: "openai/YourModelName"
         :param task_description: Task description (e.g., "Extract payment terms from these contracts")
         :param priority: Task urgency - LOW, MEDIUM, HIGH, URGENT (defaults to user preference)
         :param wait_for_completion: Poll until done (True) or return task ID immediately (False)
+        :param notify_on_completion: When not waiting, post the result to this chat once the task finishes
+        :param shard_files: Split the files into groups and process each group in its own parallel task, then merge the results
         :param __files__: List of uploaded FileModel objects from OpenWebUI
         :return: Task execution results with uploaded file processing outputs
         """
@@ -930,10 +5743,10 @@ preferred_model_name: "openai/YourModelName"
             priority = self.user_valves.default_priority
         if wait_for_completion is None:
             wait_for_completion = self.user_valves.default_wait_for_completion
+        if notify_on_completion is None:
+            notify_on_completion = self.user_valves.default_notify_on_completion
 
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
-        )
+        emitter = self._create_emitter(__event_emitter__)
 
         if not __files__:
             return "Error: No files uploaded. Please attach files to your message."
@@ -945,17 +5758,23 @@ preferred_model_name: "openai/YourModelName"
         if priority not in ["LOW", "MEDIUM", "HIGH", "URGENT"]:
             return f"Error: Invalid priority '{priority}'. Must be LOW, MEDIUM, HIGH, or URGENT."
 
+        quota_error = self._check_user_quota(__user__)
+        if quota_error:
+            return quota_error
+
         # Validate files
         validation_errors = []
         total_size = 0
+        sizes = []
 
         for file in __files__:
             # Get file size from content
             content = file.data.get("content", "")
             if isinstance(content, str):
-                file_size_mb = len(content.encode("utf-8")) / (1024 * 1024)
+                sizes.append(len(content.encode("utf-8")))
             else:
-                file_size_mb = len(content) / (1024 * 1024)
+                sizes.append(len(content))
+            file_size_mb = sizes[-1] / (1024 * 1024)
 
             total_size += file_size_mb
 
@@ -964,7 +5783,8 @@ preferred_model_name: "openai/YourModelName"
                     f"- {file.filename}: {file_size_mb:.1f}MB exceeds limit ({self.valves.max_file_size_mb}MB)"
                 )
 
-        if len(__files__) > self.valves.max_files_per_task:
+        # Shards are separate tasks, so the per-task limit applies to each shard
+        if len(__files__) > self.valves.max_files_per_task and not shard_files:
             validation_errors.append(
                 f"- Too many files ({len(__files__)}). Maximum: {self.valves.max_files_per_task}"
             )
@@ -972,61 +5792,64 @@ preferred_model_name: "openai/YourModelName"
         if validation_errors:
             return "File validation failed:\n" + "\n".join(validation_errors)
 
+        if shard_files:
+            return await self._execute_sharded(
+                task_description,
+                priority,
+                wait_for_completion,
+                __files__,
+                sizes,
+                emitter,
+                __user__,
+                __event_emitter__ if notify_on_completion else None,
+            )
+
         await emitter.emit(
             f"Uploading {len(__files__)} files ({total_size:.1f}MB)...", done=False
         )
 
         try:
-            # Build multipart form data
-            form_data = aiohttp.FormData()
-            form_data.add_field("description", task_description)
-            form_data.add_field("priority", priority)
-            form_data.add_field("type", "IMMEDIATE")
-            form_data.add_field("control", "ASSISTANT")
-            form_data.add_field("model", json.dumps(self._get_model_config()))
-
-            for file in __files__:
-                content = file.data.get("content", "")
-                if isinstance(content, str):
-                    content = content.encode("utf-8")
-
-                content_type = file.meta.get("content_type", "application/octet-stream")
-
-                form_data.add_field(
-                    "files", content, filename=file.filename, content_type=content_type
-                )
-
-            # Submit task with files
-            session = await self._get_session()
-            async with session.post(
-                f"{self.valves.bytebot_url}/tasks", data=form_data
-            ) as response:
-                response.raise_for_status()
-                task = await response.json()
-
+            task = await self._submit_files_task(
+                self.valves.bytebot_url,
+                task_description,
+                priority,
+                __files__,
+                __user__,
+                emitter,
+            )
             task_id = task.get("id")
+            self._tracer.current_span().set_attribute("bytebot.task_id", task_id)
 
             await emitter.emit(f"Files uploaded. Task created: {task_id}", done=False)
 
             # Return immediately if not waiting
             if not wait_for_completion:
                 await emitter.emit("Task submitted successfully", done=True)
+                if notify_on_completion and __event_emitter__:
+                    self._spawn_background(
+                        self._notify_on_completion(
+                            task_id,
+                            __event_emitter__,
+                            __user__,
+                            __chat_id__,
+                            task_description,
+                            result_prefix=f"**Files Processed:** {len(__files__)} files\n\n",
+                        ),
+                        f"bytebot-notify-{task_id}",
+                    )
+                    return f"Task with files submitted successfully.\n\n**Task ID:** `{task_id}`\n**Files:** {len(__files__)}\n\nThe result will be posted to this chat when the task finishes."
                 return f"Task with files submitted successfully.\n\n**Task ID:** `{task_id}`\n**Files:** {len(__files__)}\n\nUse get_task_status('{task_id}') to check progress."
 
             # Poll for completion
             await emitter.emit("Monitoring task progress...", done=False)
-            completed_task = await self._poll_task_completion(task_id, emitter)
+            completed_task = await self._wait_with_tracking(
+                task_id, emitter, __user__, __chat_id__, task_description
+            )
 
             await emitter.emit("Task monitoring complete", done=True)
 
-            # Handle special statuses
-            if completed_task.get("status") == "TIMEOUT":
-                return self._format_task_result(completed_task)
-            elif completed_task.get("status") == "NEEDS_HELP":
-                return ErrorFormatter.format_needs_help(task_id)
-            elif completed_task.get("status") == "FAILED":
-                messages = completed_task.get("messages", [])
-                return ErrorFormatter.format_task_failed(task_id, messages)
+            if completed_task.get("status") in ("TIMEOUT", "NEEDS_HELP", "FAILED"):
+                return self._format_completion(task_id, completed_task)
 
             result = self._format_task_result(completed_task)
             return f"**Files Processed:** {len(__files__)} files\n\n{result}"
@@ -1035,11 +5858,395 @@ preferred_model_name: "openai/YourModelName"
             error_msg = ErrorFormatter.format_api_error(e, "task execution with files")
             await emitter.emit(error_msg, done=True)
             return error_msg
+        except _QuotaExceeded as e:
+            error_msg = f"Error: {e}"
+            await emitter.emit(error_msg, done=True)
+            return error_msg
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             await emitter.emit(error_msg, done=True)
             return error_msg
 
+    async def _submit_files_task(
+        self,
+        base_url: str,
+        task_description: str,
+        priority: str,
+        files: List,
+        user: Optional[dict],
+        emitter: EventEmitter,
+    ) -> dict:
+        """Upload files as a new task on the agent at base_url; return the created task."""
+        # Build multipart form data
+        form_data = aiohttp.FormData()
+        form_data.add_field("description", task_description)
+        form_data.add_field("priority", priority)
+        form_data.add_field("type", "IMMEDIATE")
+        form_data.add_field("control", "ASSISTANT")
+        model = self._get_model_config()
+        form_data.add_field("model", self._codec().dumps_text(model))
+
+        upload_bytes = 0
+        for file in files:
+            content = file.data.get("content", "")
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            upload_bytes += len(content)
+
+            content_type = file.meta.get("content_type", "application/octet-stream")
+
+            form_data.add_field(
+                "files", content, filename=file.filename, content_type=content_type
+            )
+
+        # Scheduler and model slots track the primary agent's capacity and are
+        # revalidated against it, so tasks on other agents do not hold them
+        primary = base_url == self.valves.bytebot_url
+        if primary:
+            leases = await self._admit_submission(model["name"], user, emitter)
+        else:
+            leases = (None, None, self._reserve_quota(user))
+        session = await self._get_session()
+        self._metrics.add_gauge("uploads_in_flight", 1)
+        try:
+            async with session.post(f"{base_url}/tasks", data=form_data) as response:
+                response.raise_for_status()
+                task = await self._read_json(response)
+        except BaseException:
+            self._release_slots(leases)
+            raise
+        finally:
+            self._metrics.add_gauge("uploads_in_flight", -1)
+
+        self._metrics.inc("upload_files_total", len(files))
+        self._metrics.inc("upload_bytes_total", upload_bytes)
+        if primary:
+            self._bind_slots(leases, task.get("id"))
+        elif not task.get("id"):
+            self._release_slots(leases)
+        return task
+
+    async def _execute_sharded(
+        self,
+        task_description: str,
+        priority: str,
+        wait_for_completion: bool,
+        files: List,
+        sizes: List[int],
+        emitter: EventEmitter,
+        user: Optional[dict],
+        notify_emitter: Optional[Callable[[dict], Any]] = None,
+    ) -> str:
+        """Run one task per group of files in parallel and merge their results.
+
+        Shards are spread round-robin over bytebot_url and shard_agent_urls.
+        A shard that fails to upload or finish does not stop the others.
+        When not waiting, notify_emitter receives the merged report once every
+        submitted shard has finished.
+        """
+        groups = _shard_files(
+            files,
+            sizes,
+            max(1, min(self.valves.shard_max_files, self.valves.max_files_per_task)),
+            max(1, int(self.valves.shard_max_mb * 1024 * 1024)),
+        )
+        agents = [self.valves.bytebot_url] + [
+            url.strip().rstrip("/")
+            for url in self.valves.shard_agent_urls.split(",")
+            if url.strip()
+        ]
+        agents = list(dict.fromkeys(agents))
+        shards = [
+            {
+                "number": number,
+                "agent": agents[(number - 1) % len(agents)],
+                "files": [files[i] for i in group],
+                "bytes": sum(sizes[i] for i in group),
+                "task_id": None,
+                "task": None,
+                "error": None,
+            }
+            for number, group in enumerate(groups, 1)
+        ]
+        await emitter.emit(
+            f"Uploading {len(files)} files as {len(shards)} parallel tasks...",
+            done=False,
+        )
+
+        finished = 0
+
+        async def run(shard: dict):
+            nonlocal finished
+            names = ", ".join(file.filename for file in shard["files"])
+            description = (
+                f"{task_description}\n\n"
+                f"(Part {shard['number']} of {len(shards)}: {names})"
+            )
+            with self._tracer.span(
+                "shard", **{"shard.number": shard["number"], "shard.files": names}
+            ):
+                try:
+                    task = await self._submit_files_task(
+                        shard["agent"],
+                        description,
+                        priority,
+                        shard["files"],
+                        user,
+                        self._create_emitter(None),
+                    )
+                    shard["task_id"] = task.get("id")
+                    if wait_for_completion:
+                        shard["task"] = await self._poll_task_completion(
+                            shard["task_id"], base_url=shard["agent"]
+                        )
+                except aiohttp.ClientError as e:
+                    shard["error"] = ErrorFormatter.format_api_error(
+                        e, f"shard {shard['number']}"
+                    )
+                except Exception as e:
+                    shard["error"] = f"Error in shard {shard['number']}: {e}"
+            finished += 1
+            status = self._shard_status(shard, wait_for_completion)
+            self._metrics.inc("shards_total", status=status)
+            await emitter.emit(
+                f"Shard {shard['number']} {status} ({finished}/{len(shards)} done)",
+                done=False,
+            )
+
+        await asyncio.gather(*(run(shard) for shard in shards))
+        await emitter.emit(
+            f"All {len(shards)} shards {'finished' if wait_for_completion else 'submitted'}",
+            done=True,
+        )
+        report = self._format_shard_report(shards, len(files), wait_for_completion)
+        if (
+            notify_emitter
+            and not wait_for_completion
+            and any(shard["task_id"] for shard in shards)
+        ):
+            self._spawn_background(
+                self._notify_shards_on_completion(shards, len(files), notify_emitter),
+                f"bytebot-notify-shards-{shards[0]['task_id']}",
+            )
+            report += "\n\nThe merged result will be posted to this chat when all shards finish."
+        return report
+
+    async def _notify_shards_on_completion(
+        self,
+        shards: List[dict],
+        file_count: int,
+        event_emitter: Callable[[dict], Any],
+    ):
+        """Wait for submitted shards on their agents and post the merged report."""
+
+        async def wait(shard: dict):
+            if shard["error"]:
+                return
+            if not shard["task_id"]:
+                shard["error"] = f"Shard {shard['number']} returned no task ID"
+                return
+            try:
+                shard["task"] = await self._poll_task_completion(
+                    shard["task_id"],
+                    max_interval=self.valves.background_poll_max_interval_seconds,
+                    base_url=shard["agent"],
+                    ride_out_errors=True,
+                )
+            except aiohttp.ClientError as e:
+                shard["error"] = ErrorFormatter.format_api_error(
+                    e, f"shard {shard['number']}"
+                )
+            except Exception as e:
+                shard["error"] = f"Error in shard {shard['number']}: {e}"
+
+        await asyncio.gather(*(wait(shard) for shard in shards))
+        emitter = self._create_emitter(event_emitter)
+        try:
+            await emitter.emit(f"All {len(shards)} shards finished", done=True)
+            await emitter.emit_message(
+                "\n\n" + self._format_shard_report(shards, file_count, True)
+            )
+        except Exception:
+            pass  # Chat went away; shard task IDs were already reported
+
+    @staticmethod
+    def _shard_status(shard: dict, waited: bool) -> str:
+        if shard["error"]:
+            return "ERROR"
+        if not waited:
+            return "SUBMITTED"
+        return shard["task"].get("status", "UNKNOWN")
+
+    def _format_shard_report(
+        self, shards: List[dict], file_count: int, waited: bool
+    ) -> str:
+        """Merge shard outcomes into one report with a per-shard status table."""
+        statuses = [self._shard_status(shard, waited) for shard in shards]
+        good = "COMPLETED" if waited else "SUBMITTED"
+        ok = statuses.count(good)
+        multi_agent = len({shard["agent"] for shard in shards}) > 1
+
+        output = [
+            "**Sharded Task Report**",
+            "",
+            f"**Files Processed:** {file_count} files in {len(shards)} shards",
+            f"**Shards:** {ok} {good.lower()}, {len(shards) - ok} not {good.lower()}",
+            "",
+            "| Shard | Files | Size |"
+            + (" Agent |" if multi_agent else "")
+            + " Task ID | Status |",
+            "|---|---|---|" + ("---|" if multi_agent else "") + "---|---|",
+        ]
+        for shard, status in zip(shards, statuses):
+            output.append(
+                f"| {shard['number']} | {len(shard['files'])} "
+                f"| {shard['bytes'] / (1024 * 1024):.1f}MB |"
+                + (f" {_endpoint_host(shard['agent'])} |" if multi_agent else "")
+                + f" `{shard['task_id'] or '-'}` | {status} |"
+            )
+
+        if waited:
+            log_budget = self._shared_log_budget(len(shards))
+            for shard, status in zip(shards, statuses):
+                output.append("")
+                output.append(f"### Shard {shard['number']}: {status}")
+                output.append(
+                    "**Files:** " + ", ".join(f.filename for f in shard["files"])
+                )
+                output.append("")
+                if shard["error"]:
+                    output.append(shard["error"])
+                elif status == "COMPLETED":
+                    output.append(self._format_task_result(shard["task"], log_budget))
+                else:
+                    output.append(
+                        self._format_completion(
+                            shard["task_id"], shard["task"], log_budget
+                        )
+                    )
+        elif not multi_agent:
+            ids = ",".join(s["task_id"] for s in shards if s["task_id"])
+            if ids:
+                output.append("")
+                output.append(f"Use wait_for_tasks('{ids}') to collect the results.")
+
+        retry = [
+            f.filename
+            for shard, status in zip(shards, statuses)
+            if status != good
+            for f in shard["files"]
+        ]
+        if retry:
+            output.append("")
+            output.append(
+                f"**Partial result:** resubmit these files to retry the shards that did not complete: {', '.join(retry)}"
+            )
+        return "\n".join(output)
+
+    @_instrumented
+    async def get_metrics(
+        self,
+        output_format: str = "summary",
+        __event_emitter__: Optional[Callable[[dict], Any]] = None,
+    ) -> str:
+        """
+        Show tool instrumentation: request latency, status codes, retries, polls and traffic.
+
+        :param output_format: "summary" for a readable report or "prometheus" for the text exposition format
+        :return: Metrics report
+        """
+        emitter = self._create_emitter(__event_emitter__)
+        metrics = self._metrics
+
+        if output_format.lower() == "prometheus":
+            await self._maybe_export_metrics(force=True)
+            await emitter.emit("Metrics exported", done=True)
+            return f"```\n{metrics.to_prometheus()}```"
+
+        output = ["**ByteBot Tool Metrics**", ""]
+
+        latency = metrics.histograms("http_request_duration_seconds")
+        if latency:
+            output.append("**HTTP Requests:**")
+            output.append("| Endpoint | Requests | p50 | p95 | p99 |")
+            output.append("|---|---|---|---|---|")
+            for labels, hist in sorted(
+                latency, key=lambda item: (item[0]["endpoint"], item[0]["method"])
+            ):
+                name = "http_request_duration_seconds"
+                output.append(
+                    f"| {labels['method']} {labels['endpoint']} | {hist['count']} "
+                    f"| {metrics.quantile(name, hist, 0.5) * 1000:.0f}ms "
+                    f"| {metrics.quantile(name, hist, 0.95) * 1000:.0f}ms "
+                    f"| {metrics.quantile(name, hist, 0.99) * 1000:.0f}ms |"
+                )
+            output.append("")
+        else:
+            output.append("No HTTP requests recorded yet.")
+            output.append("")
+
+        status_counts = Counter()
+        for labels, value in metrics.counters("http_responses_total"):
+            status_counts[labels["status"]] += value
+        if status_counts:
+            codes = ", ".join(
+                f"{code}: {count:.0f}" for code, count in sorted(status_counts.items())
+            )
+            output.append(f"Status codes: {codes}")
+
+        errors = sum(v for _, v in metrics.counters("http_request_errors_total"))
+        retries = sum(v for _, v in metrics.counters("request_retries_total"))
+        failures = sum(v for _, v in metrics.counters("request_failures_total"))
+        output.append(f"Connection errors: {errors:.0f}")
+        output.append(
+            f"Retries: {retries:.0f} (gave up after all retries: {failures:.0f})"
+        )
+
+        sent = sum(v for _, v in metrics.counters("http_request_bytes_total"))
+        received = sum(v for _, v in metrics.counters("http_response_bytes_total"))
+        output.append(f"Bytes sent: {sent:,.0f} / received: {received:,.0f}")
+        output.append("")
+
+        output.append("**Task Polling:**")
+        output.append(f"Polls issued: {metrics.counter_value('task_polls_total'):.0f}")
+        for _, hist in metrics.histograms("task_polls_per_task"):
+            average = hist["sum"] / hist["count"]
+            output.append(
+                f"Tasks waited: {hist['count']} (avg {average:.1f} polls per task)"
+            )
+        for labels, hist in metrics.histograms("task_completion_detection_seconds"):
+            output.append(
+                f"Detection lag ({labels['status']}): "
+                f"p50 {metrics.quantile('task_completion_detection_seconds', hist, 0.5):.1f}s, "
+                f"p95 {metrics.quantile('task_completion_detection_seconds', hist, 0.95):.1f}s"
+            )
+        output.append("")
+
+        output.append("**In Flight:**")
+        for name, label in (
+            ("http_requests_in_flight", "HTTP requests"),
+            ("tasks_polling_in_flight", "Tasks being polled"),
+            ("uploads_in_flight", "Uploads"),
+        ):
+            value = sum(v for _, v in metrics.gauges(name))
+            output.append(f"{label}: {value:.0f}")
+        output.append("")
+
+        output.append("**Uploads and Events:**")
+        output.append(
+            f"Files uploaded: {metrics.counter_value('upload_files_total'):.0f} "
+            f"({metrics.counter_value('upload_bytes_total'):,.0f} bytes)"
+        )
+        emitted = sum(v for _, v in metrics.counters("events_emitted_total"))
+        output.append(
+            f"Events emitted: {emitted:.0f} "
+            f"(throttled: {metrics.counter_value('events_throttled_total'):.0f})"
+        )
+
+        await emitter.emit("Metrics collected", done=True)
+        return "\n".join(output)
+
+    @_instrumented
     async def check_connection(
         self,
         __event_emitter__: Optional[Callable[[dict], Any]] = None,
@@ -1049,9 +6256,7 @@ preferred_model_name: "openai/YourModelName"
 
         :return: Connection status, API availability, configured models
         """
-        emitter = EventEmitter(
-            __event_emitter__, self.user_valves.notification_verbosity
-        )
+        emitter = self._create_emitter(__event_emitter__)
 
         await emitter.emit("Checking ByteBot connection...", done=False)
 
@@ -1066,34 +6271,44 @@ preferred_model_name: "openai/YourModelName"
                 response_time = time.time() - start_time
 
                 if response.status == 200:
-                    response_data = await response.json()
+                    response_data = await self._read_json(response)
 
                     # Validate response structure
                     if self._validate_api_response(response_data, ["tasks"]):
                         tasks_list = response_data.get("tasks", [])
                         total_tasks = response_data.get("total", len(tasks_list))
 
-                        # Count actually active tasks (running now)
-                        active_statuses = ["PENDING", "IN_PROGRESS", "QUEUED"]
-                        active_count = sum(
-                            1 for t in tasks_list if t.get("status") in active_statuses
-                        )
-
-                        # Count tasks needing attention
-                        attention_statuses = ["NEEDS_HELP", "NEEDS_REVIEW"]
-                        attention_count = sum(
-                            1
-                            for t in tasks_list
-                            if t.get("status") in attention_statuses
-                        )
+                        # Global counts; fall back to this page if unavailable
+                        try:
+                            aggregate = await self._get_status_counts()
+                            counts = aggregate.counts
+                            total_tasks = aggregate.total
+                            counts_note = ""
+                            age = aggregate.age()
+                            if age >= self.valves.status_counts_ttl_seconds:
+                                # Kept for status_counts_scan_ttl_seconds
+                                counts_note = (
+                                    f" (task scan {_format_seconds(age)} ago, "
+                                    "plus changes seen since)"
+                                )
+                        except Exception:
+                            counts = Counter(t.get("status") for t in tasks_list)
+                            counts_note = " (first page only)"
+
+                        active_count = sum(counts[s] for s in ACTIVE_STATUSES)
+                        attention_count = sum(counts[s] for s in ATTENTION_STATUSES)
 
                         diagnostics.append(
                             f"Connection successful ({response_time:.2f}s)"
                         )
                         diagnostics.append(f"Status: {response.status} OK")
-                        diagnostics.append(f"Running tasks: {active_count}")
+                        diagnostics.append(
+                            f"Running tasks: {active_count}{counts_note}"
+                        )
                         if attention_count > 0:
-                            diagnostics.append(f"Needs attention: {attention_count}")
+                            diagnostics.append(
+                                f"Needs attention: {attention_count}{counts_note}"
+                            )
                         diagnostics.append(f"Total tasks (all time): {total_tasks}")
                     else:
                         # Fallback for older API format
@@ -1126,32 +6341,109 @@ preferred_model_name: "openai/YourModelName"
         except Exception as e:
             diagnostics.append(f"Unexpected error: {str(e)}")
 
+        # Probes start once the checks above are done, so waiting for a
+        # pooled connection is not measured as endpoint latency
+        try:
+            probe_results = await self._run_latency_probes()
+            probe_lines = self._format_latency_probes(probe_results)
+        except Exception as e:
+            probe_results = {}
+            probe_lines = [f"Latency probes failed: {str(e) or type(e).__name__}"]
+
         # Check LiteLLM proxy if configured
-        if self.valves.litellm_proxy_url:
+        litellm = probe_results.get("LiteLLM /model/info")
+        if litellm is not None:
             diagnostics.append("")
             diagnostics.append("**LiteLLM Proxy Check:**")
-            try:
-                async with session.get(
-                    f"{self.valves.litellm_proxy_url}/model/info"
-                ) as response:
-                    if response.status == 200:
-                        model_info = await response.json()
-                        diagnostics.append(f"LiteLLM proxy available")
-                        # Extract model names if available
-                        if isinstance(model_info, dict):
-                            diagnostics.append(f"Response: {str(model_info)[:100]}")
-                    else:
-                        diagnostics.append(
-                            f"LiteLLM proxy returned status {response.status}"
-                        )
-            except Exception as e:
-                diagnostics.append(f"LiteLLM proxy not accessible: {str(e)}")
+            if litellm["status"] == 200:
+                diagnostics.append("LiteLLM proxy available")
+                if litellm["body"].startswith("{"):
+                    diagnostics.append(f"Response: {litellm['body'][:100]}")
+            elif litellm["status"] is not None:
+                diagnostics.append(f"LiteLLM proxy returned status {litellm['status']}")
+            else:
+                diagnostics.append(
+                    f"LiteLLM proxy not accessible: {', '.join(litellm['errors'][:1])}"
+                )
+
+        diagnostics.append("")
+        diagnostics.extend(probe_lines)
 
         # Show configured models
         diagnostics.append("")
         diagnostics.append("**Configured Models:**")
         diagnostics.append(self.valves.configured_models)
 
+        # Baseline RTT from keep-alive pings
+        if self._rtt_baseline:
+            diagnostics.append("")
+            diagnostics.append("**Keep-alive Baseline RTT:**")
+            for host, baseline in sorted(self._rtt_baseline.items()):
+                diagnostics.append(
+                    f"{host}: last {baseline['last'] * 1000:.1f}ms, "
+                    f"min {baseline['min'] * 1000:.1f}ms, "
+                    f"avg {baseline['ewma'] * 1000:.1f}ms ({baseline['samples']} pings)"
+                )
+
+        # Rolling health statistics (no extra requests)
+        if self._health.hosts():
+            diagnostics.append("")
+            diagnostics.append("**Health Monitor:**")
+            for host in self._health.hosts():
+                stats = self._health.stats(host)
+                timeout = self._adaptive_timeout(host)
+                diagnostics.append(
+                    f"{host}: {'healthy' if self._health.healthy(host) else 'UNHEALTHY'}, "
+                    f"p50 {stats['p50'] * 1000:.1f}ms, p99 {stats['p99'] * 1000:.1f}ms, "
+                    f"errors {stats['error_rate']:.0%} of {stats['samples']} probes, "
+                    f"timeout {f'{timeout:.1f}s' if timeout else 'default'}, "
+                    f"updated {time.time() - stats['updated']:.0f}s ago"
+                )
+
+        # Submissions waiting for ByteBot to come back
+        if self.valves.outbox_enabled:
+            outbox = await self._store_call("outbox_counts") or {}
+            diagnostics.append("")
+            diagnostics.append("**Outbox:**")
+            diagnostics.append(
+                f"Queued: {outbox.get('queued', 0) + outbox.get('submitting', 0)}, "
+                f"submitted: {outbox.get('submitted', 0)}, "
+                f"rejected: {outbox.get('failed', 0)}"
+            )
+
+        # Per-user fair scheduling state
+        scheduling = self._scheduler.snapshot()
+        if scheduling["users"]:
+            diagnostics.append("")
+            diagnostics.append(
+                f"**User Scheduling:** {scheduling['running']}/"
+                f"{scheduling['capacity'] or 'unlimited'} tasks running"
+            )
+            for row in scheduling["users"]:
+                diagnostics.append(
+                    f"{row['user'] or 'anonymous'}: queued {row['queued']}, "
+                    f"running {row['running']}, weight {row['weight']:g}, "
+                    f"avg wait {row['avg_wait']:.1f}s, max wait {row['max_wait']:.1f}s"
+                )
+
+        # Live per-model limiter state
+        limits = self._limiter.snapshot()
+        if limits:
+            diagnostics.append("")
+            diagnostics.append("**Model Limits:**")
+            for row in limits:
+                parts = [
+                    f"running {row['running']}/{row['limit'] or 'unlimited'}",
+                    f"queued {row['queued']}",
+                ]
+                if row["rate"]:
+                    count, period = row["rate"]
+                    parts.append(
+                        f"rate {count:g}/{period:g}s ({row['tokens']:.1f} available)"
+                    )
+                parts.append(f"avg wait {row['avg_wait']:.1f}s")
+                diagnostics.append(f"{row['model']}: " + ", ".join(parts))
+
         # Show configuration
         diagnostics.append("")
         diagnostics.append("**Configuration:**")